@@ -0,0 +1,15 @@
+"""
+Optional async serving mode.  The read endpoints (single records, collections & picklists) run on
+SQLAlchemy's asyncio engine with psycopg's async driver, so a process can have many more reads
+waiting on the db at once than it has threads.  Writes & streamed reads are still served by the
+Flask app, on ASGI_SYNC_THREADS threads.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+
+Each worker process has its own async pool & sync pool, both sized by DB_POOL_SIZE & DB_MAX_OVERFLOW.
+"""
+from main import app as flask_app
+from backend.async_server import AsyncReadApp
+from routes.async_reads import ASYNC_READS
+
+app = AsyncReadApp(flask_app, ASYNC_READS)
@@ -1,9 +1,10 @@
 """Initialization file that creates the app and applies our config parameters."""
-from logging import getLogger, DEBUG
+from logging import getLogger
 from backend.config import Config
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
+from backend.replicas import replica_keys
 
 logger = getLogger()
 db = SQLAlchemy()
@@ -23,18 +24,55 @@ def create_app(config_class=Config) -> Flask:
 
     # Attach logger to the app
     app.logger = logger
-    app.logger.setLevel(DEBUG)
+    app.logger.setLevel(app.config["LOG_LEVEL"])
     app.logger.info("Initialized logger for this Flask app")
 
     allowed_origins = [o.strip() for o in Config.WHITELISTED_ORIGINS.split(",") if o.strip()]
 
+    # With read replicas, the front end must send its session cookie so its reads follow its writes
+    with_replicas = bool(replica_keys(app.config.get("SQLALCHEMY_BINDS") or {}))
+
     if app.config.get("DEBUG"):
-        CORS(app, origins="*", resources={r"/api/*": {"origins": "*"}})
+        CORS(app, origins="*", resources={r"/api/*": {"origins": "*"}}, supports_credentials=with_replicas)
     else:
-        CORS(app, resources={r"/api/*": {"origins": allowed_origins}})
+        CORS(app, resources={r"/api/*": {"origins": allowed_origins}}, supports_credentials=with_replicas)
+
+    # Size the connection pool & enable prepared statements for Postgres
+    from backend.database import engine_options, install_prepared_statements
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {**engine_options(app.config),
+                                               **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})}
+    install_prepared_statements()
+
+    # Time each connection checkout from the pool
+    if app.config.get("METRICS_ENABLED"):
+        from backend.metrics import InstrumentedQueuePool
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"poolclass": InstrumentedQueuePool,
+                                                   **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})}
 
     # Initialize our database and attach it to the app
     db.init_app(app)
     logger.info(f"Initialized the database {db.__repr__()}, attached it to the Flask app.")
 
+    # Send the reads to the replicas, unless the client just wrote something.  Without replicas, neither
+    # the routing session nor the pin is installed, so responses don't depend on the session cookie.
+    if with_replicas:
+        from backend.replicas import RoutingSession, register_replicas
+        db.session.session_factory.class_ = RoutingSession
+        register_replicas(app)
+
+    # Record the status, latency & size of each response
+    if app.config.get("METRICS_ENABLED"):
+        from backend.metrics import register_metrics
+        register_metrics(app)
+
+    # Count the queries issued by each request
+    if app.config.get("QUERY_STATS_ENABLED"):
+        from backend.query_stats import register_query_stats
+        register_query_stats(app)
+
+    # Profile the requests that ask for it
+    if app.config.get("PROFILING_ENABLED"):
+        from backend.profiling import ProfilingMiddleware
+        app.wsgi_app = ProfilingMiddleware(app.wsgi_app, app.config["PROFILING_DIRECTORY"])
+
     return app
@@ -0,0 +1,40 @@
+"""
+The asyncio engine & sessions used by the async read path (see asgi.py).
+
+Postgres is reached through psycopg's async driver, with the same pool & prepared statement settings
+as the sync engine (see backend/database.py).  SQLite needs the aiosqlite package, which is only
+useful for local testing & benchmarks.
+"""
+from logging import getLogger
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from backend.database import engine_options
+
+logger = getLogger()
+
+# The async drivers for each sync driver the app is configured with
+ASYNC_DRIVERS = {
+    "postgresql":         "postgresql+psycopg_async",
+    "postgresql+psycopg": "postgresql+psycopg_async",
+    "sqlite":             "sqlite+aiosqlite",
+    "sqlite+pysqlite":    "sqlite+aiosqlite",
+}
+
+
+def create_engine_for(url: URL, config) -> AsyncEngine:
+    """Creates the async engine for the database the sync engine at `url` connects to."""
+    if url.drivername not in ASYNC_DRIVERS:
+        raise ValueError(f"The async read path doesn't support the {url.drivername} driver")
+
+    url = url.set(drivername=ASYNC_DRIVERS[url.drivername])
+    options = engine_options(config)
+    if url.get_backend_name() == "postgresql" and "connect_args" not in options:
+        options["connect_args"] = {"prepare_threshold": config["DB_PREPARE_THRESHOLD"]}
+
+    logger.info("Initialized the async engine using %s", url.drivername)
+    return create_async_engine(url, **options)
+
+
+def create_session_factory(engine: AsyncEngine) -> async_sessionmaker:
+    # Rows are only read & serialized, so there's nothing to expire after a commit
+    return async_sessionmaker(engine, expire_on_commit=False)
@@ -0,0 +1,203 @@
+"""
+ASGI application that serves the read endpoints with async handlers and every other request with
+the Flask app, on a pool of threads.
+
+A request handled by an async handler goes through the Flask app's usual request lifecycle:
+before_request, after_request (CORS, query stats, metrics) & teardown_request all still run, in a
+request context built from the ASGI request.  Only the handler itself is replaced.
+"""
+from logging import getLogger
+from asyncio import get_running_loop, run_coroutine_threadsafe
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from random import choice
+from urllib.parse import parse_qs
+from flask import Flask, Response
+from flask_restful.representations.json import output_json
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import HTTPException
+from backend import db
+from backend.async_db import create_engine_for, create_session_factory
+from backend.replicas import reads_from_replica, replica_keys
+import sys
+
+logger = getLogger()
+
+
+async def read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+def build_environ(scope: dict, body: bytes) -> dict:
+    """Converts an ASGI HTTP scope to a WSGI environ."""
+    server = scope.get("server") or ("localhost", 80)
+    environ = {"REQUEST_METHOD":    scope["method"],
+               "SCRIPT_NAME":       scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+               "PATH_INFO":         scope["path"].encode("utf-8").decode("latin-1"),
+               "QUERY_STRING":      scope["query_string"].decode("latin-1"),
+               "SERVER_NAME":       server[0],
+               "SERVER_PORT":       str(server[1]),
+               "SERVER_PROTOCOL":   f"HTTP/{scope['http_version']}",
+               "CONTENT_LENGTH":    str(len(body)),
+               "wsgi.version":      (1, 0),
+               "wsgi.url_scheme":   scope.get("scheme", "http"),
+               "wsgi.input":        BytesIO(body),
+               "wsgi.errors":       sys.stderr,
+               "wsgi.multithread":  True,
+               "wsgi.multiprocess": True,
+               "wsgi.run_once":     False}
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+
+    for name, value in scope["headers"]:
+        name, value = name.decode("latin-1"), value.decode("latin-1")
+        if name == "content-type":
+            environ["CONTENT_TYPE"] = value
+        elif name != "content-length":
+            key = f"HTTP_{name.upper().replace('-', '_')}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    return environ
+
+
+def json_response(data, status: int, headers: dict = None) -> Response:
+    """Same response as flask_restful's Api.make_response for a JSON representation."""
+    response = output_json(data, status, headers)
+    response.headers["Content-Type"] = "application/json"
+    return response
+
+
+class WsgiBridge(object):
+    """Runs a WSGI app on a pool of threads.  Streamed responses are sent as they're generated."""
+
+    def __init__(self, wsgi_app, threads: int):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi")
+
+    async def __call__(self, scope, receive, send) -> None:
+        environ = build_environ(scope, await read_body(receive))
+        loop = get_running_loop()
+
+        def send_from_thread(message: dict) -> None:
+            run_coroutine_threadsafe(send(message), loop).result()
+
+        await loop.run_in_executor(self.executor, self.run, environ, send_from_thread)
+
+    def run(self, environ: dict, send) -> None:
+        response_start = {}
+
+        def start_response(status: str, headers: list, exc_info=None):
+            response_start.update(type="http.response.start", status=int(status.split(" ", 1)[0]),
+                                  headers=[(name.lower().encode("latin-1"), value.encode("latin-1"))
+                                           for name, value in headers])
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in result:
+                if response_start.get("type"):
+                    send(dict(response_start))
+                    response_start.clear()
+                if chunk:
+                    send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+            if response_start.get("type"):
+                send(dict(response_start))
+            send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+
+
+class AsyncReadApp(object):
+    """
+    Serves the GET requests for the paths in `handlers` with those async handlers, and sends
+    everything else to the Flask app.  Each handler is called with an AsyncSession & returns the
+    same (data, status, headers) tuple or Response as a Resource method would.
+    """
+
+    def __init__(self, app: Flask, handlers: dict):
+        self.app = app
+        self.handlers = handlers
+        self.wsgi = WsgiBridge(app.wsgi_app, app.config["ASGI_SYNC_THREADS"])
+
+        with app.app_context():
+            self.engine = create_engine_for(db.engine.url, app.config)
+            self.replica_engines = [create_engine_for(db.engines[key].url, app.config)
+                                    for key in replica_keys(db.engines)]
+        self.sessions = create_session_factory(self.engine)
+        self.replica_sessions = [create_session_factory(engine) for engine in self.replica_engines]
+        logger.info("Serving %s read endpoints asynchronously", len(handlers))
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+
+        handler = self.handlers.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "GET" else None
+
+        # Streamed reads are generated by the sync endpoints
+        if handler is None or "stream" in parse_qs(scope["query_string"].decode("latin-1"), keep_blank_values=True):
+            return await self.wsgi(scope, receive, send)
+
+        environ = build_environ(scope, await read_body(receive))
+        response = await self.handle(handler, environ)
+
+        await send({"type": "http.response.start", "status": response.status_code,
+                    "headers": [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                                for name, value in response.get_wsgi_headers(environ).items()]})
+        await send({"type": "http.response.body", "body": response.get_data()})
+
+    async def handle(self, handler, environ: dict) -> Response:
+        """Calls the handler inside the Flask app's request lifecycle."""
+        context = self.app.request_context(environ)
+        context.push()
+        error = None
+        try:
+            response = self.app.preprocess_request()
+            if response is None:
+                response = await self.call_handler(handler)
+            return self.app.process_response(self.app.make_response(response))
+
+        except BaseException as e:
+            error = e
+            raise
+
+        finally:
+            context.pop(error)
+
+    async def call_handler(self, handler) -> Response:
+        # Same routing as the sync session: a replica, unless the client just wrote something
+        sessions = choice(self.replica_sessions) if self.replica_sessions and reads_from_replica() else self.sessions
+        try:
+            async with sessions() as session:
+                output = await handler(session)
+
+        except HTTPException as e:
+            # Same as flask_restful's handling of `abort()`
+            return json_response(getattr(e, "data", {"message": e.description}), e.code)
+
+        except SQLAlchemyError as e:
+            error_msg = f"SQLAlchemyError retrieving data: {e}"
+            logger.info(error_msg)
+            return json_response({"error": error_msg}, 500)
+
+        if isinstance(output, Response):
+            return output
+        return json_response(*output)
+
+    async def lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for engine in (self.engine, *self.replica_engines):
+                    await engine.dispose()
+                self.wsgi.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
@@ -2,6 +2,7 @@
 from logging import getLogger
 from os import environ, path
 from helpers.helpers import scrub_password_from_database_uri
+from backend.replicas import replica_binds
 import uuid
 
 logger = getLogger()
@@ -24,6 +25,10 @@ class Config(object):
     BOUND_PORT = int(environ.get("BACKEND_PORT", 5001))
     logger.debug(f"Backend configured for http://{HOST_ADDRESS}:{BOUND_PORT}")
 
+    # Level for the root logger.  DEBUG logging formats a lot of per-request detail, so it's only
+    # on by default in debug mode.  See root_logger.py for the queue & file rotation settings.
+    LOG_LEVEL = environ.get("LOG_LEVEL", "DEBUG" if DEBUG_ENABLED else "INFO").upper()
+
     CORS_HEADERS = "Content-Type"
     WHITELISTED_ORIGINS = environ.get("WHITELISTED_ORIGINS", "")
 
@@ -48,7 +53,74 @@ class Config(object):
         logger.debug(f"Connecting to Development database: {scrub_password_from_database_uri(SQLALCHEMY_DATABASE_URI)}")
         print("Connecting to Dev database")
 
+    # Optional read replicas, as comma-separated URIs.  GET requests read from one of them, except
+    # for clients that wrote in the last REPLICA_PIN_SECONDS.  See backend/replicas.py.
+    POSTGRES_DB_REPLICAS = environ.get("POSTGRES_DB_REPLICAS", "")
+    POSTGRES_DB_REPLICAS_DEV = environ.get("POSTGRES_DB_REPLICAS_DEV", "")
+    SQLALCHEMY_BINDS = replica_binds(POSTGRES_DB_REPLICAS if USE_PROD_DATABASE else POSTGRES_DB_REPLICAS_DEV)
+    for bind_key, replica_uri in SQLALCHEMY_BINDS.items():
+        logger.debug(f"Read replica {bind_key}: {scrub_password_from_database_uri(replica_uri)}")
+    REPLICA_PIN_SECONDS = int(environ.get("REPLICA_PIN_SECONDS", 10))
+
+    # Connection pool, per worker process.  See backend/database.py for sizing it.
+    DB_POOL_SIZE = int(environ.get("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(environ.get("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = int(environ.get("DB_POOL_TIMEOUT", 30))
+
+    # Replace connections before the server or a firewall drops them for being idle, and test each
+    # one when it's checked out so a dropped connection is never handed to a request
+    DB_POOL_RECYCLE = int(environ.get("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = environ.get("DB_POOL_PRE_PING", "True").lower() == "true"
+
+    # Executions before psycopg prepares a statement on the server; "none" turns prepared statements off
+    DB_PREPARE_THRESHOLD = environ.get("DB_PREPARE_THRESHOLD", "5")
+    DB_PREPARE_THRESHOLD = None if DB_PREPARE_THRESHOLD.lower() == "none" else int(DB_PREPARE_THRESHOLD)
+
+    # Async serving mode (asgi.py): threads running the sync endpoints, i.e.: the writes
+    ASGI_SYNC_THREADS = int(environ.get("ASGI_SYNC_THREADS", 8))
+
     # Should SQLAlchemy send a notification to the app every time an object changes?
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Keyset pagination for the collection endpoints: records per page when the client doesn't provide
+    # a `limit` (at most MAX_PAGE_SIZE).  The response's Link header points to the next page, and
+    # `stream=true` without a `limit` returns every record without holding them in memory.
+    DEFAULT_PAGE_SIZE = int(environ.get("DEFAULT_PAGE_SIZE", 100))
+    MAX_PAGE_SIZE = int(environ.get("MAX_PAGE_SIZE", 1000))
+
+    # Collections can only be sorted by an unindexed column when the filters match at most this many rows
+    UNINDEXED_SORT_MAX_ROWS = int(environ.get("UNINDEXED_SORT_MAX_ROWS", 10000))
+
+    # Household search: results returned when the client doesn't provide a `limit` (at most
+    # MAX_PAGE_SIZE), and the shortest search that trigram matching gives useful results for
+    SEARCH_DEFAULT_LIMIT = int(environ.get("SEARCH_DEFAULT_LIMIT", 20))
+    SEARCH_MIN_LENGTH = int(environ.get("SEARCH_MIN_LENGTH", 3))
+    # Lowest word similarity (0 to 1) for a household to match, i.e.: "Jhonson" is 0.5 similar to "Johnson"
+    SEARCH_SIMILARITY_THRESHOLD = float(environ.get("SEARCH_SIMILARITY_THRESHOLD", 0.5))
+
+    # Max parent ids sent in each query for the related records requested via `include`
+    INCLUDE_BATCH_SIZE = int(environ.get("INCLUDE_BATCH_SIZE", 1000))
+
+    # Number of rows fetched from the server-side cursor per batch when streaming a collection
+    STREAM_BATCH_SIZE = int(environ.get("STREAM_BATCH_SIZE", 500))
+
+    # Max age (in seconds) of the cached picklist values before they're re-read from the db
+    PICKLIST_CACHE_TTL = int(environ.get("PICKLIST_CACHE_TTL", 300))
+
+    # Max age (in seconds) of the in-memory nickname typeahead index before it's reloaded from the db,
+    # and the suggestions returned when the client doesn't provide a `limit` (at most MAX_PAGE_SIZE)
+    TYPEAHEAD_INDEX_TTL = int(environ.get("TYPEAHEAD_INDEX_TTL", 300))
+    SUGGEST_DEFAULT_LIMIT = int(environ.get("SUGGEST_DEFAULT_LIMIT", 10))
+
+    # Request & db pool metrics, served in the Prometheus format at /metrics
+    METRICS_ENABLED = environ.get("METRICS_ENABLED", "True").lower() == "true"
+
+    # Report the number of queries & db time per request in the response headers, and log N+1 patterns
+    QUERY_STATS_ENABLED = environ.get("QUERY_STATS_ENABLED", str(DEBUG_ENABLED)).lower() == "true"
+    N_PLUS_ONE_THRESHOLD = int(environ.get("N_PLUS_ONE_THRESHOLD", 3))
+
+    # Opt-in profiling: when enabled, requests sent with an `X-Profile: true` header are profiled
+    PROFILING_ENABLED = environ.get("PROFILING_ENABLED", "False").lower() == "true"
+    PROFILING_DIRECTORY = environ.get("PROFILING_DIRECTORY", "./profiles")
+
     logger.debug("End of the Config() class.")
@@ -0,0 +1,71 @@
+"""
+Connection pool & prepared statement settings for the Postgres engine.
+
+The pool is per worker process, so a deployment holds up to
+(workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW)) connections; keep that under the server's
+`max_connections`.  The db_pool_* metrics at /metrics show whether the pool is sized right: a
+growing db_pool_checkout_wait_seconds or any db_pool_checkout_timeouts_total means it's too small.
+
+psycopg prepares a statement on the server once it has run DB_PREPARE_THRESHOLD times on a
+connection.  Statements executed with `.execution_options(prepare=True)`, i.e.: the single-row
+lookups by id, are prepared on their first execution instead.  Set DB_PREPARE_THRESHOLD=none when
+connecting through a pooler that doesn't support prepared statements, like PgBouncer < 1.21 in
+transaction mode; that also turns off `prepare=True`.
+"""
+from logging import getLogger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = getLogger()
+
+# psycopg 3's drivers.  The async dialect is named after the `postgresql+psycopg_async://` URLs it's
+# registered for, but currently reports "psycopg" like the sync one; either is accepted.  psycopg2's
+# `execute()` has no `prepare` argument.
+PSYCOPG_DRIVERS = ("psycopg", "psycopg_async")
+
+
+def engine_options(config) -> dict:
+    """Returns the engine options for the configured database.  Only Postgres uses these."""
+    uri = config.get("SQLALCHEMY_DATABASE_URI") or ""
+    if not uri.startswith("postgresql"):
+        return {}
+
+    options = {"pool_size":     config["DB_POOL_SIZE"],
+               "max_overflow":  config["DB_MAX_OVERFLOW"],
+               "pool_timeout":  config["DB_POOL_TIMEOUT"],
+               "pool_recycle":  config["DB_POOL_RECYCLE"],
+               "pool_pre_ping": config["DB_POOL_PRE_PING"]}
+
+    if uri.startswith("postgresql+psycopg:"):
+        options["connect_args"] = {"prepare_threshold": config["DB_PREPARE_THRESHOLD"]}
+
+    logger.info(f"Database pool: size={options['pool_size']}, max_overflow={options['max_overflow']}, "
+                f"timeout={options['pool_timeout']}s, recycle={options['pool_recycle']}s, "
+                f"pre_ping={options['pool_pre_ping']}")
+    return options
+
+
+def _execute_prepared(cursor, statement, parameters, context) -> bool:
+    """
+    Prepares the statements marked with `prepare=True` on their first execution.  The async engine's
+    cursor passes `prepare` through to psycopg's AsyncCursor, so this covers the async reads too.
+    """
+    if not context.execution_options.get("prepare") or context.dialect.name != "postgresql" \
+            or context.dialect.driver not in PSYCOPG_DRIVERS:
+        return False
+
+    # Preparing is disabled for this connection
+    if cursor.connection.prepare_threshold is None:
+        return False
+
+    cursor.execute(statement, parameters, prepare=True)
+    return True
+
+
+def install_prepared_statements() -> None:
+    """Attaches the listener to all engines.  Safe to call more than once."""
+    if event.contains(Engine, "do_execute", _execute_prepared):
+        return
+
+    event.listen(Engine, "do_execute", _execute_prepared)
+    logger.debug("Installed the prepared statement listener")
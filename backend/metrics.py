@@ -0,0 +1,250 @@
+"""
+In-process metrics, exposed in the Prometheus text format by the /metrics endpoint.
+
+Each metric guards its values with its own lock, and recording a request only touches a few
+dicts, so these stay on in production.  Values are per process: with multiple workers, each one
+reports its own series & Prometheus sums them up.
+
+  - http_requests_total               requests, by resource class, method & status code
+  - http_request_errors_total         requests that returned a 5xx, by resource class & method
+  - http_request_duration_seconds     latency histogram, by resource class & method.  Streamed
+                                      responses are timed until the last row is sent.
+  - http_response_rows                rows serialized per request, by resource class & method
+  - db_pool_checkout_wait_seconds     time spent waiting for a connection from the pool
+  - db_pool_checkout_timeouts_total   checkouts that gave up after waiting DB_POOL_TIMEOUT
+  - db_pool_connections_in_use        connections currently checked out of the pool
+  - db_pool_connections_idle          connections currently sitting in the pool
+  - db_pool_overflow                  connections open beyond the pool size; negative while the
+                                      pool hasn't opened all of its connections yet
+  - db_pool_size                      the configured pool size
+  - typeahead_index_households        households in the nickname typeahead index, once it's loaded
+  - typeahead_index_bytes             approximate memory held by the typeahead index
+"""
+from logging import getLogger
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+from typing import Callable
+from flask import Flask, current_app, g, has_app_context, has_request_context, request
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from backend import db
+
+logger = getLogger()
+
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 100000)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter(object):
+    """A value that only goes up, per combination of labels."""
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: tuple = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, label_values: tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self) -> list:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in values]
+
+
+class Histogram(object):
+    """Counts observations into buckets, per combination of labels."""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self._values = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, label_values: tuple = ()) -> None:
+        # Only the observation's own bucket is incremented; they're summed up when rendered
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(label_values)
+            if counts is None:
+                # One count per bucket, plus +Inf, then the sum of the observed values
+                counts = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def samples(self) -> list:
+        with self._lock:
+            values = [(key, list(counts)) for key, counts in self._values.items()]
+
+        output = []
+        for key, counts in values:
+            cumulative = 0
+            for upper_bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                bucket_label = f'le="{upper_bound}"'
+                output.append(f"{self.name}_bucket{_format_labels(self.labels, key, bucket_label)} {cumulative}")
+            output.append(f"{self.name}_sum{_format_labels(self.labels, key)} {counts[-1]}")
+            output.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return output
+
+
+class Gauge(object):
+    """A value that's read when the metrics are rendered.  The callback returns None to skip it."""
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, callback: Callable):
+        self.name = name
+        self.description = description
+        self.callback = callback
+
+    def samples(self) -> list:
+        value = self.callback()
+        return [] if value is None else [f"{self.name} {value}"]
+
+
+class MetricsRegistry(object):
+    """The metrics rendered by the /metrics endpoint."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+requests_total = registry.register(Counter(
+    "http_requests_total", "Requests handled.", ("resource", "method", "status")))
+request_errors_total = registry.register(Counter(
+    "http_request_errors_total", "Requests that returned a 5xx status.", ("resource", "method")))
+request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Time spent handling each request.", ("resource", "method")))
+response_rows = registry.register(Histogram(
+    "http_response_rows", "Rows serialized per request.", ("resource", "method"), buckets=ROW_BUCKETS))
+pool_checkout_wait = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a connection from the pool.",
+    buckets=POOL_WAIT_BUCKETS))
+pool_checkout_timeouts = registry.register(Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that timed out waiting for a connection."))
+
+
+def _pool_stat(name: str) -> Callable:
+    """Reads a stat from the app's pool.  Only QueuePool tracks checkouts; SQLite's StaticPool doesn't."""
+    def read():
+        if not has_app_context():
+            return None
+        stat = getattr(db.engine.pool, name, None)
+        return stat() if stat else None
+    return read
+
+
+registry.register(Gauge("db_pool_connections_in_use", "Connections checked out of the pool.",
+                        _pool_stat("checkedout")))
+registry.register(Gauge("db_pool_connections_idle", "Connections available in the pool.",
+                        _pool_stat("checkedin")))
+registry.register(Gauge("db_pool_overflow", "Connections open beyond the pool size.",
+                        _pool_stat("overflow")))
+registry.register(Gauge("db_pool_size", "Configured size of the pool.",
+                        _pool_stat("size")))
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection, and whether it timed out."""
+
+    def _do_get(self):
+        started = perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_checkout_timeouts.inc()
+            raise
+        finally:
+            pool_checkout_wait.observe(perf_counter() - started)
+
+
+def count_serialized_rows(count: int) -> None:
+    """Adds to the number of rows serialized by the current request."""
+    if has_request_context():
+        g.rows_serialized = g.get("rows_serialized", 0) + count
+
+
+def stream_started() -> None:
+    """Defers recording the current request until its streamed response has been written."""
+    if has_request_context():
+        g.response_streaming = True
+
+
+def stream_finished(rows_written: int) -> None:
+    count_serialized_rows(rows_written)
+    if has_request_context():
+        g.response_streaming = False
+
+
+def _resource_name() -> str:
+    """The name of the Resource class handling the current request."""
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(getattr(view, "view_class", None), "__name__", request.endpoint or "unmatched")
+
+
+def register_metrics(app: Flask) -> None:
+    """Records every request's status, latency & serialized rows."""
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = perf_counter()
+
+    @app.after_request
+    def remember_status(response):
+        g.response_status = response.status_code
+        return response
+
+    # Streamed responses push the request context again while they're written, so this runs a
+    # second time once the last row is sent.  Those requests are recorded then.
+    @app.teardown_request
+    def record_request_metrics(exception=None):
+        if g.get("response_streaming") and exception is None:
+            return
+
+        started = g.pop("request_started", None)
+        if started is None:
+            return
+
+        labels = (_resource_name(), request.method)
+        status = 500 if exception else g.get("response_status", 500)
+
+        request_duration.observe(perf_counter() - started, labels)
+        requests_total.inc((*labels, str(status)))
+        if status >= 500:
+            request_errors_total.inc(labels)
+        if "rows_serialized" in g:
+            response_rows.observe(g.rows_serialized, labels)
+
+    logger.info("Request metrics enabled")
@@ -0,0 +1,130 @@
+"""
+Opt-in, per-request profiling.
+
+When PROFILING_ENABLED is set, requests sent with an `X-Profile: true` header are run under
+cProfile.  Each profiled request writes these files to PROFILING_DIRECTORY:
+  - <name>.pstats       raw profile; load with pstats, snakeviz, or flameprof
+  - <name>.summary.txt  the SQL statements issued & the time spent in each, the time spent in
+                        each package (sqlalchemy, flask_restful, logging, the app's own modules...),
+                        and the functions with the highest cumulative time
+The file name is returned in the `X-Profile-Id` response header.
+
+The whole response is built inside the profiler, including streamed responses, so serialization
+time is attributed to the request.  Requests without the header aren't affected.
+"""
+from logging import getLogger
+from cProfile import Profile
+from datetime import datetime
+from io import StringIO
+from os import makedirs, path
+from time import perf_counter
+import pstats
+import re
+from backend.sql_recorder import install, record_statements
+
+logger = getLogger()
+
+# Number of functions listed in each summary
+SUMMARY_FUNCTIONS = 40
+
+# The app's own modules are reported by top-level folder, i.e.: routes, helpers
+APP_ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+
+
+def package_of(filename: str) -> str:
+    """Returns the package a profiled function belongs to."""
+    if filename.startswith(APP_ROOT):
+        return f"app: {path.relpath(filename, APP_ROOT).split(path.sep)[0].removesuffix('.py')}"
+
+    match = re.search(r"[/\\]site-packages[/\\]([^/\\]+)", filename)
+    if match:
+        return match.group(1).removesuffix(".py")
+
+    match = re.search(r"[/\\]python3\.\d+[/\\]([^/\\]+)", filename)
+    if match:
+        return match.group(1).removesuffix(".py")
+
+    # C functions, i.e.: {method 'execute' of 'sqlite3.Cursor' objects}
+    return "builtins"
+
+
+def time_by_package(stats: pstats.Stats) -> list:
+    """Returns (package, ms) pairs of the time spent inside each package's own functions, slowest first."""
+    totals = {}
+    for (filename, line, function), (_, _, own_time, _, _) in stats.stats.items():
+        package = package_of(filename)
+        totals[package] = totals.get(package, 0) + own_time * 1000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+class ProfilingMiddleware(object):
+    """WSGI middleware that profiles the requests which ask for it."""
+
+    def __init__(self, wsgi_app, output_directory: str):
+        self.wsgi_app = wsgi_app
+        self.output_directory = output_directory
+        makedirs(output_directory, exist_ok=True)
+        install()
+        logger.info("Profiling enabled for requests with an X-Profile header, writing to %s", output_directory)
+
+    def __call__(self, environ, start_response):
+        if environ.get("HTTP_X_PROFILE", "").lower() not in ("1", "true", "yes"):
+            return self.wsgi_app(environ, start_response)
+
+        response = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            response.update(status=status, headers=headers, exc_info=exc_info)
+
+        profiler = Profile()
+        with record_statements() as statements:
+            started = perf_counter()
+            profiler.enable()
+            try:
+                body_iterable = self.wsgi_app(environ, capture_start_response)
+                try:
+                    body = b"".join(body_iterable)
+                finally:
+                    if hasattr(body_iterable, "close"):
+                        body_iterable.close()
+            finally:
+                profiler.disable()
+            elapsed_ms = (perf_counter() - started) * 1000
+
+        name = self.write_results(environ, response["status"], profiler, statements, elapsed_ms)
+        start_response(response["status"], [*response["headers"], ("X-Profile-Id", name)], response["exc_info"])
+        return [body]
+
+    def write_results(self, environ, status: str, profiler: Profile, statements: list, elapsed_ms: float) -> str:
+        """Writes the profile & summary files for a request.  Returns their shared base name."""
+        method = environ.get("REQUEST_METHOD", "")
+        request_path = environ.get("PATH_INFO", "")
+        query_string = environ.get("QUERY_STRING", "")
+
+        safe_path = re.sub(r"[^A-Za-z0-9]+", "_", request_path).strip("_")
+        name = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{method}-{safe_path}"
+        profiler.dump_stats(path.join(self.output_directory, f"{name}.pstats"))
+
+        sql_ms = sum(statement.duration_ms for statement in statements)
+        summary = StringIO()
+        summary.write(f"{method} {request_path}{'?' + query_string if query_string else ''} -> {status}\n")
+        summary.write(f"Total: {elapsed_ms:.2f} ms | SQL: {len(statements)} statements, {sql_ms:.2f} ms\n\n")
+
+        summary.write("SQL statements\n")
+        for statement in statements:
+            summary.write(f"{statement.duration_ms:9.2f} ms  {' '.join(statement.statement.split())}\n")
+            summary.write(f"{'':14}parameters: {statement.parameters}\n")
+
+        stats = pstats.Stats(profiler, stream=summary)
+        summary.write("\nTime spent in each package's own functions\n")
+        for package, package_ms in time_by_package(stats):
+            summary.write(f"{package_ms:9.2f} ms  {package}\n")
+
+        summary.write("\nFunctions by cumulative time\n")
+        stats.sort_stats("cumulative").print_stats(SUMMARY_FUNCTIONS)
+
+        with open(path.join(self.output_directory, f"{name}.summary.txt"), "w") as summary_file:
+            summary_file.write(summary.getvalue())
+
+        logger.info(f"Profiled {method} {request_path} in {elapsed_ms:.2f} ms, saved as {name}")
+        return name
@@ -0,0 +1,93 @@
+"""
+Counts the SQL statements issued by each request & the time spent waiting on the db, and flags
+the N+1 pattern: the same statement run over & over with different parameters, typically from
+a lazy relationship being loaded inside a loop.
+
+When QUERY_STATS_ENABLED is set, every response carries these headers:
+  - X-Query-Count:    number of statements issued
+  - X-Query-Time-Ms:  total time spent executing them
+  - X-Query-Repeats:  only when an N+1 pattern is detected; the most times a statement was repeated
+Statements issued while a streamed response is being sent aren't included, since the headers
+have already gone out by then.
+
+`max_queries()` asserts a query budget for a block of code, i.e.: a request sent via a test client.
+"""
+from logging import getLogger
+from collections import Counter
+from contextlib import contextmanager
+from flask import Flask, g
+from backend.sql_recorder import install, record_statements, start_recording, stop_recording
+
+logger = getLogger()
+
+
+def find_repeated_statements(statements: list, threshold: int) -> list:
+    """
+    Returns (statement, executions) for each statement that ran at least `threshold` times with
+    different parameters, most repeated first.
+    """
+    executions = Counter(statement.statement for statement in statements)
+    repeated = []
+    for text, count in executions.most_common():
+        if count < threshold:
+            break
+
+        # Re-running the exact same query isn't an N+1, just a missing cache
+        distinct_parameters = {repr(statement.parameters) for statement in statements if statement.statement == text}
+        if len(distinct_parameters) > 1:
+            repeated.append((text, count))
+
+    return repeated
+
+
+def register_query_stats(app: Flask) -> None:
+    """Records the statements issued by each request & reports them in the response headers."""
+    install()
+    threshold = app.config["N_PLUS_ONE_THRESHOLD"]
+
+    @app.before_request
+    def start_query_stats():
+        g.sql_statements, g.sql_recording_token = start_recording()
+
+    @app.after_request
+    def add_query_stats_headers(response):
+        statements = g.get("sql_statements")
+        if statements is None:
+            return response
+
+        response.headers["X-Query-Count"] = str(len(statements))
+        response.headers["X-Query-Time-Ms"] = f"{sum(statement.duration_ms for statement in statements):.2f}"
+
+        repeated = find_repeated_statements(statements, threshold)
+        if repeated:
+            response.headers["X-Query-Repeats"] = str(repeated[0][1])
+            for text, count in repeated:
+                logger.warning(f"Possible N+1 queries: statement ran {count} times in one request: "
+                               f"{' '.join(text.split())}")
+
+        return response
+
+    @app.teardown_request
+    def stop_query_stats(exception=None):
+        token = g.pop("sql_recording_token", None)
+        if token is not None:
+            stop_recording(token)
+
+    logger.info("Query stats enabled, flagging statements repeated %s+ times", threshold)
+
+
+@contextmanager
+def max_queries(limit: int):
+    """
+    Raises an AssertionError, listing the statements, when the block issues more than `limit` statements.
+
+        with max_queries(2):
+            client.get("/api/v1/all_households")
+    """
+    install()
+    with record_statements() as statements:
+        yield statements
+
+    if len(statements) > limit:
+        issued = "\n".join(f"  {' '.join(statement.statement.split())}" for statement in statements)
+        raise AssertionError(f"Expected at most {limit} queries, but {len(statements)} were issued:\n{issued}")
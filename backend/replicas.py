@@ -0,0 +1,90 @@
+"""
+Routes the reads to read replicas & everything else to the primary database.
+
+Each URI in POSTGRES_DB_REPLICAS (or POSTGRES_DB_REPLICAS_DEV) becomes a `replica_<n>` bind.  The
+queries of a GET/HEAD request run on one of the replicas, picked at random for the whole request so
+that its queries see the same snapshot.  Other methods, and anything flushed or written during a
+GET, go to the primary.
+
+Replicas lag behind the primary, so a client that just wrote something could read its old version
+back from a replica.  A successful write marks the client's session (Flask's signed cookie) as
+pinned to the primary for REPLICA_PIN_SECONDS, which should cover the worst replication lag.  The
+session is signed with SECRET_KEY, so every worker & instance must share the same key for the pin to
+be honoured.
+"""
+from logging import getLogger
+from random import choice
+from time import time
+from flask import Flask, Response, current_app, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Delete, Insert, Update
+
+logger = getLogger()
+
+REPLICA_BIND_PREFIX = "replica_"
+READ_METHODS = ("GET", "HEAD")
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+# Key in the client's session holding the time until which its reads go to the primary
+PINNED_UNTIL_KEY = "primary_until"
+
+
+def replica_binds(uris: str) -> dict:
+    """Returns the SQLALCHEMY_BINDS entries for a comma-separated list of replica URIs."""
+    return {f"{REPLICA_BIND_PREFIX}{i}": uri
+            for i, uri in enumerate(uri.strip() for uri in uris.split(",") if uri.strip())}
+
+
+def replica_keys(binds: dict) -> list:
+    return [key for key in binds if key and key.startswith(REPLICA_BIND_PREFIX)]
+
+
+def is_pinned_to_primary() -> bool:
+    return session.get(PINNED_UNTIL_KEY, 0) > time()
+
+
+def reads_from_replica() -> bool:
+    """Whether the current request's queries may be sent to a replica."""
+    return has_request_context() and request.method in READ_METHODS and not is_pinned_to_primary()
+
+
+class RoutingSession(Session):
+    """Session that sends the reads of GET requests to a replica, when any are configured."""
+
+    _replica = None
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not isinstance(clause, (Insert, Update, Delete)):
+            # The pin is only read once there's a replica to use, since reading the session cookie
+            # adds `Vary: Cookie` to the response, which defeats shared caches
+            replica = self.choose_replica()
+            if replica is not None and reads_from_replica():
+                return replica
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def choose_replica(self):
+        """The replica this session reads from, if any are configured."""
+        if self._replica is None:
+            keys = replica_keys(self._db.engines)
+            if keys:
+                self._replica = self._db.engines[choice(keys)]
+        return self._replica
+
+    def close(self) -> None:
+        # Pick again for the next request
+        self._replica = None
+        super().close()
+
+
+def pin_after_write(response: Response) -> Response:
+    """Pins the client to the primary after a successful write, so it reads its own changes."""
+    if request.method in WRITE_METHODS and response.status_code < 400:
+        session[PINNED_UNTIL_KEY] = time() + current_app.config["REPLICA_PIN_SECONDS"]
+    return response
+
+
+def register_replicas(app: Flask) -> None:
+    app.after_request(pin_after_write)
+    logger.info(f"Routing reads to {len(replica_keys(app.config['SQLALCHEMY_BINDS']))} replicas; "
+                f"writers are pinned to the primary for {app.config['REPLICA_PIN_SECONDS']}s")
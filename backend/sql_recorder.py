@@ -0,0 +1,80 @@
+"""
+Records the SQL statements issued while a block of code runs, along with the time spent in each.
+
+Listeners are attached to every Engine by `install()`, and only do any work while a recording is
+active.  Recordings are tracked in a context variable, so concurrent requests on other threads
+don't see each other's statements.  Recordings can be nested, i.e.: a test asserting a query count
+around a request that's also recorded by the per-request query stats; each one sees every statement.
+"""
+from logging import getLogger
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from time import perf_counter
+from typing import NamedTuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = getLogger()
+
+# The lists of the recordings that are currently active
+_recordings = ContextVar("sql_recordings", default=())
+
+
+class RecordedStatement(NamedTuple):
+    """A single statement sent to the db."""
+    statement: str
+    parameters: object
+    duration_ms: float
+
+
+def start_recording() -> tuple:
+    """Starts recording.  Returns the list the statements are added to & the token to stop recording with."""
+    statements = []
+    token = _recordings.set((*_recordings.get(), statements))
+    return statements, token
+
+
+def stop_recording(token: Token) -> None:
+    _recordings.reset(token)
+
+
+@contextmanager
+def record_statements():
+    """Yields a list that's filled with the statements issued inside the `with` block."""
+    statements, token = start_recording()
+    try:
+        yield statements
+    finally:
+        stop_recording(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _recordings.get():
+        conn.info.setdefault("statement_started", []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    recordings = _recordings.get()
+    started = conn.info.get("statement_started")
+    if recordings and started:
+        recorded = RecordedStatement(statement, parameters, (perf_counter() - started.pop()) * 1000)
+        for statements in recordings:
+            statements.append(recorded)
+
+
+def _handle_error(exception_context) -> None:
+    # after_cursor_execute isn't called for failed statements
+    started = exception_context.connection.info.get("statement_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def install() -> None:
+    """Attaches the listeners to all engines.  Safe to call more than once."""
+    if event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    logger.debug("Installed the SQL statement recorder")
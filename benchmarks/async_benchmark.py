@@ -0,0 +1,131 @@
+"""
+Compares the sync server (gunicorn gthread, gunicorn.conf.py) with the async read path (uvicorn
+asgi:app) under a growing number of concurrent clients, using the same read mix as load_test.py.
+
+Each server runs the same number of worker processes.  With gthread, a worker can only wait on as
+many queries as it has threads; with the async read path, a worker can have many reads in flight
+on one event loop, up to its pool size.  The difference shows once the clients outnumber the
+threads, and grows with the db's latency, so run this against Postgres on another host for
+realistic numbers.  The aiosqlite driver used for the default temporary SQLite file runs each
+query on its own thread, which understates the async path's gains.
+
+Usage:
+    python -m benchmarks.async_benchmark --clients 8,32,64 --duration 15
+    python -m benchmarks.async_benchmark --database postgresql+psycopg://... --skip-seed
+"""
+from argparse import ArgumentParser
+from multiprocessing import Pool
+from os import environ, path
+from subprocess import Popen
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import json
+import sys
+
+from benchmarks.load_test import REPO_ROOT, percentile, run_client, wait_for_server
+
+SERVERS = ("gunicorn", "uvicorn")
+
+
+def server_command(server: str, args) -> list:
+    if server == "gunicorn":
+        return [sys.executable, "-m", "gunicorn", "--config", path.join(REPO_ROOT, "gunicorn.conf.py"),
+                "main:app"]
+    return [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(args.port),
+            "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"]
+
+
+def measure(server: str, clients: int, args, sizes: dict, log_directory: str) -> dict:
+    """Starts the server & returns the results of one load run with this many clients."""
+    env = {**environ,
+           "POSTGRES_DB_CONNECTION_DEV": args.database,
+           "USE_PROD_DATABASE": "False",
+           "WEB_CONCURRENCY": str(args.workers),
+           "GUNICORN_THREADS": str(args.threads),
+           "GUNICORN_BIND": f"127.0.0.1:{args.port}",
+           "ASGI_SYNC_THREADS": str(args.threads),
+           "LOG_LEVEL": "WARNING",
+           "LOG_DIRECTORY": log_directory,
+           "QUERY_STATS_ENABLED": "False",
+           "PYTHONPATH": REPO_ROOT}
+    process = Popen(server_command(server, args), cwd=REPO_ROOT, env=env)
+    try:
+        wait_for_server(args.port, process)
+
+        with Pool(clients) as pool:
+            pool.map(run_client, [(args.port, sizes, args.warmup, i) for i in range(clients)])
+            started = perf_counter()
+            results = pool.map(run_client, [(args.port, sizes, args.duration, args.seed + i)
+                                             for i in range(clients)])
+            elapsed = perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+    latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+    return {"server":            server,
+            "clients":           clients,
+            "requests":          len(latencies),
+            "errors":            sum(errors for _, errors in results),
+            "throughput_per_s":  round(len(latencies) / elapsed, 1),
+            "p50_ms":            round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+            "p99_ms":            round(percentile(latencies, 99) * 1000, 2) if latencies else None}
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", default="8,32", help="comma-separated client counts to test")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for both servers")
+    parser.add_argument("--threads", type=int, default=4,
+                        help="gthread threads per worker, and the async path's threads for writes")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to measure each run")
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--households", type=int, default=1000)
+    parser.add_argument("--database", default=environ.get("BENCHMARK_DATABASE_URI"),
+                        help="defaults to a temporary SQLite file")
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="save the results to this JSON file")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as temp_directory:
+        args.database = args.database or f"sqlite:///{path.join(temp_directory, 'async_benchmark.db')}"
+
+        # Config reads the database URI at import time, so it must be set before the app is imported
+        environ["POSTGRES_DB_CONNECTION_DEV"] = args.database
+        environ["USE_PROD_DATABASE"] = "False"
+        environ.setdefault("LOG_DIRECTORY", temp_directory)
+
+        from main import app
+        from backend import db
+        from benchmarks.data_generator import seed, table_sizes
+
+        if args.skip_seed:
+            sizes = table_sizes(args.households)
+        else:
+            with app.app_context():
+                db.create_all()
+                sizes = seed(args.households, args.seed)
+                db.session.remove()
+                db.engine.dispose()
+
+        results = []
+        for clients in (int(count) for count in args.clients.split(",")):
+            runs = {server: measure(server, clients, args, sizes, temp_directory) for server in SERVERS}
+            for server, result in runs.items():
+                result["speedup"] = round(result["throughput_per_s"] / runs["gunicorn"]["throughput_per_s"], 2)
+                results.append(result)
+                print(f"{server:>8} {clients:>4} clients: {result['throughput_per_s']:>8} req/s   "
+                      f"p50 {result['p50_ms']} ms   p99 {result['p99_ms']} ms   {result['errors']} errors   "
+                      f"{result['speedup']}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"workers": args.workers, "threads": args.threads, "duration": args.duration,
+                       "results": results}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
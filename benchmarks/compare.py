@@ -0,0 +1,60 @@
+"""
+Compares two endpoint benchmark result files and flags the scenarios that got slower.
+
+Usage:
+    python -m benchmarks.compare before.json after.json --threshold 10
+"""
+from argparse import ArgumentParser
+import json
+import sys
+
+# Metrics where a higher number is worse
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "peak_memory_kib")
+
+
+def percent_change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="percent increase in p50 or p95 that counts as a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as baseline_file, open(args.candidate) as candidate_file:
+        baseline, candidate = json.load(baseline_file), json.load(candidate_file)
+
+    for label, results in (("baseline", baseline), ("candidate", candidate)):
+        metadata = results["metadata"]
+        print(f"{label:<10} {metadata['revision']} | {metadata['database']} | scale={metadata['scale']} | "
+              f"{metadata['requests']} requests | {metadata['timestamp']}")
+    if baseline["metadata"]["table_rows"] != candidate["metadata"]["table_rows"]:
+        print("Warning: the two runs used different datasets")
+
+    print(f"\n{'scenario':<42}" + "".join(f"{metric:>18}" for metric in METRICS) + f"{'errors':>10}")
+    regressions = []
+    for name, after in candidate["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<42}  (new scenario)")
+            continue
+
+        changes = {metric: percent_change(before[metric], after[metric]) for metric in METRICS}
+        print(f"{name:<42}"
+              + "".join(f"{after[metric]:>10.2f} {changes[metric]:>+6.1f}%" for metric in METRICS)
+              + f"{before['errors']:>5} ->{after['errors']:>3}")
+
+        if max(changes["p50_ms"], changes["p95_ms"]) > args.threshold or after["errors"] > before["errors"]:
+            regressions.append(name)
+
+    if regressions:
+        print(f"\nRegressions above {args.threshold}%: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\nNo regressions above {args.threshold}%")
+
+
+if __name__ == "__main__":
+    main()
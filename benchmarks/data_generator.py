@@ -0,0 +1,189 @@
+"""
+Generates a synthetic, but realistic-looking, dataset for the benchmarks.
+
+Scales are expressed as the number of households; the other tables are sized relative to it:
+  - 1.25 addresses per household (most have one, some have a previous address)
+  - 1 event per 1,000 households (min 10), split between holidays & gift-giving occasions
+  - 0.5 gifts per household
+  - 1 card per household
+Output is deterministic for a given seed, so two benchmark runs see the same data.
+"""
+from datetime import date, datetime, timedelta, timezone
+from random import Random
+from sqlalchemy import insert
+from backend import db
+from models.models import Address, Household, Event, Gift, Card, Picklists
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1M": 1_000_000}
+
+# Rows per INSERT statement
+CHUNK_SIZE = 10_000
+
+FIRST_NAMES = ("Alex", "Jordan", "Sam", "Pat", "Taylor", "Morgan", "Casey", "Jamie", "Riley", "Avery",
+               "Chris", "Dana", "Robin", "Drew", "Quinn", "Reese", "Cameron", "Skyler", "Emerson", "Rowan")
+SURNAMES = ("Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez",
+            "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore",
+            "Jackson", "Martin", "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Lewis")
+STREETS = ("Main St", "Oak Ave", "Maple Dr", "Cedar Ln", "Pine St", "Elm St", "Washington Blvd",
+           "Lakeview Dr", "Hillcrest Rd", "Park Pl", "Sunset Blvd", "Highland Ave")
+CITIES = (("Seattle", "WA", "981"), ("Portland", "OR", "972"), ("Denver", "CO", "802"),
+          ("Austin", "TX", "787"), ("Chicago", "IL", "606"), ("Boston", "MA", "021"),
+          ("Atlanta", "GA", "303"), ("San Diego", "CA", "921"), ("Madison", "WI", "537"))
+
+RELATIONSHIPS = ("Friends", "Family", "Work", "Neighbors")
+RELATIONSHIP_DETAILS = ("College friends", "Cousins", "Work friends", "Neighbors", "Aunt & Uncle",
+                        "Grandparents", "Book club", "Soccer team")
+FAMILY_SIDES = ("Mine", "Partner's", "Both")
+KNOWN_FROM = ("College", "Work", "Church", "The neighborhood", "Kids' school", "Family")
+GIFT_TYPES = ("Physical", "Cash", "Gift card", "Experience")
+CARD_TYPES = ("Holiday", "Thank You", "Birthday", "Sympathy")
+EVENT_NAMES = ("Holiday Cards", "Wedding", "Baby Shower", "Birthday Party", "Housewarming", "Graduation")
+
+
+def table_sizes(households: int) -> dict:
+    """Returns the number of rows to generate for each table."""
+    return {"household": households,
+            "address":   households + households // 4,
+            "event":     max(10, households // 1000),
+            "gift":      households // 2,
+            "card":      households}
+
+
+def _insert_in_chunks(model, rows) -> None:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            db.session.execute(insert(model), chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(insert(model), chunk)
+    db.session.commit()
+
+
+def _households(rng: Random, count: int, now: datetime):
+    for i in range(1, count + 1):
+        first_names = f"{rng.choice(FIRST_NAMES)} & {rng.choice(FIRST_NAMES)}"
+        surname = rng.choice(SURNAMES)
+        yield {"id":                          i,
+               "nickname":                    f"The {surname}s #{i}",
+               "first_names":                 first_names,
+               "surname":                     surname,
+               "address_to":                  f"The {surname} Family",
+               "formal_name":                 f"Mr. & Mrs. {first_names.split(' & ')[0]} {surname}",
+               "known_from":                  rng.choice(KNOWN_FROM),
+               "relationship":                rng.choice(RELATIONSHIP_DETAILS),
+               "relationship_type":           rng.choice(RELATIONSHIPS),
+               "family_side":                 rng.choice(FAMILY_SIDES),
+               "kids":                        ", ".join(rng.sample(FIRST_NAMES, rng.randint(0, 3))) or None,
+               "pets":                        rng.choice((None, None, "Biscuit", "Max", "Luna")),
+               "should_receive_holiday_card": rng.random() < 0.6,
+               "is_relevant":                 rng.random() < 0.9,
+               "created_date":                now - timedelta(days=rng.randint(0, 3650)),
+               "last_modified":               now - timedelta(days=rng.randint(0, 365)),
+               "notes":                       rng.choice((None, None, "Send photos of the kids",
+                                                          "Prefers email; mail the holiday card anyway"))}
+
+
+def _addresses(rng: Random, count: int, households: int, now: datetime):
+    for i in range(1, count + 1):
+        # The first pass gives every household a current address; the rest are older addresses
+        is_current = i <= households
+        household_id = i if is_current else rng.randint(1, households)
+        city, state, zip_prefix = rng.choice(CITIES)
+        line_1 = f"{rng.randint(1, 9999)} {rng.choice(STREETS)}"
+        line_2 = rng.choice((None, None, None, f"Apt {rng.randint(1, 400)}"))
+        zip_code = f"{zip_prefix}{rng.randint(0, 99):02d}"
+        yield {"id":                            i,
+               "household_id":                  household_id,
+               "line_1":                        line_1,
+               "line_2":                        line_2,
+               "city":                          city,
+               "state":                         state,
+               "zip":                           zip_code,
+               "country":                       "United States",
+               "full_address":                  ", ".join(filter(None, (line_1, line_2, city, state))) + f" {zip_code}",
+               "is_current":                    is_current,
+               "is_likely_to_change":           rng.random() < 0.1,
+               "mail_the_card_to_this_address": is_current,
+               "created_date":                  now - timedelta(days=rng.randint(0, 3650)),
+               "last_modified":                 now - timedelta(days=rng.randint(0, 365)),
+               "notes":                         None}
+
+
+def _events(rng: Random, count: int, now: datetime):
+    for i in range(1, count + 1):
+        year = now.year - (count - i) % 15
+        name = rng.choice(EVENT_NAMES)
+        yield {"id":            i,
+               "name":          f"{name} {year}",
+               "date":          date(year, 12, 1) if name == "Holiday Cards" else date(year, rng.randint(1, 12), 15),
+               "year":          year,
+               "is_archived":   year < now.year - 1,
+               "created_date":  now - timedelta(days=rng.randint(0, 3650)),
+               "last_modified": now - timedelta(days=rng.randint(0, 365)),
+               "notes":         None}
+
+
+def _gifts(rng: Random, count: int, households: int, events: int, now: datetime):
+    for i in range(1, count + 1):
+        gift_type = rng.choice(GIFT_TYPES)
+        yield {"id":                    i,
+               "event_id":              rng.randint(1, events),
+               "household_id":          rng.randint(1, households),
+               "households":            1,
+               "description":           f"{gift_type} from the registry",
+               "type":                  gift_type,
+               "origin":                rng.choice(("Registry", "Mailed", "In person")),
+               "date":                  (now - timedelta(days=rng.randint(0, 3650))).date(),
+               "should_a_card_be_sent": rng.random() < 0.95,
+               "created_date":          now - timedelta(days=rng.randint(0, 3650)),
+               "last_modified":         now - timedelta(days=rng.randint(0, 365)),
+               "notes":                 None}
+
+
+def _cards(rng: Random, count: int, households: int, events: int, gifts: int, now: datetime):
+    for i in range(1, count + 1):
+        # Every household's current address has the same id as the household
+        household_id = rng.randint(1, households)
+        was_sent = rng.random() < 0.7
+        yield {"id":            i,
+               "type":          rng.choice(CARD_TYPES),
+               "was_returned":  rng.random() < 0.02,
+               "gift_id":       rng.randint(1, gifts) if gifts and rng.random() < 0.3 else None,
+               "event_id":      rng.randint(1, events),
+               "household_id":  household_id,
+               "address_id":    household_id,
+               "date_sent":     (now - timedelta(days=rng.randint(0, 3650))).date() if was_sent else None,
+               "created_date":  now - timedelta(days=rng.randint(0, 3650)),
+               "last_modified": now - timedelta(days=rng.randint(0, 365)),
+               "notes":         None}
+
+
+def seed(households: int, random_seed: int = 42) -> dict:
+    """Inserts the synthetic dataset into empty tables.  Returns the number of rows in each table."""
+    rng = Random(random_seed)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    sizes = table_sizes(households)
+
+    db.session.execute(insert(Picklists), [{
+        "version":                     1,
+        "household_relationship":      ",".join(RELATIONSHIP_DETAILS),
+        "household_relationship_type": ",".join(RELATIONSHIPS),
+        "household_family_side":       ",".join(FAMILY_SIDES),
+        "card_type":                   ",".join(CARD_TYPES)}])
+
+    _insert_in_chunks(Household, _households(rng, sizes["household"], now))
+    _insert_in_chunks(Address, _addresses(rng, sizes["address"], households, now))
+    _insert_in_chunks(Event, _events(rng, sizes["event"], now))
+    _insert_in_chunks(Gift, _gifts(rng, sizes["gift"], households, sizes["event"], now))
+    _insert_in_chunks(Card, _cards(rng, sizes["card"], households, sizes["event"], sizes["gift"], now))
+
+    # Explicit ids don't advance Postgres' sequences
+    if db.engine.dialect.name == "postgresql":
+        for table in sizes:
+            db.session.execute(db.text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                                       f"(SELECT max(id) FROM {table}))"))
+        db.session.commit()
+
+    return sizes
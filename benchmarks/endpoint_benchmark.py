@@ -0,0 +1,210 @@
+"""
+Drives every resource through the Flask test client against a seeded synthetic dataset, and
+reports p50/p95/p99 latency, throughput, and peak memory for each scenario.
+
+Runs against an in-memory SQLite database unless --database or BENCHMARK_DATABASE_URI is set.
+Point it at a Postgres database with the migrations applied for numbers that reflect production;
+use --skip-seed to reuse a database that was seeded by a previous run.
+
+Results are saved as JSON so two runs can be compared with benchmarks.compare.
+
+Usage:
+    python -m benchmarks.endpoint_benchmark --scale 1k --requests 200 --output before.json
+    python -m benchmarks.endpoint_benchmark --scale 100k --database postgresql+psycopg://... --skip-seed
+"""
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from os import environ
+from random import Random
+from statistics import mean
+from subprocess import run
+from time import perf_counter
+from typing import Callable, NamedTuple, Optional
+import json
+import platform
+import tracemalloc
+
+
+class Scenario(NamedTuple):
+    """A single request to benchmark.  `build` returns the (url, json body) for a request."""
+    name: str
+    method: str
+    build: Callable
+    expected_status: int = 200
+
+
+def percentile(sorted_values: list, percent: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, round(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def build_scenarios(rng: Random, sizes: dict, client) -> list:
+    """Returns the scenarios for every resource, using random ids within the seeded tables."""
+    def random_id(table: str) -> int:
+        return rng.randint(1, sizes[table])
+
+    def page(url: str, table: str) -> Callable:
+        return lambda: (f"{url}{'&' if '?' in url else '?'}after_id={random_id(table)}", None)
+
+    def record(url: str, table: str) -> Callable:
+        return lambda: (url, {"id": random_id(table)})
+
+    def update(url: str, table: str, **overrides) -> Callable:
+        # Round-trips a record the way the front end does: read it, then PUT it back with an edit
+        def build():
+            body = client.get(url, json={"id": random_id(table)}).get_json()
+            for key in ("created_date", "last_modified"):
+                body.pop(key, None)
+            body.update(overrides)
+            body["notes"] = f"Benchmarked at {datetime.now(timezone.utc).isoformat()}"
+            return url, body
+        return build
+
+    return [
+        Scenario("all_households page", "GET", page("/api/v1/all_households?limit=100", "household")),
+        Scenario("all_households holiday list by surname", "GET",
+                 lambda: ("/api/v1/all_households?should_receive_holiday_card=true&is_relevant=true"
+                          "&sort=surname&limit=100", None)),
+        Scenario("all_households sparse fields", "GET",
+                 page("/api/v1/all_households?fields=id,nickname,surname&limit=100", "household")),
+        Scenario("household GET", "GET", record("/api/v1/household", "household")),
+        Scenario("household PUT", "PUT", update("/api/v1/household", "household")),
+
+        Scenario("all_addresses page", "GET", page("/api/v1/all_addresses?limit=100", "address")),
+        Scenario("all_addresses by household", "GET",
+                 lambda: (f"/api/v1/all_addresses?household_id={random_id('household')}", None)),
+        Scenario("address GET", "GET", record("/api/v1/address", "address")),
+        Scenario("address PUT", "PUT", update("/api/v1/address", "address")),
+
+        Scenario("all_events", "GET", lambda: ("/api/v1/all_events", None)),
+        Scenario("event GET", "GET", record("/api/v1/event", "event")),
+        Scenario("event PUT", "PUT", update("/api/v1/event", "event")),
+
+        Scenario("all_gifts by event", "GET",
+                 lambda: (f"/api/v1/all_gifts?event_id={random_id('event')}&limit=100", None)),
+        Scenario("gift GET", "GET", record("/api/v1/gift", "gift")),
+        Scenario("gift PUT", "PUT", update("/api/v1/gift", "gift")),
+        Scenario("thank_you_worksheet", "GET",
+                 lambda: (f"/api/v1/thank_you_worksheet?event_id={random_id('event')}", None)),
+
+        Scenario("all_cards by event", "GET",
+                 lambda: (f"/api/v1/all_cards?event_id={random_id('event')}&limit=100", None)),
+        Scenario("card GET", "GET", record("/api/v1/card", "card")),
+        Scenario("card PUT", "PUT", update("/api/v1/card", "card", status="Sent")),
+
+        Scenario("picklist_values", "GET", lambda: ("/api/v1/picklist_values", None)),
+    ]
+
+
+def send(client, scenario: Scenario) -> int:
+    url, body = scenario.build()
+    response = client.open(url, method=scenario.method, json=body)
+    response.get_data()
+    return response.status_code
+
+
+def run_scenario(client, scenario: Scenario, requests: int, warmup: int, memory_requests: int) -> dict:
+    """Times `requests` sequential requests, then measures peak allocations over a shorter traced run."""
+    for _ in range(warmup):
+        send(client, scenario)
+
+    timings = []
+    errors = 0
+    started = perf_counter()
+    for _ in range(requests):
+        # The read half of a round-trip PUT is part of building the request, not the measurement
+        url, body = scenario.build()
+        start = perf_counter()
+        response = client.open(url, method=scenario.method, json=body)
+        response.get_data()
+        timings.append((perf_counter() - start) * 1000)
+        errors += response.status_code != scenario.expected_status
+    elapsed = perf_counter() - started
+
+    # tracemalloc slows every allocation down, so it's kept out of the timed loop
+    tracemalloc.start()
+    for _ in range(memory_requests):
+        send(client, scenario)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    return {"method":          scenario.method,
+            "requests":        requests,
+            "errors":          errors,
+            "p50_ms":          round(percentile(timings, 50), 3),
+            "p95_ms":          round(percentile(timings, 95), 3),
+            "p99_ms":          round(percentile(timings, 99), 3),
+            "mean_ms":         round(mean(timings), 3),
+            "throughput_rps":  round(requests / sum(timings) * 1000, 1),
+            "wall_clock_s":    round(elapsed, 3),
+            "peak_memory_kib": round(peak / 1024, 1)}
+
+
+def git_revision() -> Optional[str]:
+    result = run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", choices=("1k", "100k", "1M"), default="1k",
+                        help="number of households to seed; other tables are sized relative to it")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per scenario")
+    parser.add_argument("--memory-requests", type=int, default=20, help="traced requests per scenario")
+    parser.add_argument("--database", default=environ.get("BENCHMARK_DATABASE_URI", "sqlite://"))
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the data already in --database")
+    parser.add_argument("--only", help="only run scenarios whose name contains this text")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the data & request ids")
+    parser.add_argument("--output", help="where to save the JSON results")
+    args = parser.parse_args()
+
+    # Config reads the database URI at import time, so it must be set before the app is imported
+    environ["POSTGRES_DB_CONNECTION_DEV"] = args.database
+    environ["USE_PROD_DATABASE"] = "False"
+
+    from main import app
+    from backend import db
+    from benchmarks.data_generator import SCALES, seed, table_sizes
+
+    with app.app_context():
+        if args.skip_seed:
+            sizes = {table: db.session.execute(db.text(f"SELECT max(id) FROM {table}")).scalar_one()
+                     for table in table_sizes(1)}
+        else:
+            db.create_all()
+            seed_started = perf_counter()
+            sizes = seed(SCALES[args.scale], args.seed)
+            print(f"Seeded {sum(sizes.values()):,} rows in {perf_counter() - seed_started:.1f}s: {sizes}")
+        db.session.remove()
+
+    client = app.test_client()
+    scenarios = [scenario for scenario in build_scenarios(Random(args.seed), sizes, client)
+                 if not args.only or args.only in scenario.name]
+
+    results = {}
+    print(f"{'scenario':<42}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'peak KiB':>10}{'errors':>8}")
+    for scenario in scenarios:
+        result = run_scenario(client, scenario, args.requests, args.warmup, args.memory_requests)
+        results[scenario.name] = result
+        print(f"{scenario.name:<42}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+              f"{result['throughput_rps']:>9.1f}{result['peak_memory_kib']:>10.1f}{result['errors']:>8}")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"metadata": {"timestamp":  datetime.now(timezone.utc).isoformat(),
+                                    "revision":   git_revision(),
+                                    "python":     platform.python_version(),
+                                    "database":   args.database.split("://")[0],
+                                    "scale":      args.scale,
+                                    "table_rows": sizes,
+                                    "requests":   args.requests,
+                                    "seed":       args.seed},
+                       "results": results}, output_file, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Load tests the production server (gunicorn.conf.py) with an increasing number of worker processes,
+to show how throughput scales across cores.
+
+For each worker count, gunicorn is started against a seeded database and a pool of client
+processes sends a mix of read requests over keep-alive connections for a fixed duration.  Reports
+throughput, p50/p99 latency and the speedup over the first worker count.
+
+The clients run on the same machine & compete with the workers for cores, so keep
+(workers + clients) within the core count, or use a file/Postgres database & run this on a larger
+machine than production.  SQLite serializes writes, so only reads are sent.
+
+Usage:
+    python -m benchmarks.load_test --workers 1,2,4,8 --clients 8 --duration 15
+    python -m benchmarks.load_test --database postgresql+psycopg://... --skip-seed
+"""
+from argparse import ArgumentParser
+from http.client import HTTPConnection
+from multiprocessing import Pool
+from os import environ, path
+from random import Random
+from socket import create_connection
+from subprocess import Popen
+from tempfile import TemporaryDirectory
+from time import perf_counter, sleep
+import json
+import sys
+
+REPO_ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+
+
+def percentile(sorted_values: list, percent: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, round(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def build_request(rng: Random, sizes: dict) -> tuple:
+    """Returns a random (url, json body) from the read mix."""
+    household_id = rng.randint(1, sizes["household"])
+    return rng.choice((
+        ("/api/v1/household", {"id": household_id}),
+        (f"/api/v1/all_households?limit=100&after_id={household_id}", None),
+        (f"/api/v1/all_addresses?household_id={household_id}", None),
+        ("/api/v1/event", {"id": rng.randint(1, sizes["event"])}),
+        ("/api/v1/gift", {"id": rng.randint(1, sizes["gift"])}),
+        ("/api/v1/picklist_values", None),
+    ))
+
+
+def run_client(options: tuple) -> tuple:
+    """Sends requests until the deadline.  Returns (latencies, errors)."""
+    port, sizes, duration, client_seed = options
+    rng = Random(client_seed)
+    connection = HTTPConnection("127.0.0.1", port, timeout=30)
+    latencies, errors = [], 0
+
+    deadline = perf_counter() + duration
+    while perf_counter() < deadline:
+        url, body = build_request(rng, sizes)
+        started = perf_counter()
+        try:
+            connection.request("GET", url, body=json.dumps(body) if body else None,
+                               headers={"Content-Type": "application/json"} if body else {})
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors += 1
+            latencies.append(perf_counter() - started)
+        except OSError:
+            errors += 1
+            connection.close()
+            connection = HTTPConnection("127.0.0.1", port, timeout=30)
+
+    connection.close()
+    return latencies, errors
+
+
+def wait_for_server(port: int, server: Popen, timeout: float = 60) -> None:
+    deadline = perf_counter() + timeout
+    while perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {server.returncode}")
+        try:
+            create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            sleep(0.2)
+    raise RuntimeError(f"gunicorn didn't start listening on port {port} within {timeout}s")
+
+
+def measure(workers: int, args, sizes: dict, log_directory: str) -> dict:
+    """Starts gunicorn with this many workers & returns the results of one load run."""
+    env = {**environ,
+           "POSTGRES_DB_CONNECTION_DEV": args.database,
+           "USE_PROD_DATABASE": "False",
+           "WEB_CONCURRENCY": str(workers),
+           "GUNICORN_THREADS": str(args.threads),
+           "GUNICORN_BIND": f"127.0.0.1:{args.port}",
+           "LOG_LEVEL": "WARNING",
+           "LOG_DIRECTORY": log_directory,
+           "QUERY_STATS_ENABLED": "False",
+           "PYTHONPATH": REPO_ROOT}
+    server = Popen([sys.executable, "-m", "gunicorn", "--config", path.join(REPO_ROOT, "gunicorn.conf.py"),
+                    "main:app"], cwd=REPO_ROOT, env=env)
+    try:
+        wait_for_server(args.port, server)
+
+        # Warm up every worker's connections & caches before measuring
+        with Pool(args.clients) as pool:
+            pool.map(run_client, [(args.port, sizes, args.warmup, i) for i in range(args.clients)])
+            started = perf_counter()
+            results = pool.map(run_client, [(args.port, sizes, args.duration, args.seed + i)
+                                             for i in range(args.clients)])
+            elapsed = perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+    latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+    return {"workers":           workers,
+            "requests":          len(latencies),
+            "errors":            sum(errors for _, errors in results),
+            "throughput_per_s":  round(len(latencies) / elapsed, 1),
+            "p50_ms":            round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+            "p99_ms":            round(percentile(latencies, 99) * 1000, 2) if latencies else None}
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts to test")
+    parser.add_argument("--threads", type=int, default=4, help="threads per worker")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent client processes")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to measure each worker count")
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--households", type=int, default=1000)
+    parser.add_argument("--database", default=environ.get("BENCHMARK_DATABASE_URI"),
+                        help="defaults to a temporary SQLite file")
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="save the results to this JSON file")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as temp_directory:
+        args.database = args.database or f"sqlite:///{path.join(temp_directory, 'load_test.db')}"
+
+        # Config reads the database URI at import time, so it must be set before the app is imported
+        environ["POSTGRES_DB_CONNECTION_DEV"] = args.database
+        environ["USE_PROD_DATABASE"] = "False"
+        environ.setdefault("LOG_DIRECTORY", temp_directory)
+
+        from main import app
+        from backend import db
+        from benchmarks.data_generator import seed, table_sizes
+
+        if args.skip_seed:
+            sizes = table_sizes(args.households)
+        else:
+            with app.app_context():
+                db.create_all()
+                sizes = seed(args.households, args.seed)
+                db.session.remove()
+                db.engine.dispose()
+
+        results = []
+        for workers in (int(count) for count in args.workers.split(",")):
+            result = measure(workers, args, sizes, temp_directory)
+            baseline = results[0]["throughput_per_s"] if results else result["throughput_per_s"]
+            result["speedup"] = round(result["throughput_per_s"] / baseline, 2)
+            results.append(result)
+            print(f"{workers:>3} workers x {args.threads} threads: {result['throughput_per_s']:>8} req/s   "
+                  f"p50 {result['p50_ms']} ms   p99 {result['p99_ms']} ms   {result['errors']} errors   "
+                  f"{result['speedup']}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"threads": args.threads, "clients": args.clients, "duration": args.duration,
+                       "results": results}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
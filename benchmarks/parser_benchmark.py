@@ -0,0 +1,80 @@
+"""
+Compares parsing request arguments with `reqparse.RequestParser` against the `Validator`s used by
+the endpoints, and checks that both return the same args.
+
+The reqparse parsers are rebuilt here with the same arguments as the validators.  Only parsing is
+timed; each request context is pushed once & reused.
+
+Usage:
+    python -m benchmarks.parser_benchmark --iterations 20000
+"""
+from argparse import ArgumentParser
+from os import environ
+from time import perf_counter
+
+# Config requires a database URI at import time; no queries are run by this benchmark
+environ.setdefault("POSTGRES_DB_CONNECTION_DEV", "sqlite://")
+
+from flask_restful import reqparse
+from main import app
+from routes.household import household_put_validator
+from helpers.pagination import pagination_validator
+from helpers.serializers import fields_validator
+from helpers.streaming import stream_validator
+
+HOUSEHOLD = {"id": 42, "nickname": "  The Smiths ", "first_names": "Pat & Sam", "surname": "Smith",
+             "address_to": "The Smith Family", "formal_name": "Mr. & Mrs. Smith", "relationship": "Work friends",
+             "relationship_type": "Friends", "known_from": "Work", "family_side": None, "kids": "Alex",
+             "pets": "Biscuit", "should_receive_holiday_card": "true", "is_relevant": True, "notes": "Met in 2019"}
+COLLECTION_QUERY = "/api/v1/all_households?after_id=100&limit=50&fields=id,nickname,surname"
+
+
+def to_request_parser(validator) -> reqparse.RequestParser:
+    """Builds the reqparse equivalent of a validator."""
+    parser = reqparse.RequestParser(trim=True)
+    for field in validator.fields:
+        options = {"type": field.type, "required": field.required, "nullable": field.nullable,
+                   "default": field.default, "store_missing": field.store_missing}
+        if field.location:
+            options["location"] = field.location
+        parser.add_argument(field.name, **options)
+    return parser
+
+
+def time_per_call(parse, iterations: int) -> float:
+    """Returns the mean time of `parse()`, in microseconds."""
+    started = perf_counter()
+    for _ in range(iterations):
+        parse()
+    return (perf_counter() - started) / iterations * 1_000_000
+
+
+def compare(label: str, validators: tuple, context, iterations: int) -> None:
+    parsers = tuple(to_request_parser(validator) for validator in validators)
+
+    with context:
+        expected = [dict(parser.parse_args()) for parser in parsers]
+        actual = [dict(validator.parse()) for validator in validators]
+        if expected != actual:
+            raise AssertionError(f"{label}: parsed args differ\n  reqparse:  {expected}\n  validator: {actual}")
+
+        baseline = time_per_call(lambda: [parser.parse_args() for parser in parsers], iterations)
+        candidate = time_per_call(lambda: [validator.parse() for validator in validators], iterations)
+
+    print(f"{label:<28} reqparse {baseline:8.1f} us   validator {candidate:8.1f} us   "
+          f"{baseline / candidate:5.1f}x faster")
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    compare("PUT /api/v1/household", (household_put_validator,),
+            app.test_request_context("/api/v1/household", method="PUT", json=HOUSEHOLD), args.iterations)
+    compare("GET /api/v1/all_households", (pagination_validator, stream_validator, fields_validator),
+            app.test_request_context(COLLECTION_QUERY), args.iterations)
+
+
+if __name__ == "__main__":
+    main()
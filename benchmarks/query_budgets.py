@@ -0,0 +1,82 @@
+"""
+Checks that each endpoint stays within its query budget, so per-row queries (N+1s) are caught
+before they reach production.  Exits with a non-zero status when any endpoint goes over.
+
+Runs against a small synthetic dataset in an in-memory SQLite database unless --database or
+BENCHMARK_DATABASE_URI is set.
+
+Usage:
+    python -m benchmarks.query_budgets
+"""
+from argparse import ArgumentParser
+from os import environ
+import sys
+
+# Max statements per request.  The read endpoints issue one query for their cache validators
+# plus one for the data.  The PUTs read the record, update it, and then re-read it when the id
+# is returned after the commit expires it.  Lower a budget whenever an endpoint gets cheaper.
+BUDGETS = (
+    ("GET", "/api/v1/all_households?limit=100", None, 2),
+    ("GET", "/api/v1/all_households?should_receive_holiday_card=true&sort=surname&fields=id,surname", None, 2),
+    ("GET", "/api/v1/all_households?stream=true", None, 2),
+    ("GET", "/api/v1/household", {"id": 1}, 2),
+    ("GET", "/api/v1/all_addresses?household_id=1", None, 2),
+    ("GET", "/api/v1/address", {"id": 1}, 2),
+    ("GET", "/api/v1/all_events", None, 2),
+    ("GET", "/api/v1/event", {"id": 1}, 2),
+    ("GET", "/api/v1/all_gifts?event_id=1", None, 2),
+    ("GET", "/api/v1/gift", {"id": 1}, 2),
+    ("GET", "/api/v1/thank_you_worksheet?event_id=1", None, 1),
+    ("GET", "/api/v1/all_cards?event_id=1", None, 2),
+    ("GET", "/api/v1/card", {"id": 1}, 2),
+    ("GET", "/api/v1/picklist_values", None, 1),
+    ("PUT", "/api/v1/household", {"id": 1, "nickname": "Budget check", "relationship_type": "Friends"}, 4),
+    ("PUT", "/api/v1/address", {"id": 1, "line_1": "1 Budget Ln", "city": "Seattle"}, 3),
+)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--households", type=int, default=200)
+    parser.add_argument("--database", default=environ.get("BENCHMARK_DATABASE_URI", "sqlite://"))
+    args = parser.parse_args()
+
+    # Config reads the database URI at import time, so it must be set before the app is imported
+    environ["POSTGRES_DB_CONNECTION_DEV"] = args.database
+    environ["USE_PROD_DATABASE"] = "False"
+
+    from main import app
+    from backend import db
+    from backend.query_stats import max_queries
+    from benchmarks.data_generator import seed
+    from helpers.picklists import picklist_cache
+
+    with app.app_context():
+        db.create_all()
+        seed(args.households)
+        db.session.remove()
+
+    client = app.test_client()
+    failures = 0
+    for method, url, body, budget in BUDGETS:
+        # Measure each endpoint with a cold picklist cache, as the first request after a deploy would
+        picklist_cache.invalidate()
+        try:
+            with max_queries(budget) as statements:
+                response = client.open(url, method=method, json=body)
+                response.get_data()
+            outcome = "ok"
+        except AssertionError as e:
+            failures += 1
+            outcome = f"OVER BUDGET\n{e}"
+
+        print(f"{len(statements):>3} / {budget:<3} {response.status_code}  {method} {url}  {outcome}")
+
+    if failures:
+        print(f"\n{failures} endpoints are over their query budget")
+        sys.exit(1)
+    print("\nAll endpoints are within their query budgets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Compares the ORM + to_dict() read path with the column-tuple RowSerializer path used by the
+collection endpoints, and checks that both produce byte-identical JSON.
+
+Runs against an in-memory SQLite database unless BENCHMARK_DATABASE_URI is set.
+
+Usage:
+    python -m benchmarks.serializer_benchmark --rows 20000 --repeat 5
+"""
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from os import environ
+from time import perf_counter
+import json
+
+# Config requires a database URI at import time; the benchmark always uses its own database below
+environ.setdefault("POSTGRES_DB_CONNECTION_DEV", "sqlite://")
+
+from backend import create_app, db
+from backend.config import Config
+from sqlalchemy import insert, select
+
+
+class BenchmarkConfig(Config):
+    SQLALCHEMY_DATABASE_URI = environ.get("BENCHMARK_DATABASE_URI", "sqlite://")
+
+
+def seed_households(count: int) -> None:
+    from models.models import Household
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    rows = [{"nickname":                    f"Household {i}",
+             "first_names":                 "Pat & Sam",
+             "surname":                     f"Surname{i % 500}",
+             "address_to":                  f"The Surname{i % 500} Family",
+             "formal_name":                 f"Mr. & Mrs. Surname{i % 500}",
+             "known_from":                  "Work",
+             "relationship":                "Work friends",
+             "relationship_type":           "Friends",
+             "kids":                        "Alex, Jordan",
+             "pets":                        "Biscuit",
+             "should_receive_holiday_card": i % 3 == 0,
+             "is_relevant":                 True,
+             "created_date":                now,
+             "last_modified":               now,
+             "notes":                       "Met at the 2019 offsite" * 3}
+            for i in range(count)]
+    db.session.execute(insert(Household), rows)
+    db.session.commit()
+
+
+def time_it(function, repeat: int) -> tuple:
+    """Returns the best wall time in ms & the output of the last run."""
+    timings = []
+    output = None
+    for _ in range(repeat):
+        db.session.remove()
+        start = perf_counter()
+        output = function()
+        timings.append((perf_counter() - start) * 1000)
+    return min(timings), output
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        from models.models import Household
+        from helpers.serializers import household_serializer
+
+        db.create_all()
+        seed_households(args.rows)
+
+        def orm_path():
+            query = select(Household).order_by(Household.id.asc())
+            return json.dumps([hh.to_dict() for hh in db.session.execute(query).scalars().all()])
+
+        def serializer_path():
+            query = household_serializer.select().order_by(Household.id.asc())
+            return json.dumps(household_serializer.serialize_all(db.session.execute(query).all()))
+
+        orm_ms, orm_output = time_it(orm_path, args.repeat)
+        row_ms, row_output = time_it(serializer_path, args.repeat)
+
+        print(f"Households serialized:     {args.rows}")
+        print(f"ORM + to_dict():           {orm_ms:8.1f} ms")
+        print(f"Columns + RowSerializer:   {row_ms:8.1f} ms")
+        print(f"Speedup:                   {orm_ms / row_ms:8.2f}x")
+        print(f"Byte-identical JSON:       {orm_output == row_output}")
+
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
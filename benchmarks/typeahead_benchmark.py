@@ -0,0 +1,72 @@
+"""
+Measures the memory, build time & lookup latency of the nickname typeahead index at several
+household counts, without a database.
+
+Households are named like the data generator's ("The Johnsons #42").  Memory is reported both as
+the index's own estimate, which the typeahead_index_bytes metric exposes, and as measured by
+tracemalloc while building it.  The build is timed separately, since tracing slows it down.
+
+Usage:
+    python -m benchmarks.typeahead_benchmark --households 10000 100000 1000000
+"""
+from argparse import ArgumentParser
+from os import environ
+from random import Random
+from time import perf_counter
+import tracemalloc
+
+# Config requires a database URI at import time; no queries are run by this benchmark
+environ.setdefault("POSTGRES_DB_CONNECTION_DEV", "sqlite://")
+
+from benchmarks.data_generator import SURNAMES
+from helpers.typeahead import PrefixIndex
+
+PREFIXES = ("j", "john", "the j", "johnsons #12", "martinez", "zzz")
+
+
+def household_rows(count: int, random_seed: int = 42):
+    """Yields (id, nickname, surname), like the rows the index is loaded from."""
+    rng = Random(random_seed)
+    for i in range(1, count + 1):
+        surname = rng.choice(SURNAMES)
+        yield i, f"The {surname}s #{i}", surname
+
+
+def time_per_call(function, calls: int) -> float:
+    """Returns the mean wall time of a call, in µs."""
+    start = perf_counter()
+    for i in range(calls):
+        function(i)
+    return (perf_counter() - start) / calls * 1_000_000
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--households", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'households':>10} {'keys':>10} {'estimate':>10} {'measured':>10} {'per hh':>8} {'build':>9} "
+          f"{'suggest':>9} {'put':>9} {'remove':>9}")
+    for count in args.households:
+        start = perf_counter()
+        PrefixIndex.build(household_rows(count))
+        build_ms = (perf_counter() - start) * 1000
+
+        tracemalloc.start()
+        index = PrefixIndex.build(household_rows(count))
+        measured, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        suggest_us = time_per_call(lambda i: index.suggest(PREFIXES[i % len(PREFIXES)], args.limit), args.calls)
+        put_us = time_per_call(lambda i: index.put(count + i + 1, f"The Newmans #{i}", "Newman"), args.calls)
+        remove_us = time_per_call(lambda i: index.remove(count + i + 1), args.calls)
+
+        print(f"{count:>10,} {len(index.keys):>10,} {index.memory_bytes() / 2 ** 20:>8.1f}Mi "
+              f"{measured / 2 ** 20:>8.1f}Mi {measured / count:>7.0f}B {build_ms:>7.0f}ms "
+              f"{suggest_us:>7.1f}µs {put_us:>7.1f}µs {remove_us:>7.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Production server settings, i.e.: `gunicorn --config gunicorn.conf.py main:app`
+
+Each worker is a separate process with its own threads, so requests use every core despite the
+GIL.  Every setting can be overridden with the environment variables below.
+
+The app is loaded once in the master with the GC off, then frozen before the workers are forked,
+so the workers share its memory copy-on-write.  Each worker then starts its own log listener thread
+& db connections.
+
+Each worker has its own connection pool; threads per worker shouldn't exceed
+DB_POOL_SIZE + DB_MAX_OVERFLOW (see backend/database.py).  With WEB_CONCURRENCY workers, a host
+opens up to WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections to the db.
+
+All workers write to the same log file, and each would rotate it on its own, losing lines.  With
+more than one worker, LOG_MAX_BYTES therefore defaults to 0 (no rotation by the app), and the log
+should be rotated externally, i.e.: logrotate with copytruncate.
+"""
+from os import environ
+import gc
+import os
+
+
+def available_cpus() -> int:
+    """
+    The cores this process may run on.  Unlike cpu_count(), this honours the CPU set a container is
+    limited to.  CPU quotas (i.e.: `docker run --cpus`) aren't visible here, so set WEB_CONCURRENCY
+    when using them.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    # i.e.: macOS
+    return os.cpu_count()
+
+
+bind = environ.get("GUNICORN_BIND", f"0.0.0.0:{environ.get('BACKEND_PORT', 5001)}")
+
+# One process per core (plus one to cover the time a worker spends blocked), with a few threads
+# each to overlap the time spent waiting on the db
+workers = int(environ.get("WEB_CONCURRENCY", available_cpus() + 1))
+worker_class = "gthread"
+threads = int(environ.get("GUNICORN_THREADS", 4))
+
+# Requests that take longer than this get their worker restarted
+timeout = int(environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+
+# Keep connections open for the front end's follow-up requests.  Should be shorter than the idle
+# timeout of any load balancer in front of this.
+keepalive = int(environ.get("GUNICORN_KEEPALIVE", 5))
+
+# Recycle workers periodically to bound any memory growth.  The jitter keeps them from all
+# restarting at the same time.
+max_requests = int(environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = int(environ.get("GUNICORN_MAX_REQUESTS_JITTER", 1000))
+
+# Load the app in the master, so it's only imported once & its memory is shared by the workers
+preload_app = True
+
+# This file is read before the app is loaded, so the logger (root_logger.py) sees this default
+if workers > 1:
+    environ.setdefault("LOG_MAX_BYTES", "0")
+
+accesslog = environ.get("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+
+# A GC pass touches every object it examines, which copies the page it lives on into the worker.
+# Collection is turned off while the app is loaded, and everything loaded is frozen once, before
+# the first workers are forked, so collections in the master & the workers skip it.
+gc.disable()
+
+
+def when_ready(server):
+    # Called once the app is loaded, before any workers are forked.  The workers inherit the
+    # re-enabled GC, and workers forked later to replace recycled ones share the same frozen objects.
+    gc.freeze()
+    gc.enable()
+
+
+def post_fork(server, worker):
+    from root_logger import restart_log_listener
+    restart_log_listener()
+
+    # Connections opened by the master can't be shared with the workers.  Drop them from this
+    # worker's pools without closing them, since the master still owns them.
+    from main import app
+    from backend import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+    server.log.info(f"Worker {worker.pid} ready")
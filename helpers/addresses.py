@@ -0,0 +1,22 @@
+"""
+Address selection rules shared by the endpoints that mail things to households: the holiday card
+batch & the mailing list (routes/card.py), and the thank-you worksheet (routes/gift.py).
+"""
+from sqlalchemy import select, func
+from models.models import Address
+
+
+def mailing_address_subquery(household_id):
+    """
+    The id of a household's current mailing address, or NULL if it has none, as a scalar subquery
+    correlated to the table of the provided household id column, i.e.: Household.id or
+    Gift.household_id.  When a household has several, the first one added (lowest id) is used.
+    """
+    return (
+        select(func.min(Address.id))
+        .where(Address.household_id == household_id,
+               Address.mail_the_card_to_this_address,
+               Address.is_current)
+        .correlate(household_id.table)
+        .scalar_subquery()
+    )
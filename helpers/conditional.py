@@ -0,0 +1,121 @@
+"""
+Conditional GET support (ETag / Last-Modified / 304 Not Modified) for the read endpoints.
+
+Validators are computed from indexed metadata only, so a client whose cached copy is still current
+gets its 304 without any rows being loaded or serialized:
+  - collections use count(*) & max(last_modified) for the table, plus the request's query string
+  - single records use the record's id & last_modified, plus the request's query string
+  - related records embedded via `include` add their own count & max(last_modified), see helpers/includes.py
+
+Only single records get a Last-Modified, and honour If-Modified-Since.  Deleting a row doesn't
+change a table's max(last_modified), so a date can't tell a client that a collection (or a record's
+embedded related records) changed; only the ETag, which also folds in the row count, can.
+
+Each query is built separately from the validators computed from its result, so the async read
+path (routes/async_reads.py) can run the same queries on its own session.
+"""
+from logging import getLogger
+from datetime import datetime, timezone
+from hashlib import md5
+from typing import NamedTuple, Optional
+from flask import request, Response
+from sqlalchemy import select, func
+from werkzeug.http import http_date, quote_etag
+from backend import db
+
+logger = getLogger()
+
+
+class CacheValidators(NamedTuple):
+    """The ETag & Last-Modified values describing the current state of a resource."""
+    etag: str
+    # None when no date reliably changes with the resource, i.e.: for collections
+    last_modified: Optional[datetime]
+
+    def headers(self) -> dict:
+        """Returns the response headers for these validators."""
+        output = {"ETag": quote_etag(self.etag, weak=True)}
+        if self.last_modified:
+            output["Last-Modified"] = http_date(self.last_modified)
+        return output
+
+    def match_request(self) -> bool:
+        """Returns True when the client's cached copy is still current."""
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110, 13.2.2)
+        if request.if_none_match:
+            return request.if_none_match.contains_weak(self.etag)
+
+        if request.if_modified_since and self.last_modified:
+            # HTTP dates have second precision
+            return self.last_modified.replace(microsecond=0) <= request.if_modified_since
+
+        return False
+
+    def including(self, count: int, last_modified: Optional[datetime]) -> "CacheValidators":
+        """
+        Returns validators that also change with a related table's count & newest last_modified.
+        Deleting a related record only changes the count, so these have no Last-Modified.
+        """
+        last_modified = _as_utc(last_modified)
+        version = last_modified.timestamp() if last_modified else 0
+        return CacheValidators(etag=f"{self.etag}-{count}-{version}", last_modified=None)
+
+    def not_modified(self) -> Response:
+        """Returns an empty 304 response carrying these validators."""
+        logger.debug("Client's cached copy is current (etag=%s), returning a 304", self.etag)
+        return Response(status=304, headers=self.headers())
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC datetimes."""
+    if value and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def collection_state_query(model):
+    """The table's row count & newest last_modified, which change whenever the collection does."""
+    return select(func.count(model.id), func.max(model.last_modified))
+
+
+def build_collection_validators(model, count: int, last_modified: Optional[datetime]) -> CacheValidators:
+    """Computes validators for a collection endpoint from the result of `collection_state_query()`."""
+    last_modified = _as_utc(last_modified)
+
+    # Different query args (pages, streaming, etc.) are different representations of the collection
+    args_hash = md5(request.query_string).hexdigest()[:12]
+    version = last_modified.timestamp() if last_modified else 0
+    etag = f"{model.__tablename__}-{count}-{version}-{args_hash}"
+
+    # No Last-Modified: deleting a row doesn't change max(last_modified), so If-Modified-Since would
+    # answer a stale 304.  The ETag folds in the row count.
+    return CacheValidators(etag=etag, last_modified=None)
+
+
+def collection_validators(model) -> CacheValidators:
+    """Computes validators for a collection endpoint from the table's row count & newest last_modified."""
+    count, last_modified = db.session.execute(collection_state_query(model)).one()
+    return build_collection_validators(model, count, last_modified)
+
+
+def record_state_query(model, record_id: int):
+    """The record's last_modified, or no rows when the record doesn't exist."""
+    return select(model.last_modified).where(model.id == record_id).execution_options(prepare=True)
+
+
+def build_record_validators(model, record_id: int, last_modified: Optional[datetime]) -> Optional[CacheValidators]:
+    """Computes validators for a single record from the result of `record_state_query()`."""
+    last_modified = _as_utc(last_modified)
+    if last_modified is None:
+        return None
+
+    # Sparse fieldsets are different representations of the record
+    args_hash = md5(request.query_string).hexdigest()[:12]
+    etag = f"{model.__tablename__}-{record_id}-{last_modified.timestamp()}-{args_hash}"
+    return CacheValidators(etag=etag, last_modified=last_modified)
+
+
+def record_validators(model, record_id: int) -> Optional[CacheValidators]:
+    """Computes validators for a single record.  Returns None when the record doesn't exist."""
+    last_modified = db.session.execute(record_state_query(model, record_id)).scalar_one_or_none()
+    return build_record_validators(model, record_id, last_modified)
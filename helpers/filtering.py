@@ -0,0 +1,200 @@
+"""
+Declarative filtering & sorting for the /api/v1/all_* collection endpoints.
+
+Each collection whitelists the columns it can be filtered & sorted by.  Filters are passed in the
+query string as `column=value` or `column__operator=value`:
+  - eq:  ?household_id=42
+  - in:  ?event_id__in=7,8,9
+  - gte / lte:  ?date__gte=2024-01-01&date__lte=2024-12-31
+Sorting uses `?sort=column`, or `?sort=-column` for descending order.
+
+Filters compile to a WHERE clause on the columns themselves, so they can use the same indexes.
+Sorting by an unindexed column means the db sorts every matching row before returning the first
+page, so those sorts are only allowed when the filters match at most UNINDEXED_SORT_MAX_ROWS rows.
+"""
+from logging import getLogger
+from datetime import date, datetime
+from typing import NamedTuple, Optional
+from flask import request
+from flask_restful import abort, inputs
+from sqlalchemy import select, func, Boolean, Date, DateTime, Integer
+from backend import db
+from backend.config import Config
+from helpers.pagination import SortKey
+from models.models import Address, Household, Event, Gift, Card
+
+logger = getLogger()
+
+# Operators allowed for each kind of filter
+EQUALITY = ("eq", "in")
+RANGE = ("eq", "gte", "lte")
+BOOLEAN = ("eq",)
+
+# Query args read by other parts of the collection endpoints
+RESERVED_ARGS = frozenset(("after_id", "limit", "stream", "fields", "sort", "include"))
+
+
+class FilterArgs(NamedTuple):
+    """The WHERE conditions & sort order requested by the client."""
+    conditions: tuple
+    sort: Optional[SortKey]
+
+
+def _parse_value(column, value: str):
+    """Converts a query string value to the column's python type."""
+    if isinstance(column.type, Boolean):
+        return inputs.boolean(value)
+    if isinstance(column.type, Integer):
+        return int(value)
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Date):
+        return date.fromisoformat(value)
+    return value
+
+
+def is_indexed(column) -> bool:
+    """True when the column is the leading column of the primary key or of a non-partial index."""
+    if column.primary_key:
+        return True
+
+    return any(index.columns.values()[0] is column and index.dialect_options["postgresql"]["where"] is None
+               for index in column.table.indexes)
+
+
+class CollectionFilters(object):
+    """The filters & sorts a single collection endpoint supports."""
+
+    def __init__(self, model, filters: dict, sorts: tuple):
+        self.model = model
+        self.filters = filters
+        self.sorts = sorts
+
+        # Sorts on unindexed columns are checked against the number of matching rows
+        self.indexed_sorts = frozenset(name for name in sorts if is_indexed(model.__table__.c[name]))
+
+    def parse(self) -> FilterArgs:
+        """Reads the filters & sort from the query string.  Responds with a 400 if any are invalid."""
+        filters = self.read_args()
+        query = self.sort_row_count_query(filters)
+        if query is not None:
+            self.check_sort_row_count(filters, db.session.execute(query).scalar_one())
+        return filters
+
+    def read_args(self) -> FilterArgs:
+        """
+        Reads the filters & sort from the query string, without checking whether too many rows match
+        an unindexed sort.  Responds with a 400 if any are invalid.
+        """
+        conditions = []
+        for key, value in request.args.items(multi=True):
+            if key in RESERVED_ARGS:
+                continue
+
+            name, _, operator = key.partition("__")
+            operator = operator or "eq"
+            if operator not in self.filters.get(name, ()):
+                abort(400, message={key: f"Unsupported filter.  Valid filters: {self.describe_filters()}"})
+
+            column = getattr(self.model, name)
+            try:
+                if operator == "in":
+                    values = [_parse_value(column, item.strip()) for item in value.split(",") if item.strip()]
+                    conditions.append(column.in_(values))
+                elif operator == "gte":
+                    conditions.append(column >= _parse_value(column, value))
+                elif operator == "lte":
+                    conditions.append(column <= _parse_value(column, value))
+                else:
+                    conditions.append(column == _parse_value(column, value))
+
+            except ValueError as e:
+                abort(400, message={key: f"Invalid value '{value}': {e}"})
+
+        sort = self.parse_sort()
+        logger.debug("Parsed %s filters & sort=%s for %s", len(conditions), sort, self.model.__tablename__)
+        return FilterArgs(conditions=tuple(conditions), sort=sort)
+
+    def parse_sort(self) -> Optional[SortKey]:
+        """Reads the `sort` arg."""
+        value = request.args.get("sort", "").strip()
+        if not value:
+            return None
+
+        name = value.removeprefix("-")
+        if name not in self.sorts:
+            abort(400, message={"sort": f"Unsupported sort: '{name}'.  Valid options: {', '.join(self.sorts)}"})
+
+        return SortKey(column=getattr(self.model, name), descending=value.startswith("-"))
+
+    def sort_row_count_query(self, filters: FilterArgs):
+        """
+        Returns the query counting the rows an unindexed sort would have to sort, or None when the
+        sort is indexed.  It counts at most one row past the threshold; the exact number doesn't matter.
+        """
+        if filters.sort is None or filters.sort.column.key in self.indexed_sorts:
+            return None
+
+        matching = select(self.model.id).where(*filters.conditions).limit(Config.UNINDEXED_SORT_MAX_ROWS + 1)
+        return select(func.count()).select_from(matching.subquery())
+
+    def check_sort_row_count(self, filters: FilterArgs, count: int) -> None:
+        """Responds with a 400 when too many rows match an unindexed sort."""
+        if count > Config.UNINDEXED_SORT_MAX_ROWS:
+            name = filters.sort.column.key
+            logger.info("Rejected sort=%s: more than %s rows match", name, Config.UNINDEXED_SORT_MAX_ROWS)
+            indexed_sorts = ", ".join(sorted(self.indexed_sorts))
+            abort(400, message={"sort": f"'{name}' isn't indexed, so it can only sort up to "
+                                        f"{Config.UNINDEXED_SORT_MAX_ROWS} records.  Add filters to "
+                                        f"narrow the results, or sort by: {indexed_sorts}"})
+
+    def describe_filters(self) -> str:
+        """Lists the supported filters, for error messages."""
+        return ", ".join(name if operator == "eq" else f"{name}__{operator}"
+                         for name, operators in self.filters.items() for operator in operators)
+
+
+address_filters = CollectionFilters(Address, filters={
+    "household_id":                  EQUALITY,
+    "is_current":                    BOOLEAN,
+    "mail_the_card_to_this_address": BOOLEAN,
+    "created_date":                  RANGE,
+    "last_modified":                 RANGE,
+}, sorts=("id", "household_id", "city", "state", "created_date", "last_modified"))
+
+household_filters = CollectionFilters(Household, filters={
+    "nickname":                    EQUALITY,
+    "surname":                     EQUALITY,
+    "should_receive_holiday_card": BOOLEAN,
+    "is_relevant":                 BOOLEAN,
+    "created_date":                RANGE,
+    "last_modified":               RANGE,
+}, sorts=("id", "nickname", "surname", "created_date", "last_modified"))
+
+event_filters = CollectionFilters(Event, filters={
+    "year":          EQUALITY,
+    "date":          RANGE,
+    "is_archived":   BOOLEAN,
+    "created_date":  RANGE,
+    "last_modified": RANGE,
+}, sorts=("id", "name", "date", "year", "created_date", "last_modified"))
+
+gift_filters = CollectionFilters(Gift, filters={
+    "event_id":              EQUALITY,
+    "household_id":          EQUALITY,
+    "date":                  RANGE,
+    "should_a_card_be_sent": BOOLEAN,
+    "created_date":          RANGE,
+    "last_modified":         RANGE,
+}, sorts=("id", "event_id", "date", "created_date", "last_modified"))
+
+card_filters = CollectionFilters(Card, filters={
+    "event_id":      EQUALITY,
+    "household_id":  EQUALITY,
+    "gift_id":       EQUALITY,
+    "address_id":    EQUALITY,
+    "was_returned":  BOOLEAN,
+    "date_sent":     RANGE,
+    "created_date":  RANGE,
+    "last_modified": RANGE,
+}, sorts=("id", "event_id", "date_sent", "created_date", "last_modified"))
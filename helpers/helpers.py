@@ -2,6 +2,7 @@
 Misc small helper functions
 """
 from logging import getLogger
+from datetime import date
 from re import sub
 
 logger = getLogger()
@@ -12,7 +13,7 @@ def convert_to_bool(input_data) -> bool:
     # logger.debug(f"Starting convert_to_bool({input_data}), type: {type(input_data)}")
 
     if type(input_data) == bool:
-        logger.debug(f"Input was already boolean.")
+        logger.debug("Input was already boolean.")
         return input_data
     elif type(input_data) == str:
         if input_data.lower() in ['true', '1', 't', 'y', 'yes']:
@@ -25,13 +26,20 @@ def convert_to_bool(input_data) -> bool:
         else:
             return False
     else:
-        logger.warning(f"Unsupported type provided: {type(input_data)}")
-        logger.warning(f"Setting value to False")
+        logger.warning("Unsupported type provided: %s", type(input_data))
+        logger.warning("Setting value to False")
         return False
 
     # logger.debug(f"Ending convert_to_bool, returning {output}")
 
 
+def convert_to_date(input_data) -> date:
+    """Converts a YYYY-MM-DD string to a date"""
+    if isinstance(input_data, date):
+        return input_data
+    return date.fromisoformat(input_data)
+
+
 def remove_milliseconds_from_datetime_string(text) -> str:
     if isinstance(text, str):
         position = text.find(".")
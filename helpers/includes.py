@@ -0,0 +1,140 @@
+"""
+Embeds related records in the household & event reads, i.e.: /api/v1/household?include=addresses,cards
+
+Related rows are loaded the way `selectinload` loads a relationship: once the parent rows are read,
+a single `SELECT ... WHERE <foreign key> IN (<parent ids>)` per relation fetches the related rows of
+every parent, which are then grouped by parent.  The number of queries depends on how many relations
+are included, not on how many parents are returned.  Parent ids are sent in batches of
+INCLUDE_BATCH_SIZE to stay under the drivers' limits on bind parameters, so only a collection read
+of more parents than that takes an extra query per batch.
+
+Each included relation is listed under its name in every parent's dict, ordered by id, and is an
+empty list when a parent has no related records.
+"""
+from logging import getLogger
+from typing import NamedTuple
+from flask_restful import abort
+from sqlalchemy import select, func
+from backend import db
+from backend.config import Config
+from backend.metrics import count_serialized_rows
+from helpers.conditional import CacheValidators
+from helpers.serializers import RowSerializer, address_serializer, gift_serializer, card_serializer
+from helpers.validation import Field, Validator
+from models.models import Address, Gift, Card
+
+logger = getLogger()
+
+# Related records are requested via the query string, i.e.: ?include=addresses,cards,gifts
+include_validator = Validator(Field("include", str, location="args"))
+
+
+class Relation(NamedTuple):
+    """Records of another model that reference the parent through `foreign_key`."""
+    name: str
+    serializer: RowSerializer
+    foreign_key: object
+
+    def query(self, parent_ids: list):
+        """Selects the related rows of these parents, each prefixed with its parent's id."""
+        return select(self.foreign_key, *self.serializer.columns) \
+            .where(self.foreign_key.in_(parent_ids)) \
+            .order_by(self.foreign_key, self.serializer.model.id)
+
+    def state_query(self, parent_id: int = None):
+        """
+        The related rows' count & newest last_modified, for the parent's cache validators.  Without
+        a parent id, i.e.: for a collection, this covers the whole related table.
+        """
+        model = self.serializer.model
+        query = select(func.count(model.id), func.max(model.last_modified))
+        if parent_id is not None:
+            query = query.where(self.foreign_key == parent_id)
+        return query
+
+
+class Includes(object):
+    """The relations that can be included in one endpoint's records."""
+
+    def __init__(self, *relations: Relation):
+        self.relations = {relation.name: relation for relation in relations}
+
+    def parse(self) -> tuple:
+        """
+        Returns the relations requested via the `include` arg, in the requested order.  Responds with
+        a 400 if any of them doesn't exist.
+        """
+        include = include_validator.parse().include
+        if not include:
+            return ()
+
+        requested = list(dict.fromkeys(name.strip() for name in include.split(",") if name.strip()))
+        unknown = sorted(set(requested).difference(self.relations))
+        if unknown:
+            logger.info("Unknown relations requested: %s", unknown)
+            abort(400, message={"include": f"Unknown relations: {', '.join(unknown)}.  "
+                                           f"Valid options: {', '.join(self.relations)}"})
+
+        return tuple(self.relations[name] for name in requested)
+
+
+def with_included_state(validators: CacheValidators, states: list) -> CacheValidators:
+    """
+    Folds the (count, last_modified) of each included relation into the parent's validators, so
+    that adding, changing or deleting a related record changes the ETag too.
+    """
+    for count, last_modified in states:
+        validators = validators.including(count, last_modified)
+    return validators
+
+
+def prepare_records(relations: tuple, records: list) -> dict:
+    """Adds an empty list for each relation to each record.  Returns the records by id."""
+    for record in records:
+        for relation in relations:
+            record[relation.name] = []
+    return {record["id"]: record for record in records}
+
+
+def included_queries(relations: tuple, parent_ids: list):
+    """Yields (relation, query) for each relation & batch of parent ids."""
+    batch_size = Config.INCLUDE_BATCH_SIZE
+    for relation in relations:
+        for start in range(0, len(parent_ids), batch_size):
+            yield relation, relation.query(parent_ids[start:start + batch_size])
+
+
+def attach(records_by_id: dict, relation: Relation, rows) -> None:
+    """Appends each related row to its parent record."""
+    count_serialized_rows(len(rows))
+    serialize = relation.serializer.serialize
+    for row in rows:
+        records_by_id[row[0]][relation.name].append(serialize(row[1:]))
+
+
+def load_included(relations: tuple, records: list) -> None:
+    """Adds the requested related records to each of these serialized records."""
+    if not relations or not records:
+        return
+
+    records_by_id = prepare_records(relations, records)
+    for relation, query in included_queries(relations, list(records_by_id)):
+        attach(records_by_id, relation, db.session.execute(query).all())
+
+
+def included_validators(validators: CacheValidators, relations: tuple, parent_id: int = None) -> CacheValidators:
+    """Returns the parent's validators, updated with the state of each included relation."""
+    states = [db.session.execute(relation.state_query(parent_id)).one() for relation in relations]
+    return with_included_state(validators, states)
+
+
+household_includes = Includes(
+    Relation("addresses", address_serializer, Address.household_id),
+    Relation("cards", card_serializer, Card.household_id),
+    Relation("gifts", gift_serializer, Gift.household_id),
+)
+
+event_includes = Includes(
+    Relation("gifts", gift_serializer, Gift.event_id),
+    Relation("cards", card_serializer, Card.event_id),
+)
@@ -0,0 +1,142 @@
+"""
+Keyset (cursor) pagination shared by the /api/v1/all_* collection endpoints.
+
+Pages are keyed on the integer primary key: the client passes the last id it received as
+`after_id`, and the next page is read with `WHERE id > after_id ORDER BY id LIMIT n`.  Unlike
+OFFSET, this walks the primary key index, so every page costs the same regardless of depth.
+
+When the client sorts by another column, pages are keyed on (sort column, id) instead.  The cursor
+is still just the id; the sort value for that id is looked up in the same statement.  If the
+cursor's record was deleted since the previous page, there's no sort value to resume from, so the
+request is rejected with a 400 rather than returning the wrong rows.
+"""
+from logging import getLogger
+from typing import NamedTuple
+from urllib.parse import urlencode
+from flask import request
+from flask_restful import abort, inputs
+from sqlalchemy import select, and_, or_
+from backend import db
+from backend.config import Config
+from helpers.validation import Field, Validator
+
+logger = getLogger()
+
+# Pagination args are only ever read from the query string
+pagination_validator = Validator(Field("after_id", inputs.natural, location="args"),
+                                 Field("limit", inputs.positive, location="args"))
+
+
+def parse_pagination_args(stream: bool = False) -> tuple:
+    """
+    Returns the (after_id, limit) requested by the client.  Without a `limit`, a page holds
+    DEFAULT_PAGE_SIZE records, so that a plain request doesn't read the whole table into memory.
+    Streamed responses don't hold their rows in memory, so without a `limit` they return every record,
+    which is a limit of None.
+    """
+    args = pagination_validator.parse()
+
+    limit = args.limit or (None if stream else Config.DEFAULT_PAGE_SIZE)
+    if limit and limit > Config.MAX_PAGE_SIZE:
+        logger.debug("Requested limit=%s exceeds the max page size, using %s", limit, Config.MAX_PAGE_SIZE)
+        limit = Config.MAX_PAGE_SIZE
+
+    return args.after_id, limit
+
+
+class SortKey(NamedTuple):
+    """A column to sort a collection by.  Ties are broken by ascending id."""
+    column: object
+    descending: bool = False
+
+
+def _after_cursor(sort: SortKey, id_column, after_id: int):
+    """
+    Returns the WHERE clause selecting the rows that sort after the cursor's row.
+    NULLs sort last when ascending & first when descending, which is Postgres' default, so the
+    sort column's index can be walked in either direction.
+    """
+    column = sort.column
+    cursor_value = select(column).where(id_column == after_id).correlate(None).scalar_subquery()
+    same_value_after_cursor = and_(column == cursor_value, id_column > after_id)
+
+    if sort.descending:
+        return or_(column < cursor_value,
+                   same_value_after_cursor,
+                   and_(cursor_value.is_(None), or_(column.is_not(None), id_column > after_id)))
+
+    return or_(column > cursor_value,
+               same_value_after_cursor,
+               and_(column.is_(None), or_(cursor_value.is_not(None), id_column > after_id)))
+
+
+def cursor_row_query(sort: SortKey, id_column, after_id: int):
+    """
+    Returns the query checking that the cursor's record still exists, or None when the page doesn't
+    need it, i.e.: pages sorted by id resume from the id alone.
+    """
+    if after_id is None or sort is None or sort.column is id_column:
+        return None
+    return select(id_column).where(id_column == after_id).execution_options(prepare=True)
+
+
+def check_cursor_row(after_id: int, found) -> None:
+    """Responds with a 400 when the cursor's record was deleted, since its sort value is gone too."""
+    if found is None:
+        logger.info("Rejected after_id=%s: the record no longer exists", after_id)
+        abort(400, message={"after_id": f"The record with id={after_id} no longer exists, so the page "
+                                        f"after it can't be found.  Start again from the first page."})
+
+
+def check_cursor(sort: SortKey, id_column, after_id: int) -> None:
+    """Checks that the cursor's record still exists, when the requested sort needs its sort value."""
+    query = cursor_row_query(sort, id_column, after_id)
+    if query is not None:
+        check_cursor_row(after_id, db.session.execute(query).scalar_one_or_none())
+
+
+def paginate(query, id_column, after_id=None, limit=None, look_ahead: bool = True, sort: SortKey = None):
+    """
+    Applies the keyset filter, ordering, and limit to a `select()` statement.
+    Set look_ahead=False when the results are streamed and won't be passed to `split_page()`.
+    """
+    if sort is None or sort.column is id_column:
+        descending = sort is not None and sort.descending
+        if after_id is not None:
+            query = query.where(id_column < after_id if descending else id_column > after_id)
+        query = query.order_by(id_column.desc() if descending else id_column.asc())
+
+    else:
+        if after_id is not None:
+            query = query.where(_after_cursor(sort, id_column, after_id))
+        if sort.descending:
+            query = query.order_by(sort.column.desc().nulls_first(), id_column.asc())
+        else:
+            query = query.order_by(sort.column.asc().nulls_last(), id_column.asc())
+
+    # Read one extra row so we know whether another page exists without a separate COUNT
+    if limit:
+        query = query.limit(limit + 1 if look_ahead else limit)
+
+    return query
+
+
+def split_page(rows: list, limit=None) -> tuple:
+    """
+    Trims the extra look-ahead row from a page of results.
+    Returns the rows to send and the response headers advertising the next cursor, if any.
+    """
+    if not limit or len(rows) <= limit:
+        return rows, {}
+
+    rows = rows[:limit]
+    next_after_id = rows[-1].id
+
+    # Preserve any other query args so the `next` link requests the same view of the data
+    next_args = request.args.to_dict()
+    next_args["after_id"] = next_after_id
+    next_args["limit"] = limit
+    next_url = f"{request.base_url}?{urlencode(next_args)}"
+
+    return rows, {"X-Next-After-Id": str(next_after_id),
+                  "Link":            f'<{next_url}>; rel="next"'}
@@ -0,0 +1,138 @@
+"""
+Per-process cache of the picklist values, stored pre-split and keyed by version.
+
+The values rarely change, but they're read on every form render and are also used to validate
+the picklist fields submitted for households & cards.  Cached snapshots are invalidated when a
+Picklists record is committed by this process, and expire after PICKLIST_CACHE_TTL seconds so that
+changes made by other processes are eventually picked up as well.
+"""
+from logging import getLogger
+from threading import Lock
+from time import monotonic
+from typing import NamedTuple, Optional
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from backend import db
+from backend.config import Config
+from models.models import Picklists
+
+logger = getLogger()
+
+# The version served when a client doesn't ask for a specific one
+DEFAULT_PICKLIST_VERSION = 1
+
+# Maps request fields to the picklist that defines their valid values
+HOUSEHOLD_PICKLIST_FIELDS = {
+    "relationship":      "household_relationship",
+    "relationship_type": "household_relationship_type",
+    "family_side":       "household_family_side",
+}
+CARD_PICKLIST_FIELDS = {
+    "type": "card_type",
+}
+
+
+def picklist_query(version: int):
+    return select(Picklists).where(Picklists.version == version)
+
+
+class PicklistSnapshot(NamedTuple):
+    """A single version of the picklist values, as returned to the front end & as lookup sets."""
+    values: dict
+    allowed: dict
+    loaded_at: float
+
+
+class PicklistCache(object):
+    """Thread-safe cache of picklist snapshots, keyed by version."""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._snapshots = {}
+        self._lock = Lock()
+
+    def cached(self, version: int = DEFAULT_PICKLIST_VERSION) -> Optional[PicklistSnapshot]:
+        """Returns the snapshot for the provided version if it's cached & current, without reading the db."""
+        snapshot = self._snapshots.get(version)
+        if snapshot and monotonic() - snapshot.loaded_at < self.ttl:
+            return snapshot
+        return None
+
+    def get(self, version: int = DEFAULT_PICKLIST_VERSION) -> Optional[PicklistSnapshot]:
+        """Returns the snapshot for the provided version, loading it from the db if necessary."""
+        snapshot = self.cached(version)
+        if snapshot:
+            return snapshot
+
+        # Only one thread needs to hit the db when a snapshot is missing or stale
+        with self._lock:
+            snapshot = self.cached(version)
+            if snapshot:
+                return snapshot
+
+            record = db.session.execute(picklist_query(version)).scalar_one_or_none()
+            return self.store(version, record)
+
+    def store(self, version: int, record: Optional[Picklists]) -> Optional[PicklistSnapshot]:
+        """Caches the snapshot for a Picklists record read by `picklist_query()`."""
+        if record is None:
+            logger.info("No picklist values found for version=%s", version)
+            return None
+
+        values = record.to_dict()
+        allowed = {key: frozenset(value.strip() for value in values[key])
+                   for key in values if key != "version"}
+        snapshot = PicklistSnapshot(values=values, allowed=allowed, loaded_at=monotonic())
+        self._snapshots[version] = snapshot
+        logger.debug("Cached picklist values for version=%s", version)
+        return snapshot
+
+    def invalidate(self, version: int = None) -> None:
+        """Drops the cached snapshot for the provided version, or all snapshots if no version is provided."""
+        with self._lock:
+            if version is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(version, None)
+        logger.info("Invalidated cached picklist values for version=%s", version or 'all')
+
+    def validate(self, args: dict, fields: dict, version: int = DEFAULT_PICKLIST_VERSION) -> Optional[str]:
+        """
+        Checks the provided args against the picklist values.
+        Returns an error message for the first invalid value, or None if all values are valid.
+        """
+        snapshot = self.get(version)
+        if snapshot is None:
+            logger.warning("Unable to validate picklist fields: version=%s doesn't exist", version)
+            return None
+
+        for field, picklist in fields.items():
+            value = args.get(field)
+            if value and value.strip() not in snapshot.allowed[picklist]:
+                return f"Invalid value for {field}: '{value}'.  Valid options: {snapshot.values[picklist]}"
+
+        return None
+
+
+picklist_cache = PicklistCache(ttl=Config.PICKLIST_CACHE_TTL)
+
+
+@event.listens_for(Session, "after_flush")
+def flag_picklist_changes(session, flush_context) -> None:
+    """Remembers which picklist versions were written so they can be invalidated on commit."""
+    for record in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(record, Picklists):
+            session.info.setdefault("changed_picklist_versions", set()).add(record.version)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_changed_picklists(session) -> None:
+    """Invalidates any picklist versions written in the transaction that was just committed."""
+    for version in session.info.pop("changed_picklist_versions", ()):
+        picklist_cache.invalidate(version)
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_picklist_changes(session) -> None:
+    """Nothing was saved, so there's nothing to invalidate."""
+    session.info.pop("changed_picklist_versions", None)
@@ -0,0 +1,126 @@
+"""
+Serializes plain column tuples into the same dicts that each model's `to_dict()` returns.
+
+Read-only collection endpoints select columns rather than ORM entities, which skips building
+instances & tracking them in the session's identity map.  Each serializer precomputes which
+positions in the row need converting (only the date & datetime columns, since the checkbox fields
+are native booleans), so serializing a row is a `dict(zip(...))` plus a couple of formatting calls.
+"""
+from logging import getLogger
+from datetime import date, datetime
+from flask_restful import abort
+from sqlalchemy import select, Date, DateTime
+from backend.metrics import count_serialized_rows
+from helpers.validation import Field, Validator
+from models.models import Address, Household, Event, Gift, Card
+
+logger = getLogger()
+
+# Sparse fieldsets are requested via the query string, i.e.: ?fields=id,nickname,surname
+fields_validator = Validator(Field("fields", str, location="args"))
+
+
+def format_date(value: date) -> str:
+    """Same output as strftime("%Y-%m-%d"), without the format string parsing."""
+    return value.isoformat()
+
+
+def format_datetime(value: datetime) -> str:
+    """Same output as strftime("%Y-%m-%d %H:%M:%S%z")."""
+    if value.tzinfo is None:
+        return value.isoformat(sep=" ", timespec="seconds")
+    return value.strftime("%Y-%m-%d %H:%M:%S%z")
+
+
+class RowSerializer(object):
+    """Converts rows selected via `select()` into dicts for a single model."""
+
+    def __init__(self, model, fields: tuple):
+        self.model = model
+        self.fields = fields
+        self.columns = tuple(model.__table__.c[field] for field in fields)
+
+        # Positions & converters for the columns whose values aren't JSON-ready as returned by the db
+        self.conversions = tuple(
+            (position, format_datetime if isinstance(column.type, DateTime) else format_date)
+            for position, column in enumerate(self.columns)
+            if isinstance(column.type, (Date, DateTime))
+        )
+
+        # Serializers for subsets of these fields, built on first use
+        self._projections = {}
+
+    def select(self):
+        """Returns a `select()` of this model's serialized columns."""
+        return select(*self.columns)
+
+    def project(self, fields) -> "RowSerializer":
+        """
+        Returns a serializer for a subset of this serializer's fields, in the original field order.
+        `id` is always included since it identifies each record & serves as the pagination cursor.
+        """
+        key = frozenset(fields) | {"id"}
+        projection = self._projections.get(key)
+        if projection is None:
+            projection = RowSerializer(self.model, tuple(field for field in self.fields if field in key))
+            self._projections[key] = projection
+        return projection
+
+    def serialize(self, row) -> dict:
+        """Converts a single row into a dict."""
+        if not self.conversions:
+            return dict(zip(self.fields, row))
+
+        values = list(row)
+        for position, convert in self.conversions:
+            if values[position] is not None:
+                values[position] = convert(values[position])
+        return dict(zip(self.fields, values))
+
+    def serialize_all(self, rows) -> list:
+        """Converts a list of rows into a list of dicts."""
+        count_serialized_rows(len(rows))
+        serialize = self.serialize
+        return [serialize(row) for row in rows]
+
+
+def parse_fields_arg(serializer: RowSerializer) -> RowSerializer:
+    """
+    Returns the serializer for the fields requested via the `fields` arg, so that only those columns
+    are selected from the db.  Responds with a 400 if any requested field doesn't exist.
+    """
+    fields = fields_validator.parse().fields
+    if not fields:
+        return serializer
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = sorted(requested.difference(serializer.fields))
+    if unknown:
+        logger.info("Unknown fields requested: %s", unknown)
+        abort(400, message={"fields": f"Unknown fields: {', '.join(unknown)}.  "
+                                      f"Valid options: {', '.join(serializer.fields)}"})
+
+    return serializer.project(requested)
+
+
+# Field order matches each model's to_dict() so the JSON output is unchanged
+address_serializer = RowSerializer(Address, (
+    "id", "household_id", "line_1", "line_2", "city", "state", "zip", "country", "full_address",
+    "is_current", "is_likely_to_change", "mail_the_card_to_this_address", "created_date",
+    "last_modified", "notes"))
+
+household_serializer = RowSerializer(Household, (
+    "id", "nickname", "first_names", "surname", "address_to", "formal_name", "known_from",
+    "relationship", "relationship_type", "family_side", "kids", "pets", "should_receive_holiday_card",
+    "is_relevant", "created_date", "last_modified", "notes"))
+
+event_serializer = RowSerializer(Event, (
+    "id", "name", "date", "year", "is_archived", "created_date", "last_modified", "notes"))
+
+gift_serializer = RowSerializer(Gift, (
+    "id", "event_id", "households", "description", "type", "origin", "date", "should_a_card_be_sent",
+    "created_date", "last_modified", "notes"))
+
+card_serializer = RowSerializer(Card, (
+    "id", "type", "was_returned", "gift_id", "event_id", "household_id", "address_id", "date_sent",
+    "created_date", "last_modified", "notes"))
@@ -0,0 +1,107 @@
+"""
+Streams large reads to the client as a JSON array or CSV, one batch of rows at a time.
+
+Rows are read through a server-side cursor (`stream_results` + `yield_per`), so neither the ORM
+result, the list of dicts, nor the serialized output is ever held in memory in full.
+"""
+from logging import getLogger
+from flask import Response, stream_with_context
+from flask_restful import inputs
+from backend import db
+from backend.config import Config
+from backend.metrics import stream_started, stream_finished
+from helpers.validation import Field, Validator
+from io import StringIO
+import csv
+import json
+
+logger = getLogger()
+
+# Streaming is opt-in via the query string
+stream_validator = Validator(Field("stream", inputs.boolean, location="args", default=False))
+
+
+def parse_stream_arg() -> bool:
+    """Returns True when the client asked for a streamed response."""
+    return stream_validator.parse().stream
+
+
+def stream_query(query, render, prefix: str = "", suffix: str = "", mimetype: str = "application/json",
+                 batch_size: int = None, headers: dict = None) -> Response:
+    """
+    Executes the provided `select()` and returns a Response that writes `prefix`, then each batch of
+    rows as rendered by `render(rows, rows_written)`, then `suffix`.
+    The query is executed before the response starts so that connection & SQL errors can still be
+    reported with a proper status code by the caller.
+    """
+    batch_size = batch_size or Config.STREAM_BATCH_SIZE
+    query = query.execution_options(stream_results=True, yield_per=batch_size)
+
+    # The request's scoped session is removed when the view returns, which is before the response
+    # body is generated.  Use a dedicated session that lives exactly as long as the stream does.
+    session = db.session.session_factory()
+    try:
+        result = session.execute(query)
+    except BaseException:
+        session.close()
+        raise
+
+    def generate():
+        rows_written = 0
+
+        try:
+            if prefix:
+                yield prefix
+
+            # Each partition holds at most `batch_size` rows fetched from the server-side cursor
+            for partition in result.partitions():
+                yield render(partition, rows_written)
+                rows_written += len(partition)
+
+            if suffix:
+                yield suffix
+            logger.info("Successfully streamed %s rows.", rows_written)
+
+        except BaseException as e:
+            # Headers are already sent, so the best we can do is log & truncate the response
+            logger.warning("Error streaming results after %s rows: %s", rows_written, e)
+            raise
+
+        finally:
+            stream_finished(rows_written)
+            session.close()
+
+    stream_started()
+    return Response(stream_with_context(generate()), status=200, headers=headers, mimetype=mimetype)
+
+
+def stream_json_array(query, serialize, batch_size: int = None, headers: dict = None) -> Response:
+    """
+    Streams the results of the provided `select()` as a JSON array, using `serialize` to convert each
+    row into a dict.
+    """
+    def render(rows, rows_written: int) -> str:
+        chunk = ",".join(json.dumps(serialize(row)) for row in rows)
+        return ("," if rows_written else "") + chunk
+
+    return stream_query(query, render, prefix="[", suffix="]", batch_size=batch_size, headers=headers)
+
+
+def stream_csv(query, columns: tuple, to_values, batch_size: int = None, headers: dict = None) -> Response:
+    """
+    Streams the results of the provided `select()` as CSV, with a header row of `columns`.  Each row is
+    converted into a sequence of values by `to_values`.
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    header_row = buffer.getvalue()
+
+    def render(rows, rows_written: int) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(to_values(row) for row in rows)
+        return buffer.getvalue()
+
+    return stream_query(query, render, prefix=header_row, mimetype="text/csv", batch_size=batch_size,
+                        headers=headers)
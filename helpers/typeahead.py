@@ -0,0 +1,256 @@
+"""
+Per-process prefix index over the household nicknames & surnames, for the typeahead suggestions.
+
+The nickname picker asks for suggestions on every keystroke, so they're served from memory rather
+than the db: the index is a sorted list of normalized keys, searched with bisect, so a lookup costs
+O(log n) plus the suggestions returned.  Every word of the nickname & surname starts a key, i.e.:
+"The Johnsons" is found by "the j" & "john", and multi-word prefixes like "johnsons #1" work too.
+
+The index is loaded on first use.  Households added, changed or deleted by this process are applied
+to it as soon as their transaction commits, and it's reloaded after TYPEAHEAD_INDEX_TTL seconds so
+that changes made by other processes are eventually picked up as well.  While one thread reloads a
+stale index, the others keep serving the old one.
+"""
+from logging import getLogger
+from bisect import bisect_left, bisect_right
+from sys import getsizeof
+from threading import Lock
+from time import monotonic
+from typing import Callable, Iterable, Optional
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from backend import db
+from backend.config import Config
+from backend.metrics import Gauge, registry
+from models.models import Household
+
+logger = getLogger()
+
+
+def normalize(value: Optional[str]) -> str:
+    """Lower-cased, with runs of whitespace collapsed, so that "  the  JOHNSONS" finds "The Johnsons"."""
+    return " ".join(value.casefold().split()) if value else ""
+
+
+def prefix_keys(nickname: Optional[str], surname: Optional[str]) -> list:
+    """
+    The keys a household is found by: each of its nickname's & surname's words onwards.  Keys that
+    another of its keys starts with are left out, since any prefix of theirs would find the household
+    through the longer key anyway, i.e.: "johnson" isn't needed next to "johnsons".
+    """
+    keys = set()
+    for value in (nickname, surname):
+        words = normalize(value).split(" ")
+        keys.update(" ".join(words[i:]) for i in range(len(words)))
+    keys.discard("")
+
+    # In sorted order, a key that another one starts with comes right before it
+    keys = sorted(keys)
+    return [key for key, following in zip(keys, keys[1:] + [""]) if not following.startswith(key)]
+
+
+class PrefixIndex(object):
+    """
+    Sorted keys, with the id of the household each one belongs to at the same position in `ids`.
+    Both lists are only changed under the lock, which lookups take too, so they're always aligned.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.ids = []
+        # {id: (nickname, surname)}, as returned in the suggestions
+        self.households = {}
+        self.loaded_at = monotonic()
+        # Size of the keys, ids & names, which the lists' & dict's own sizes are added to when reported
+        self._entry_bytes = 0
+        self._lock = Lock()
+
+    @classmethod
+    def build(cls, rows: Iterable) -> "PrefixIndex":
+        """Builds the index from (id, nickname, surname) rows in a single sort."""
+        index = cls()
+        entries = []
+        for household_id, nickname, surname in rows:
+            index.households[household_id] = (nickname, surname)
+            entries.extend((key, household_id) for key in prefix_keys(nickname, surname))
+
+        entries.sort()
+        index.keys = [key for key, _ in entries]
+        index.ids = [household_id for _, household_id in entries]
+
+        names = index.households.values()
+        index._entry_bytes = sum(map(getsizeof, index.keys)) + sum(map(getsizeof, index.households)) + \
+            sum(map(getsizeof, names)) + sum(getsizeof(nickname) + getsizeof(surname) for nickname, surname in names)
+        return index
+
+    @staticmethod
+    def _household_bytes(household_id: int, nickname: Optional[str], surname: Optional[str], keys: list) -> int:
+        return getsizeof(household_id) + getsizeof((nickname, surname)) + getsizeof(nickname) + \
+            getsizeof(surname) + sum(map(getsizeof, keys))
+
+    def put(self, household_id: int, nickname: Optional[str], surname: Optional[str]) -> None:
+        """Adds a household, or replaces its keys if it's already indexed."""
+        keys = prefix_keys(nickname, surname)
+        with self._lock:
+            self._remove(household_id)
+            for key in keys:
+                position = bisect_right(self.keys, key)
+                self.keys.insert(position, key)
+                self.ids.insert(position, household_id)
+            self.households[household_id] = (nickname, surname)
+            self._entry_bytes += self._household_bytes(household_id, nickname, surname, keys)
+
+    def remove(self, household_id: int) -> None:
+        with self._lock:
+            self._remove(household_id)
+
+    def _remove(self, household_id: int) -> None:
+        household = self.households.pop(household_id, None)
+        if household is None:
+            return
+
+        nickname, surname = household
+        keys = prefix_keys(nickname, surname)
+        for key in keys:
+            # Other households can share the key, so look for this one's id among them
+            start, end = bisect_left(self.keys, key), bisect_right(self.keys, key)
+            position = self.ids.index(household_id, start, end)
+            del self.keys[position]
+            del self.ids[position]
+        self._entry_bytes -= self._household_bytes(household_id, nickname, surname, keys)
+
+    def suggest(self, prefix: str, limit: int) -> list:
+        """Returns up to `limit` (id, nickname, surname) of the households with a key starting with the prefix."""
+        prefix = normalize(prefix)
+        suggestions = {}
+        with self._lock:
+            position = bisect_left(self.keys, prefix)
+            while len(suggestions) < limit and position < len(self.keys) and \
+                    self.keys[position].startswith(prefix):
+                household_id = self.ids[position]
+                if household_id not in suggestions:
+                    suggestions[household_id] = (household_id, *self.households[household_id])
+                position += 1
+        return list(suggestions.values())
+
+    def household_count(self) -> int:
+        return len(self.households)
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the index."""
+        return getsizeof(self.keys) + getsizeof(self.ids) + getsizeof(self.households) + self._entry_bytes
+
+
+def typeahead_query():
+    return select(Household.id, Household.nickname, Household.surname)
+
+
+class TypeaheadCache(object):
+    """Thread-safe holder of the current prefix index, which is loaded from the db when needed."""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._index = None
+        self._lock = Lock()
+
+    def cached(self) -> Optional[PrefixIndex]:
+        """Returns the index if it's loaded & current, without reading the db."""
+        index = self._index
+        if index and monotonic() - index.loaded_at < self.ttl:
+            return index
+        return None
+
+    def get(self) -> PrefixIndex:
+        """Returns the index, loading it from the db if necessary."""
+        index = self.cached()
+        if index:
+            return index
+
+        # A stale index is still served while another thread reloads it
+        stale = self._index
+        if stale is None:
+            self._lock.acquire()
+        elif not self._lock.acquire(blocking=False):
+            return stale
+
+        try:
+            index = self.cached()
+            if index:
+                return index
+            return self.load()
+        finally:
+            self._lock.release()
+
+    def load(self) -> PrefixIndex:
+        start = monotonic()
+        index = PrefixIndex.build(db.session.execute(typeahead_query()))
+        self._index = index
+        logger.info("Loaded the typeahead index: %s households, %s keys, %.1f MiB in %.0fms", index.household_count(),
+                    len(index.keys), index.memory_bytes() / 2 ** 20, (monotonic() - start) * 1000)
+        return index
+
+    def apply(self, changes: dict) -> None:
+        """Applies {household id: (nickname, surname), or None if deleted} to the loaded index, if any."""
+        index = self._index
+        if index is None:
+            return
+
+        for household_id, names in changes.items():
+            if names is None:
+                index.remove(household_id)
+            else:
+                index.put(household_id, *names)
+        logger.debug("Applied %s household changes to the typeahead index", len(changes))
+
+    def invalidate(self) -> None:
+        """Drops the index, which is reloaded on its next use."""
+        self._index = None
+        logger.info("Invalidated the typeahead index")
+
+
+typeahead_cache = TypeaheadCache(ttl=Config.TYPEAHEAD_INDEX_TTL)
+
+
+def _index_stat(name: str) -> Callable:
+    """Reads a stat from the loaded index, stale or not.  There's nothing to report until it's first used."""
+    def read():
+        index = typeahead_cache._index
+        return getattr(index, name)() if index else None
+    return read
+
+
+registry.register(Gauge("typeahead_index_households", "Households in the typeahead index.",
+                        _index_stat("household_count")))
+registry.register(Gauge("typeahead_index_bytes", "Approximate memory held by the typeahead index.",
+                        _index_stat("memory_bytes")))
+
+
+def _names_changed(record: Household) -> bool:
+    state = inspect(record)
+    return state.attrs.nickname.history.has_changes() or state.attrs.surname.history.has_changes()
+
+
+@event.listens_for(Session, "after_flush")
+def flag_household_changes(session, flush_context) -> None:
+    """Remembers the names of the households written, so they can be applied to the index on commit."""
+    for record in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(record, Household):
+            continue
+        if record in session.deleted:
+            session.info.setdefault("changed_households", {})[record.id] = None
+        elif record in session.new or _names_changed(record):
+            session.info.setdefault("changed_households", {})[record.id] = (record.nickname, record.surname)
+
+
+@event.listens_for(Session, "after_commit")
+def apply_household_changes(session) -> None:
+    """Applies the households written in the transaction that was just committed to the index."""
+    changes = session.info.pop("changed_households", None)
+    if changes:
+        typeahead_cache.apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_household_changes(session) -> None:
+    """Nothing was saved, so there's nothing to apply."""
+    session.info.pop("changed_households", None)
@@ -0,0 +1,126 @@
+"""
+Request argument validation for the endpoints.
+
+A `Validator` is an immutable list of `Field`s, built once when its route module is imported.
+Parsing never modifies it, so a single validator is safely shared by every request thread.
+Each field's converter is resolved up front, whereas reqparse tries up to three call signatures
+for every argument's type on every request, so parsing is a dict lookup & a conversion per field.
+
+Errors are reported the same way reqparse reports them: a 400 with `{"message": {field: error}}`.
+"""
+from logging import getLogger
+from inspect import signature
+from functools import partial
+from typing import Callable, Mapping, NamedTuple
+from flask import request
+from flask_restful import abort
+from flask_restful.reqparse import Namespace
+
+logger = getLogger()
+
+# The error reported when a required field is missing, by the field's location
+_MISSING_MESSAGES = {
+    "args": "Missing required parameter in the query string",
+    None:   "Missing required parameter in the JSON body or the post body or the query string",
+}
+
+
+class Field(NamedTuple):
+    """
+    A single argument accepted by an endpoint.
+
+    `location` is "args" for fields only read from the query string.  Otherwise, the field is read
+    from the JSON body first, then from the query string or form data.  `store_missing=False` leaves
+    the field out of the parsed args when the client didn't send it, rather than setting the default.
+    """
+    name: str
+    type: Callable = str
+    required: bool = False
+    nullable: bool = True
+    default: object = None
+    store_missing: bool = True
+    location: str = None
+
+
+def _converter(field: Field) -> Callable:
+    """
+    Returns the function that converts the field's raw value.  The flask_restful.inputs functions
+    take the argument's name, which is used in their error messages.
+    """
+    try:
+        if "argument" in signature(field.type).parameters:
+            return partial(field.type, argument=field.name)
+    except (TypeError, ValueError):
+        # Some builtins, i.e.: `int`, don't expose a signature
+        pass
+    return field.type
+
+
+class Validator(object):
+    """An immutable set of fields that's parsed from each request."""
+    __slots__ = ("_fields", "_reads_body")
+
+    def __init__(self, *fields: Field):
+        object.__setattr__(self, "_fields", tuple((field, _converter(field)) for field in fields))
+
+        # Validators that only read the query string skip decoding the body
+        object.__setattr__(self, "_reads_body", any(field.location != "args" for field in fields))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Validators can't be modified once they're built")
+
+    @property
+    def fields(self) -> tuple:
+        return tuple(field for field, _ in self._fields)
+
+    def extend(self, *fields: Field) -> "Validator":
+        """Returns a new validator with these fields added."""
+        return Validator(*self.fields, *fields)
+
+    def parse(self, source: Mapping = None) -> Namespace:
+        """
+        Returns the converted arguments, read from `source` when provided, or else the current request.
+        Aborts with a 400 when a required field is missing or a value can't be converted.
+        """
+        if source is None:
+            query_args = request.args
+            body, values = {}, query_args
+            if self._reads_body:
+                body = request.get_json(silent=True)
+                body = body if isinstance(body, dict) else {}
+                values = request.values
+        else:
+            body, values, query_args = source, {}, source
+
+        args = Namespace()
+        for field, convert in self._fields:
+            if field.location == "args":
+                present = field.name in query_args
+                value = query_args.get(field.name) if present else None
+            elif field.name in body:
+                present, value = True, body[field.name]
+            else:
+                present = field.name in values
+                value = values.get(field.name) if present else None
+
+            if not present:
+                if field.required:
+                    abort(400, message={field.name: _MISSING_MESSAGES[field.location]})
+                if field.store_missing:
+                    args[field.name] = field.default
+                continue
+
+            if value is None:
+                if not field.nullable:
+                    abort(400, message={field.name: "Must not be null!"})
+                args[field.name] = None
+                continue
+
+            if isinstance(value, str):
+                value = value.strip()
+            try:
+                args[field.name] = convert(value)
+            except Exception as e:
+                abort(400, message={field.name: str(e)})
+
+        return args
@@ -23,9 +23,11 @@ app = create_app()
 from routes.address import AddressCollectionApi, AddressApi
 from routes.household import HouseholdCollectionApi, HouseholdApi
 from routes.event import EventCollectionApi, EventApi
-from routes.gift import GiftCollectionApi, GiftApi
-from routes.card import CardCollectionApi, CardApi
+from routes.gift import GiftCollectionApi, GiftApi, ThankYouWorksheetApi
+from routes.card import CardCollectionApi, CardApi, HolidayCardBatchApi, MailingListApi
 from routes.picklists import PicklistValuesApi
+from routes.search import SearchApi, SuggestApi
+from routes.metrics import MetricsApi
 
 # Since this will only ever be a locally-run app, allow CORS for all domains on all routes
 # https://flask-cors.readthedocs.io/en/latest/
@@ -45,11 +47,18 @@ api.add_resource(EventApi, "/api/v1/event")
 api.add_resource(EventCollectionApi, "/api/v1/all_events")
 api.add_resource(GiftApi, "/api/v1/gift")
 api.add_resource(GiftCollectionApi, "/api/v1/all_gifts")
+api.add_resource(ThankYouWorksheetApi, "/api/v1/thank_you_worksheet")
 api.add_resource(CardApi, "/api/v1/card")
 api.add_resource(CardCollectionApi, "/api/v1/all_cards")
+api.add_resource(HolidayCardBatchApi, "/api/v1/holiday_cards")
+api.add_resource(MailingListApi, "/api/v1/mailing_list")
 api.add_resource(PicklistValuesApi, "/api/v1/picklist_values")
+api.add_resource(SearchApi, "/api/v1/search")
+api.add_resource(SuggestApi, "/api/v1/suggest")
+api.add_resource(MetricsApi, "/metrics")
 logger.debug("Functional endpoints added")
 
+# Local development only; production runs under gunicorn, see gunicorn.conf.py
 if __name__ == "__main__":
     from backend.config import Config
 
@@ -0,0 +1,114 @@
+"""Convert the checkbox fields from "True"/"False" strings to native booleans
+
+Revision ID: 0368d7cde78c
+Revises: abb9fe3b124f
+Create Date: 2026-10-17 11:24:53.000000
+
+"""
+from typing import Sequence, Union
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0368d7cde78c'
+down_revision: Union[str, None] = 'abb9fe3b124f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows updated per transaction while backfilling, so no batch holds row locks for long
+batch_size = 5000
+
+# Checkbox columns, by table
+columns = {
+    "address":   ("is_current", "is_likely_to_change", "mail_the_card_to_this_address"),
+    "household": ("should_receive_holiday_card", "is_relevant"),
+    "event":     ("is_archived",),
+    "gift":      ("should_a_card_be_sent",),
+    "card":      ("was_returned",),
+}
+
+# Partial indexes on these columns are dropped along with the string columns, then rebuilt
+partial_indexes = (
+    ("ix_address_mailing_household_id", "address", ["household_id"],
+     "mail_the_card_to_this_address AND is_current"),
+    ("ix_household_holiday_card_list", "household", ["id"],
+     "should_receive_holiday_card AND is_relevant"),
+)
+
+
+def as_boolean(column: str) -> str:
+    """SQL equivalent of helpers.convert_to_bool(), which treats NULL as False."""
+    return f"coalesce(lower({column}) IN ('true', '1', 't', 'y', 'yes'), false)"
+
+
+def assignments(table: str) -> str:
+    """The SET clause converting every checkbox column of the provided table."""
+    return ", ".join(f"{column}_bool = {as_boolean(column)}" for column in columns[table])
+
+
+def backfill(table: str) -> None:
+    """Copies the string values into the new boolean columns, one batch of ids at a time."""
+    min_id, max_id = op.get_bind().execute(sa.text(f"SELECT min(id), max(id) FROM {table}")).one()
+    if min_id is None:
+        return
+
+    for start in range(min_id - 1, max_id, batch_size):
+        op.execute(sa.text(f"UPDATE {table} SET {assignments(table)} WHERE id > :start AND id <= :end")
+                   .bindparams(start=start, end=start + batch_size))
+
+
+def catch_up(table: str, since: datetime) -> None:
+    """Converts the rows that were written while the batches were running."""
+    op.execute(sa.text(f"UPDATE {table} SET {assignments(table)} WHERE last_modified >= :since")
+               .bindparams(since=since))
+
+
+def upgrade() -> None:
+    # Add the new, nullable columns.  This only touches the catalog, not the rows.
+    for table, table_columns in columns.items():
+        for column in table_columns:
+            op.add_column(table, sa.Column(f"{column}_bool", sa.Boolean(), nullable=True))
+
+    # Backfill in batches, committing each one, so the tables stay writable throughout
+    backfill_started = datetime.now(timezone.utc).replace(tzinfo=None)
+    with op.get_context().autocommit_block():
+        for table in columns:
+            backfill(table)
+
+    # Swap the columns.  The table lock is only held for the catch-up & catalog changes.
+    for table, table_columns in columns.items():
+        op.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+        catch_up(table, backfill_started)
+
+        for column in table_columns:
+            op.drop_column(table, column)
+            op.alter_column(table, f"{column}_bool", new_column_name=column)
+
+    # Rebuild the partial indexes against the boolean columns
+    with op.get_context().autocommit_block():
+        for name, table, index_columns, predicate in partial_indexes:
+            op.create_index(name, table, index_columns, unique=False, if_not_exists=True,
+                            postgresql_concurrently=True, postgresql_where=sa.text(predicate))
+
+
+def downgrade() -> None:
+    # The partial index predicates can't be converted along with the columns
+    with op.get_context().autocommit_block():
+        for name, table, index_columns, predicate in partial_indexes:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+
+    # Downgrades are rare, so a single rewrite of each table is acceptable here
+    for table, table_columns in columns.items():
+        for column in table_columns:
+            op.alter_column(table, column, type_=sa.String(),
+                            postgresql_using=f"CASE WHEN {column} THEN 'True' ELSE 'False' END")
+
+    truthy = "IN ('true', '1', 't', 'y', 'yes')"
+    with op.get_context().autocommit_block():
+        for name, table, index_columns, predicate in partial_indexes:
+            string_predicate = " AND ".join(f"lower({column}) {truthy}" for column in predicate.split(" AND "))
+            op.create_index(name, table, index_columns, unique=False, if_not_exists=True,
+                            postgresql_concurrently=True, postgresql_where=sa.text(string_predicate))
@@ -0,0 +1,45 @@
+"""Add created_date & last_modified to event, gift, and card
+
+Revision ID: 5f3cbf53fd50
+Revises:
+Create Date: 2026-10-17 09:12:41.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f3cbf53fd50'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+tables = ("event", "gift", "card")
+
+
+def upgrade() -> None:
+    for table in tables:
+        # now() is stable within a transaction, so Postgres can add these columns without
+        # rewriting the table.  Existing rows are stamped with the migration time.
+        op.add_column(table, sa.Column("created_date", sa.DateTime(), nullable=False,
+                                       server_default=sa.func.now()))
+        op.add_column(table, sa.Column("last_modified", sa.DateTime(), nullable=False,
+                                       server_default=sa.func.now()))
+
+        # The app sets these values itself, matching the household & address tables
+        op.alter_column(table, "created_date", server_default=None)
+        op.alter_column(table, "last_modified", server_default=None)
+
+        op.create_index(op.f(f"ix_{table}_created_date"), table, ["created_date"], unique=False)
+        op.create_index(op.f(f"ix_{table}_last_modified"), table, ["last_modified"], unique=False)
+
+
+def downgrade() -> None:
+    for table in tables:
+        op.drop_index(op.f(f"ix_{table}_last_modified"), table_name=table)
+        op.drop_index(op.f(f"ix_{table}_created_date"), table_name=table)
+        op.drop_column(table, "last_modified")
+        op.drop_column(table, "created_date")
@@ -0,0 +1,37 @@
+"""Index the columns the collection endpoints can be sorted by
+
+Revision ID: 7c41e2d9a6b0
+Revises: 0368d7cde78c
+Create Date: 2026-10-17 13:08:41.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c41e2d9a6b0'
+down_revision: Union[str, None] = '0368d7cde78c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns)
+indexes = (
+    ("ix_household_surname", "household", ["surname"]),
+    ("ix_event_date", "event", ["date"]),
+)
+
+
+def upgrade() -> None:
+    # See abb9fe3b124f: CONCURRENTLY doesn't block writes, but can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in indexes:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True,
+                            postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(indexes):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
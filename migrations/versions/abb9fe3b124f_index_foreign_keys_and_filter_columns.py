@@ -0,0 +1,52 @@
+"""Index foreign keys and frequently filtered columns
+
+Revision ID: abb9fe3b124f
+Revises: 5f3cbf53fd50
+Create Date: 2026-10-17 10:02:18.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'abb9fe3b124f'
+down_revision: Union[str, None] = '5f3cbf53fd50'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Matches the string comparison the app uses for these flags, so the planner can use the partial indexes
+truthy = "IN ('true', '1', 't', 'y', 'yes')"
+
+# (name, table, columns, partial index predicate)
+indexes = (
+    ("ix_address_household_id", "address", ["household_id"], None),
+    ("ix_address_mailing_household_id", "address", ["household_id"],
+     f"lower(mail_the_card_to_this_address) {truthy} AND lower(is_current) {truthy}"),
+    ("ix_household_holiday_card_list", "household", ["id"],
+     f"lower(should_receive_holiday_card) {truthy} AND lower(is_relevant) {truthy}"),
+    ("ix_gift_event_id", "gift", ["event_id"], None),
+    ("ix_gift_household_id", "gift", ["household_id"], None),
+    ("ix_card_event_id_household_id", "card", ["event_id", "household_id"], None),
+    ("ix_card_household_id", "card", ["household_id"], None),
+    ("ix_card_gift_id", "card", ["gift_id"], None),
+    ("ix_card_address_id", "card", ["address_id"], None),
+)
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY doesn't block writes, but can't run inside a transaction.
+    # If a build fails, Postgres leaves an INVALID index behind: drop it and re-run this migration.
+    with op.get_context().autocommit_block():
+        for name, table, columns, predicate in indexes:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True,
+                            postgresql_concurrently=True,
+                            postgresql_where=sa.text(predicate) if predicate else None)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, predicate in reversed(indexes):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
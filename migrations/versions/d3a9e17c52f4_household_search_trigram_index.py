@@ -0,0 +1,42 @@
+"""Add a trigram index for the household search
+
+Revision ID: d3a9e17c52f4
+Revises: 7c41e2d9a6b0
+Create Date: 2026-10-17 16:20:05.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a9e17c52f4'
+down_revision: Union[str, None] = '7c41e2d9a6b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match household_search_text() in models/models.py exactly, or the planner won't use the index
+search_columns = ("nickname", "first_names", "surname", "formal_name", "kids", "pets")
+search_text = " || ' ' || ".join(f"coalesce({column}, '')" for column in search_columns)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # See abb9fe3b124f: CONCURRENTLY doesn't block writes, but can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_household_search_trgm "
+                   f"ON household USING gist (({search_text}) gist_trgm_ops)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    # The extension is left installed, since other database objects may depend on it
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_household_search_trgm")
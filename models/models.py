@@ -6,6 +6,7 @@ from logging import getLogger
 from datetime import datetime, timezone
 from backend import db
 from helpers.helpers import convert_to_bool
+from sqlalchemy import DDL, event
 
 logger = getLogger()
 
@@ -19,11 +20,17 @@ class Address(db.Model):
     # Set the name of this table
     __tablename__ = 'address'
 
+    # Cards are mailed to each household's current, mail-to address; keep those lookups small
+    __table_args__ = (
+        db.Index("ix_address_mailing_household_id", "household_id",
+                 postgresql_where=db.text("mail_the_card_to_this_address AND is_current")),
+    )
+
     # Unique identifier is a simple auto-increment integer handled by the db
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, unique=True)
 
     # Related household_id for this address record
-    household_id = db.Column(db.Integer, db.ForeignKey('household.id'))
+    household_id = db.Column(db.Integer, db.ForeignKey('household.id'), index=True)
 
     # First line of the street address
     line_1 = db.Column(db.String)
@@ -47,13 +54,13 @@ class Address(db.Model):
     full_address = db.Column(db.String)
 
     # Quick way to flag stale data, or for friends who move to a temporary spot
-    is_current = db.Column(db.String, default="True")
+    is_current = db.Column(db.Boolean, default=True)
 
     # All apartment addresses will default to True
-    is_likely_to_change = db.Column(db.String, default="False")
+    is_likely_to_change = db.Column(db.Boolean, default=False)
 
     # When a household has more than 1 address, which one should the card be mailed to?
-    mail_the_card_to_this_address = db.Column(db.String, default="True")
+    mail_the_card_to_this_address = db.Column(db.Boolean, default=True)
 
     # Storing basic metadata is helpful
     created_date = db.Column(db.DateTime, index=True, nullable=False, default=datetime.now(timezone.utc))
@@ -73,9 +80,9 @@ class Address(db.Model):
             "zip":                 self.zip,
             "country":             self.country,
             "full_address":        self.full_address,
-            "is_current":          convert_to_bool(self.is_current),
-            "is_likely_to_change": convert_to_bool(self.is_likely_to_change),
-            "mail_the_card_to_this_address": convert_to_bool(self.mail_the_card_to_this_address),
+            "is_current":          self.is_current,
+            "is_likely_to_change": self.is_likely_to_change,
+            "mail_the_card_to_this_address": self.mail_the_card_to_this_address,
             "created_date":        self.created_date.strftime(
                 "%Y-%m-%d %H:%M:%S%z") if self.created_date else datetime.now(timezone.utc),
             "last_modified":       self.last_modified.strftime(
@@ -121,6 +128,12 @@ class Household(db.Model):
     # Set the name of this table
     __tablename__ = "household"
 
+    # Households on the holiday card list
+    __table_args__ = (
+        db.Index("ix_household_holiday_card_list", "id",
+                 postgresql_where=db.text("should_receive_holiday_card AND is_relevant")),
+    )
+
     # Unique identifier is a simple auto-increment integer
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, unique=True)
 
@@ -134,7 +147,7 @@ class Household(db.Model):
 
     # Primary surname for this household.  Households with multiple surnames will be challenging
     # to implement; I'll find a better solution for this down the road.
-    surname = db.Column(db.String)
+    surname = db.Column(db.String, index=True)
 
     # To whom should letters be addressed for this household?
     address_to = db.Column(db.String)
@@ -165,11 +178,11 @@ class Household(db.Model):
     # Pets are important household members too!
     pets = db.Column(db.String)
 
-    # Do we want this household on our holiday/Christmas card list?  0 = False, 1 = True
-    should_receive_holiday_card = db.Column(db.String, default="False")
+    # Do we want this household on our holiday/Christmas card list?
+    should_receive_holiday_card = db.Column(db.Boolean, default=False)
 
     # Are these people still relevant to us?
-    is_relevant = db.Column(db.String, default="True")
+    is_relevant = db.Column(db.Boolean, default=True)
 
     # Storing basic metadata is helpful
     created_date = db.Column(db.DateTime, index=True, nullable=False, default=datetime.now(timezone.utc))
@@ -195,8 +208,8 @@ class Household(db.Model):
             "family_side":                 self.family_side,
             "kids":                        self.kids,
             "pets":                        self.pets,
-            "should_receive_holiday_card": convert_to_bool(self.should_receive_holiday_card),
-            "is_relevant":                 convert_to_bool(self.is_relevant),
+            "should_receive_holiday_card": self.should_receive_holiday_card,
+            "is_relevant":                 self.is_relevant,
             "created_date":                self.created_date.strftime(
                 "%Y-%m-%d %H:%M:%S%z") if self.created_date else datetime.now(timezone.utc),
             "last_modified":               self.last_modified.strftime(
@@ -214,8 +227,10 @@ class Household(db.Model):
             self.created_date = now
             self.last_modified = now
 
-        # Convert the provided value for should_receive_holiday_card to boolean
+        # Convert the provided values for checkbox fields to boolean
         self.should_receive_holiday_card = convert_to_bool(self.should_receive_holiday_card)
+        if self.is_relevant is not None:
+            self.is_relevant = convert_to_bool(self.is_relevant)
 
     def __repr__(self):
         return f"Household(id={self.id}, nick={self.nickname}, first={self.first_names}, " \
@@ -227,6 +242,35 @@ class Household(db.Model):
                f"created_date={self.created_date}, last_modified={self.last_modified})"
 
 
+# Household fields matched by the search endpoint (routes/search.py)
+HOUSEHOLD_SEARCH_COLUMNS = tuple(Household.__table__.c[name] for name in (
+    "nickname", "first_names", "surname", "formal_name", "kids", "pets"))
+
+
+def household_search_text():
+    """
+    The searchable household fields as a single string, which the trigram index is built on.  Queries
+    must use this exact expression for Postgres to use the index.  The fields are joined with `||`
+    rather than concat_ws() because index expressions must be immutable, and the literals are
+    written inline rather than bound, so that prepared statements' generic plans still match the index.
+    """
+    search_text = None
+    for column in HOUSEHOLD_SEARCH_COLUMNS:
+        value = db.func.coalesce(column, db.text("''"))
+        search_text = value if search_text is None else \
+            search_text.op("||", return_type=db.String)(db.text("' '")).op("||", return_type=db.String)(value)
+    return search_text
+
+
+# Trigram index for the typo-tolerant household search, which needs the pg_trgm extension.  GiST rather
+# than GIN, because only GiST can return the nearest matches in order (`ORDER BY ... <->> ... LIMIT n`)
+# instead of scoring & sorting every match of a common name
+db.Index("ix_household_search_trgm", household_search_text().label("search_text"),
+         postgresql_using="gist", postgresql_ops={"search_text": "gist_trgm_ops"}).ddl_if(dialect="postgresql")
+event.listen(Household.__table__, "before_create",
+             DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+
+
 class Event(db.Model):
     """
     Store data about events that we'll want to send greeting (or thank you) cards for.
@@ -242,30 +286,45 @@ class Event(db.Model):
     name = db.Column(db.String)
 
     # Date of the event, if applicable
-    date = db.Column(db.Date)
+    date = db.Column(db.Date, index=True)
 
     # For annual events like holiday cards, it makes more sense to only capture the event's year
     year = db.Column(db.Integer, default=datetime.now(timezone.utc).year)
 
     # Events get archived once all greeting (or thank-you) cards are sent
-    is_archived = db.Column(db.String, default="False")
+    is_archived = db.Column(db.Boolean, default=False)
+
+    # Storing basic metadata is helpful
+    created_date = db.Column(db.DateTime, index=True, nullable=False, default=datetime.now(timezone.utc))
+    last_modified = db.Column(db.DateTime, index=True, nullable=False, default=datetime.now(timezone.utc))
 
     # Additional context about this event
     notes = db.Column(db.String)
 
     def to_dict(self):
         return {
-            "id":          self.id,
-            "name":        self.name,
-            "date":        self.date.strftime("%Y-%m-%d") if self.date else None,
-            "year":        self.year,
-            "is_archived": convert_to_bool(self.is_archived),
-            "notes":       self.notes
+            "id":            self.id,
+            "name":          self.name,
+            "date":          self.date.strftime("%Y-%m-%d") if self.date else None,
+            "year":          self.year,
+            "is_archived":   self.is_archived,
+            "created_date":  self.created_date.strftime(
+                "%Y-%m-%d %H:%M:%S%z") if self.created_date else datetime.now(timezone.utc),
+            "last_modified": self.last_modified.strftime(
+                "%Y-%m-%d %H:%M:%S%z") if self.last_modified else datetime.now(timezone.utc),
+            "notes":         self.notes
         }
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+        # Ensure each record has created and last_modified dates
+        if not self.created_date:
+            now = datetime.now(timezone.utc)
+            logger.debug(f"No created_date found for event_id={self.id}.  Setting to {now}.")
+            self.created_date = now
+            self.last_modified = now
+
         # Convert the provided value for is_archived to boolean
         self.is_archived = convert_to_bool(self.is_archived)
 
@@ -286,10 +345,10 @@ class Gift(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, unique=True)
 
     # Event that the gift was from
-    event_id = db.Column(db.Integer, db.ForeignKey('event.id'))
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'), index=True)
 
     # Household who gifted the item
-    household_id = db.Column(db.Integer)
+    household_id = db.Column(db.Integer, index=True)
 
     # List of households who contributed to this gift
     households = db.Column(db.Integer)
@@ -309,7 +368,11 @@ class Gift(db.Model):
     date = db.Column(db.Date, index=True)
 
     # Some friends & family ask you not to send a thank-you card
-    should_a_card_be_sent = db.Column(db.String, default="True")
+    should_a_card_be_sent = db.Column(db.Boolean, default=True)
+
+    # Storing basic metadata is helpful
+    created_date = db.Column(db.DateTime, index=True, nullable=False, default=datetime.now(timezone.utc))
+    last_modified = db.Column(db.DateTime, index=True, nullable=False, default=datetime.now(timezone.utc))
 
     # Additional context about this gift
     notes = db.Column(db.String)
@@ -323,13 +386,24 @@ class Gift(db.Model):
             "type":                  self.type,
             "origin":                self.origin,
             "date":                  self.date.strftime("%Y-%m-%d") if self.date else None,
-            "should_a_card_be_sent": convert_to_bool(self.should_a_card_be_sent),
+            "should_a_card_be_sent": self.should_a_card_be_sent,
+            "created_date":          self.created_date.strftime(
+                "%Y-%m-%d %H:%M:%S%z") if self.created_date else datetime.now(timezone.utc),
+            "last_modified":         self.last_modified.strftime(
+                "%Y-%m-%d %H:%M:%S%z") if self.last_modified else datetime.now(timezone.utc),
             "notes":                 self.notes
         }
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+        # Ensure each record has created and last_modified dates
+        if not self.created_date:
+            now = datetime.now(timezone.utc)
+            logger.debug(f"No created_date found for gift_id={self.id}.  Setting to {now}.")
+            self.created_date = now
+            self.last_modified = now
+
         # Convert the provided value for should_a_card_be_sent to boolean
         self.should_a_card_be_sent = convert_to_bool(self.should_a_card_be_sent)
 
@@ -347,6 +421,12 @@ class Card(db.Model):
     # Set the name of this table
     __tablename__ = "card"
 
+    # Cards are almost always looked up by event, and often by household within an event.
+    #  This index also serves lookups by event_id alone.
+    __table_args__ = (
+        db.Index("ix_card_event_id_household_id", "event_id", "household_id"),
+    )
+
     # Unique identifier is a simple auto-increment integer
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, unique=True)
 
@@ -354,43 +434,62 @@ class Card(db.Model):
     type = db.Column(db.String)
 
     # Was this card returned to sender?
-    was_returned =  db.Column(db.String, default="False")
+    was_returned = db.Column(db.Boolean, default=False)
 
     # If this is a thank-you card, which gift is this card for?
-    gift_id = db.Column(db.Integer, db.ForeignKey('gift.id'))
+    gift_id = db.Column(db.Integer, db.ForeignKey('gift.id'), index=True)
 
     # Which event is this for?
     event_id = db.Column(db.Integer, db.ForeignKey('event.id'))
 
     # Storing the hh_id for clarity, despite being able to reference it using the `gift_id` above
     # Another reminder that getting to 1NF isn't important for this project :)
-    household_id = db.Column(db.Integer, db.ForeignKey('household.id'))
+    household_id = db.Column(db.Integer, db.ForeignKey('household.id'), index=True)
 
     # Indicates which address the card was intended for
-    address_id = db.Column(db.Integer, db.ForeignKey('address.id'))
+    address_id = db.Column(db.Integer, db.ForeignKey('address.id'), index=True)
 
     # Stores the date
     date_sent = db.Column(db.Date, index=True)
 
+    # Storing basic metadata is helpful
+    created_date = db.Column(db.DateTime, index=True, nullable=False, default=datetime.now(timezone.utc))
+    last_modified = db.Column(db.DateTime, index=True, nullable=False, default=datetime.now(timezone.utc))
+
     # Additional context about this card
     notes = db.Column(db.String)
 
     def to_dict(self):
         return {
-            "id":           self.id,
-            "type":         self.type,
-            "was_returned": self.was_returned,
-            "gift_id":      self.gift_id,
-            "event_id":     self.event_id,
-            "household_id": self.household_id,
-            "address_id":   self.address_id,
-            "date_sent":    self.date_sent.strftime("%Y-%m-%d") if self.date_sent else None,
-            "notes":        self.notes
+            "id":            self.id,
+            "type":          self.type,
+            "was_returned":  self.was_returned,
+            "gift_id":       self.gift_id,
+            "event_id":      self.event_id,
+            "household_id":  self.household_id,
+            "address_id":    self.address_id,
+            "date_sent":     self.date_sent.strftime("%Y-%m-%d") if self.date_sent else None,
+            "created_date":  self.created_date.strftime(
+                "%Y-%m-%d %H:%M:%S%z") if self.created_date else datetime.now(timezone.utc),
+            "last_modified": self.last_modified.strftime(
+                "%Y-%m-%d %H:%M:%S%z") if self.last_modified else datetime.now(timezone.utc),
+            "notes":         self.notes
         }
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+        # Ensure each record has created and last_modified dates
+        if not self.created_date:
+            now = datetime.now(timezone.utc)
+            logger.debug(f"No created_date found for card_id={self.id}.  Setting to {now}.")
+            self.created_date = now
+            self.last_modified = now
+
+        # Convert the provided value for was_returned to boolean
+        if self.was_returned is not None:
+            self.was_returned = convert_to_bool(self.was_returned)
+
     def __repr__(self):
         return f"Card(id={self.id}, type={self.type}, was_returned={self.was_returned}, " \
                f"event={self.event_id}, gift={self.gift_id}, hh={self.household_id}, " \
@@ -1,21 +1,63 @@
-from os import mkdir, path
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from os import environ, mkdir, path
+from queue import SimpleQueue
+import atexit
 import logging
 
 
 # Create the logging directory, if necessary
-logging_directory = "./logs"
+logging_directory = environ.get("LOG_DIRECTORY", "./logs")
 if not path.exists(logging_directory):
     mkdir(logging_directory)
 
-# Set config parameters
-logging.basicConfig(filename=f"{logging_directory}/greeting-cards.log",
-                    level=logging.DEBUG,
-                    datefmt="%Y-%m-%d %H:%M:%S",
-                    filemode="w",
-                    format="%(asctime)s | %(name)s | %(levelname)s | %(message)s")
+# DEBUG logging is only on by default when debug mode is.  create_app() re-applies Config.LOG_LEVEL.
+log_level = environ.get("LOG_LEVEL", "DEBUG" if environ.get("DEBUG_ENABLED", "False").lower() == "true"
+                        else "INFO").upper()
+
+# Rotate by size instead of truncating the log every time the app starts
+file_handler = RotatingFileHandler(f"{logging_directory}/greeting-cards.log",
+                                   maxBytes=int(environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+                                   backupCount=int(environ.get("LOG_BACKUP_COUNT", 5)))
+file_handler.setFormatter(logging.Formatter(fmt="%(asctime)s | %(name)s | %(levelname)s | %(message)s",
+                                            datefmt="%Y-%m-%d %H:%M:%S"))
 
 # Initialize the root logger
 logger = logging.getLogger()
+logger.setLevel(log_level)
+
+# By default, request threads only put records on a queue, and the listener's thread writes them to
+# the file, so a slow disk doesn't slow down requests.  The message itself is still formatted on the
+# calling thread (QueueHandler.prepare() merges its args), so pass the values as args rather than an
+# f-string: they're then only formatted when the level is enabled.  The file's layout & timestamps
+# are applied on the listener's thread.
+log_listener = None
+if environ.get("LOG_QUEUE_ENABLED", "True").lower() == "true":
+    log_queue = SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    log_listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    log_listener.start()
+
+    # Flush whatever is still queued when the process exits
+    atexit.register(log_listener.stop)
+else:
+    logger.addHandler(file_handler)
+
+
+def restart_log_listener() -> None:
+    """
+    Threads don't survive a fork, so each worker process starts a listener of its own, over the same
+    queue & handlers as the one inherited from the master.
+    """
+    global log_listener
+    if log_listener is None:
+        return
+
+    atexit.unregister(log_listener.stop)
+    log_listener = QueueListener(log_listener.queue, *log_listener.handlers, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+
+
 logger.info(f"Initialized root logger at level: {logger.getEffectiveLevel()}")
 
 # Define a global variable that indicates whether this app is running on the local machine
@@ -1,38 +1,43 @@
 """Defines the address-related endpoints."""
-from logging import getLogger
+from logging import getLogger, DEBUG
 from datetime import datetime, timezone
 from backend import db
+from helpers.helpers import convert_to_bool
+from helpers.filtering import address_filters
+from helpers.conditional import collection_validators, record_validators
+from helpers.pagination import check_cursor, parse_pagination_args, paginate, split_page
+from helpers.serializers import address_serializer, parse_fields_arg
+from helpers.streaming import parse_stream_arg, stream_json_array
+from helpers.validation import Field, Validator
 from models.models import Address
 from flask import request, jsonify
-from flask_restful import Resource, reqparse
+from flask_restful import Resource
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError, InvalidRequestError, NoResultFound
 import json
 
 logger = getLogger()
 
-# Initialize a parser for the request parameters
-base_parser = reqparse.RequestParser(trim=True)
-
 # `id` is required for most requests
-base_parser.add_argument("id", type=int, nullable=False, required=True)
-
-def add_address_fields_to_parser(provided_parser) -> reqparse:
-    """Adds the remaining address-related fields to a given parser."""
-    logger.debug("Adding address fields to the parser")
-    provided_parser.add_argument("line_1", type=str)
-    provided_parser.add_argument("line_2", type=str)
-    provided_parser.add_argument("city", type=str)
-    provided_parser.add_argument("state", type=str)
-    provided_parser.add_argument("zip", type=str)
-    provided_parser.add_argument("country", type=str, default="United States")
-    provided_parser.add_argument("is_current", type=str)
-    provided_parser.add_argument("is_likely_to_change", type=str)
-    provided_parser.add_argument("mail_the_card_to_this_address", type=str)
-    provided_parser.add_argument("notes", type=str)
-
-    logger.debug("Done adding address fields to the parser")
-    return provided_parser
+address_id_field = Field("id", int, nullable=False, required=True)
+
+# The remaining address-related fields.  The checkbox defaults match the model's column defaults.
+address_fields = (
+    Field("line_1", str),
+    Field("line_2", str),
+    Field("city", str),
+    Field("state", str),
+    Field("zip", str),
+    Field("country", str, default="United States"),
+    Field("is_current", convert_to_bool, default=True),
+    Field("is_likely_to_change", convert_to_bool, default=False),
+    Field("mail_the_card_to_this_address", convert_to_bool, default=True),
+    Field("notes", str),
+)
+
+# The arguments accepted by each method.  These are shared by every request & never modified.
+address_id_validator = Validator(address_id_field)
+address_validator = Validator(address_id_field, *address_fields)
 
 
 class AddressCollectionApi(Resource):
@@ -44,16 +49,51 @@ class AddressCollectionApi(Resource):
     @staticmethod
     # @cross_origin()
     def get() -> json:
-        """Return all addresses from the database"""
+        """
+        Return addresses from the database, sorted by id unless another sort is requested.
+
+        OPTIONAL ARGUMENTS
+            key: after_id, type: int -- only return records that sort after the record with this id
+            key: limit, type: int -- max number of records to return, DEFAULT_PAGE_SIZE (100) by default
+                unless streamed
+            key: stream, type: bool -- stream the records as they're read instead of in one response
+            key: fields, type: str -- comma-separated list of the fields to return
+            key: sort, type: str -- field to sort by; prefix with "-" to sort in descending order
+            key: <field>, <field>__in, <field>__gte, <field>__lte -- filters, see helpers/filtering.py
+        """
         logger.debug("Start of AddressCollectionAPI.GET")
         # print("Start of AddressCollectionAPI.GET")
         logger.debug(request)
 
-        # Retrieve all addresses from the db, sorted by id
+        # Parse the optional pagination, streaming, projection, filter & sort arguments
+        stream = parse_stream_arg()
+        after_id, limit = parse_pagination_args(stream)
+        serializer = parse_fields_arg(address_serializer)
+        filters = address_filters.parse()
+        check_cursor(filters.sort, Address.id, after_id)
+
+        # Retrieve a page of matching addresses from the db, in the requested order
         try:
-            query = select(Address).order_by(Address.id.asc())
-            addresses = db.session.execute(query).scalars().all()
-            logger.info(f"Successfully retrieved data for {addresses.__len__()} addresses.")
+            # Answer with a 304 when the client's cached copy of this collection is still current
+            validators = collection_validators(Address)
+            if validators.match_request():
+                logger.debug("End of AddressCollectionAPI.GET")
+                return validators.not_modified()
+
+            # Large reads can be streamed to the client rather than compiled into a list
+            if stream:
+                query = paginate(serializer.select().where(*filters.conditions), Address.id, after_id, limit,
+                                 look_ahead=False, sort=filters.sort)
+                logger.debug("End of AddressCollectionAPI.GET")
+                return stream_json_array(query, serializer.serialize, headers=validators.headers())
+
+            # Select plain column tuples; this read-only path doesn't need ORM instances
+            query = paginate(serializer.select().where(*filters.conditions), Address.id, after_id, limit,
+                             sort=filters.sort)
+            addresses = db.session.execute(query).all()
+            addresses, headers = split_page(addresses, limit)
+            headers.update(validators.headers())
+            logger.info("Successfully retrieved data for %s addresses.", addresses.__len__())
 
         except SQLAlchemyError as e:
             error_msg = f"SQLAlchemyError retrieving data: {e}"
@@ -69,12 +109,10 @@ class AddressCollectionApi(Resource):
 
         # Compile these data into a list
         try:
-            output = []
-            for address in addresses:
-                output.append(address.to_dict())
+            output = serializer.serialize_all(addresses)
 
             logger.debug("End of AddressCollectionAPI.GET")
-            return output, 200
+            return output, 200, headers
 
         except BaseException as e:
             error_msg = f"Error compiling data into a list of `dict` to return: {e}"
@@ -92,26 +130,35 @@ class AddressApi(Resource):
     @staticmethod
     def get() -> json:
         """Return data for the specified address id"""
-        logger.debug(f"Start of AddressAPI.GET")
+        logger.debug("Start of AddressAPI.GET")
         logger.debug(request)
 
         # Parse the provided arguments
-        args = base_parser.parse_args()
-        logger.debug(f"Args parsed successfully: {args.__str__()}")
+        args = address_id_validator.parse()
+        logger.debug("Args parsed successfully: %s", args)
 
         address_id = args["id"]
 
+        # Only select the requested fields, if any were specified
+        serializer = parse_fields_arg(address_serializer)
+
         # Retrieve the selected record
         try:
+            # Answer with a 304 when the client's cached copy of this record is still current
+            validators = record_validators(Address, address_id)
+            if validators and validators.match_request():
+                logger.debug("End of AddressAPI.GET")
+                return validators.not_modified()
+
             # address = Address.query.get(address_id)
-            query = select(Address).where(Address.id == address_id)
-            address = db.session.execute(query).scalar_one()
+            query = serializer.select().where(Address.id == address_id).execution_options(prepare=True)
+            address = serializer.serialize(db.session.execute(query).one())
 
             if address:
                 # Record successfully returned from the db
-                logger.info(f"Address found!")
+                logger.info("Address found!")
                 logger.debug("End of AddressAPI.GET")
-                return address.to_dict(), 200
+                return address, 200, validators.headers() if validators else {}
             else:
                 # No record with this id exists in the db
                 error_msg = f"No records found for address id={address_id}."
@@ -122,23 +169,20 @@ class AddressApi(Resource):
         except (InvalidRequestError, NoResultFound, AttributeError) as e:
             error_msg = f"No records found for address id={address_id}.\n{e}"
             logger.info(error_msg)
-            logger.debug(f"End of AddressAPI.GET")
+            logger.debug("End of AddressAPI.GET")
             return jsonify({"error": error_msg}, status=404)
 
     @staticmethod
     def post() -> json:
         """Add a new address to the database"""
-        logger.debug(f"Start of AddressAPI.POST")
+        logger.debug("Start of AddressAPI.POST")
         logger.debug(request)
 
-        # Define the parameters used by this endpoint
-        parser = add_address_fields_to_parser(base_parser)
-
         # Parse the arguments provided
         try:
             logger.debug("Attempting to parse the arguments")
-            args = parser.parse_args()
-            logger.debug(f"Args parsed successfully: {args.__str__()}")
+            args = address_validator.parse()
+            logger.debug("Args parsed successfully: %s", args)
         except BaseException as e:
             error_msg = f"Unable to parse the address arguments.\n{e}"
             logger.debug(error_msg)
@@ -152,9 +196,10 @@ class AddressApi(Resource):
 
         # Create a new Address record using the provided data
         try:
-            logger.debug(f"Attempting to create an Address from the args.")
+            logger.debug("Attempting to create an Address from the args.")
             new_address = Address(**args.__str__())
-            logger.info(f"New record successfully created: {new_address.to_dict()}")
+            if logger.isEnabledFor(DEBUG):
+                logger.debug("New record successfully created: %s", new_address.to_dict())
 
             # Set metadata for this new record
             new_address.date_created = datetime.now(timezone.utc)
@@ -178,17 +223,14 @@ class AddressApi(Resource):
     @staticmethod
     def put() -> json:
         """Update an existing record by address_id"""
-        logger.debug(f"Start of AddressAPI.PUT")
+        logger.debug("Start of AddressAPI.PUT")
         logger.debug(request)
 
-        # Define the parameters used by this endpoint
-        parser = add_address_fields_to_parser(base_parser)
-
         # Parse the arguments provided
         logger.debug("Attempting to parse the arguments")
         try:
-            args = parser.parse_args()
-            logger.debug(f"Args parsed successfully: {args.__str__()}")
+            args = address_validator.parse()
+            logger.debug("Args parsed successfully: %s", args)
         except BaseException as e:
             error_msg = f"Unable to parse the arguments Address record.\n{e}"
             logger.debug(error_msg)
@@ -203,8 +245,8 @@ class AddressApi(Resource):
         try:
             # Retrieve the specified address record
             # address = Address.query.get(args["id"])
-            logger.debug(f"Attempting to query for address id={args.id}")
-            query = select(Address).where(Address.id == args["id"])
+            logger.debug("Attempting to query for address id=%s", args.id)
+            query = select(Address).where(Address.id == args["id"]).execution_options(prepare=True)
             address = db.session.execute(query).scalar_one()
 
             # Update this record with the provided data
@@ -239,32 +281,32 @@ class AddressApi(Resource):
     @staticmethod
     def delete() -> json:
         """Delete the specified record by address id"""
-        logger.debug(f"Start of AddressAPI.DELETE")
+        logger.debug("Start of AddressAPI.DELETE")
         logger.debug(request)
 
         # Parse the provided arguments
-        args = base_parser.parse_args()
-        logger.debug(f"Args parsed successfully: {args.__str__()}")
+        args = address_id_validator.parse()
+        logger.debug("Args parsed successfully: %s", args)
 
         # Validate that an address id was provided
         try:
             address_id = args["id"]
-            logger.debug(f"Address id={address_id} was read successfully")
+            logger.debug("Address id=%s was read successfully", address_id)
         except KeyError as e:
             error_msg = f"Error parsing `id`: no value was provided. {e}"
             logger.info(error_msg)
-            logger.debug(f"End of AddressAPI.DELETE")
+            logger.debug("End of AddressAPI.DELETE")
             return jsonify({"error": error_msg}, status=400)
 
         # Retrieve the selected record
         try:
             # address = Address.query.get(address_id)
-            query = select(Address).where(Address.id == address_id)
+            query = select(Address).where(Address.id == address_id).execution_options(prepare=True)
             address_to_delete = db.session.execute(query).scalar_one()
 
             if address_to_delete:
                 # Record successfully returned from the db
-                logger.debug(f"Address record found, attempting to delete it.")
+                logger.debug("Address record found, attempting to delete it.")
                 address_to_delete.delete()
 
                 logger.debug("About to commit this DELETE to the db.")
@@ -272,23 +314,23 @@ class AddressApi(Resource):
                 logger.debug("Commit completed.")
                 logger.info("Address record successfully deleted.")
 
-                logger.debug(f"End of AddressAPI.DELETE")
+                logger.debug("End of AddressAPI.DELETE")
                 return address_to_delete.to_dict(), 200
             else:
                 # No record with this id exists in the db
                 error_msg = f"No record found for address id={address_id}."
                 logger.info(error_msg)
-                logger.debug(f"End of AddressAPI.DELETE")
+                logger.debug("End of AddressAPI.DELETE")
                 return jsonify({"error": error_msg}, status=404)
 
         except (InvalidRequestError, NoResultFound, AttributeError) as e:
             error_msg = f"No record found for address id={address_id}.\n{e}"
             logger.info(error_msg)
-            logger.debug(f"End of AddressAPI.DELETE")
+            logger.debug("End of AddressAPI.DELETE")
             return jsonify({"error": error_msg}, status=404)
 
         except SQLAlchemyError as e:
             error_msg = f"SQLAlchemy error when attempting to delete address id={address_id}.\n{e}"
             logger.info(error_msg)
-            logger.debug(f"End of AddressAPI.DELETE")
+            logger.debug("End of AddressAPI.DELETE")
             return jsonify({"error": error_msg}, status=500)
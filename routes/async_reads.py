@@ -0,0 +1,155 @@
+"""
+Async versions of the read endpoints, served by the optional ASGI entry point (asgi.py).
+
+Each handler runs inside a Flask request context built from the ASGI request, so its arguments,
+filters, sparse fieldsets, pagination & cache validators are handled by the same helpers as the
+sync Resources.  Only the queries are different: they're awaited on an AsyncSession, so a request
+waiting on the db doesn't hold a thread.  Responses are the same as the sync endpoints'.
+
+Streamed collection reads (`?stream=true`) are left to the sync endpoints.
+"""
+from logging import getLogger
+from typing import Callable
+from sqlalchemy.ext.asyncio import AsyncSession
+from helpers.conditional import (collection_state_query, build_collection_validators, record_state_query,
+                                 build_record_validators)
+from helpers.includes import Includes, household_includes, event_includes, with_included_state, \
+    prepare_records, included_queries, attach
+from helpers.filtering import CollectionFilters, address_filters, household_filters, event_filters, gift_filters, \
+    card_filters
+from helpers.pagination import check_cursor_row, cursor_row_query, parse_pagination_args, paginate, \
+    split_page
+from helpers.picklists import picklist_cache, picklist_query
+from helpers.serializers import RowSerializer, parse_fields_arg, address_serializer, household_serializer, \
+    event_serializer, gift_serializer, card_serializer
+from helpers.validation import Validator
+from models.models import Address, Household, Event, Gift, Card
+from routes.address import address_id_validator
+from routes.household import household_id_validator
+from routes.event import event_id_validator
+from routes.gift import gift_id_validator
+from routes.card import card_id_validator
+from routes.picklists import picklist_validator
+
+logger = getLogger()
+
+
+async def load_included(session: AsyncSession, relations: tuple, records: list) -> None:
+    """Same as helpers.includes.load_included(), on the async session."""
+    if not relations or not records:
+        return
+
+    records_by_id = prepare_records(relations, records)
+    for relation, query in included_queries(relations, list(records_by_id)):
+        attach(records_by_id, relation, (await session.execute(query)).all())
+
+
+async def included_states(session: AsyncSession, relations: tuple, parent_id: int = None) -> list:
+    return [(await session.execute(relation.state_query(parent_id))).one() for relation in relations]
+
+
+def collection_reader(model, filters: CollectionFilters, serializer: RowSerializer,
+                      includes: Includes = None) -> Callable:
+    """Returns the handler for a collection endpoint, i.e.: /api/v1/all_households"""
+    name = model.__tablename__
+
+    async def read(session: AsyncSession):
+        # Parse the optional pagination, projection, include, filter & sort arguments
+        after_id, limit = parse_pagination_args()
+        requested = parse_fields_arg(serializer)
+        relations = includes.parse() if includes else ()
+        filter_args = filters.read_args()
+
+        query = filters.sort_row_count_query(filter_args)
+        if query is not None:
+            filters.check_sort_row_count(filter_args, (await session.execute(query)).scalar_one())
+        query = cursor_row_query(filter_args.sort, model.id, after_id)
+        if query is not None:
+            check_cursor_row(after_id, (await session.execute(query)).scalar_one_or_none())
+
+        # Answer with a 304 when the client's cached copy of this collection is still current
+        count, last_modified = (await session.execute(collection_state_query(model))).one()
+        validators = build_collection_validators(model, count, last_modified)
+        validators = with_included_state(validators, await included_states(session, relations))
+        if validators.match_request():
+            return validators.not_modified()
+
+        query = paginate(requested.select().where(*filter_args.conditions), model.id, after_id, limit,
+                         sort=filter_args.sort)
+        rows = (await session.execute(query)).all()
+        rows, headers = split_page(rows, limit)
+        headers.update(validators.headers())
+        logger.info("Successfully retrieved data for %s %s records.", len(rows), name)
+
+        output = requested.serialize_all(rows)
+        await load_included(session, relations, output)
+        return output, 200, headers
+
+    return read
+
+
+def record_reader(model, id_validator: Validator, serializer: RowSerializer, includes: Includes = None) -> Callable:
+    """Returns the handler for a single-record endpoint, i.e.: /api/v1/household"""
+    name = model.__tablename__
+
+    async def read(session: AsyncSession):
+        record_id = id_validator.parse()["id"]
+        requested = parse_fields_arg(serializer)
+        relations = includes.parse() if includes else ()
+
+        # Answer with a 304 when the client's cached copy of this record is still current
+        last_modified = (await session.execute(record_state_query(model, record_id))).scalar_one_or_none()
+        validators = build_record_validators(model, record_id, last_modified)
+        if validators and relations:
+            validators = with_included_state(validators, await included_states(session, relations, record_id))
+        if validators and validators.match_request():
+            return validators.not_modified()
+
+        query = requested.select().where(model.id == record_id).execution_options(prepare=True)
+        row = (await session.execute(query)).one_or_none()
+        if row is None:
+            error_msg = f"No {name} found with id={record_id}."
+            logger.info(error_msg)
+            return {"error": error_msg}, 404
+
+        logger.info("Found the requested %s: id=%s", name, record_id)
+        record = requested.serialize(row)
+        await load_included(session, relations, [record])
+        return record, 200, validators.headers() if validators else {}
+
+    return read
+
+
+async def read_picklists(session: AsyncSession):
+    """Returns the picklist values, from the in-process cache unless it's missing or stale."""
+    version_id = picklist_validator.parse().version
+
+    snapshot = picklist_cache.cached(version_id)
+    if snapshot is None:
+        record = (await session.execute(picklist_query(version_id))).scalar_one_or_none()
+        snapshot = picklist_cache.store(version_id, record)
+
+    if snapshot is None:
+        error_msg = f"No picklist values found for version={version_id}."
+        logger.info(error_msg)
+        return {"error": error_msg}, 404
+
+    return snapshot.values, 200
+
+
+# The GET endpoints served by the async handlers, by path
+ASYNC_READS = {
+    "/api/v1/all_addresses":   collection_reader(Address, address_filters, address_serializer),
+    "/api/v1/address":         record_reader(Address, address_id_validator, address_serializer),
+    "/api/v1/all_households":  collection_reader(Household, household_filters, household_serializer,
+                                                 household_includes),
+    "/api/v1/household":       record_reader(Household, household_id_validator, household_serializer,
+                                             household_includes),
+    "/api/v1/all_events":      collection_reader(Event, event_filters, event_serializer, event_includes),
+    "/api/v1/event":           record_reader(Event, event_id_validator, event_serializer, event_includes),
+    "/api/v1/all_gifts":       collection_reader(Gift, gift_filters, gift_serializer),
+    "/api/v1/gift":            record_reader(Gift, gift_id_validator, gift_serializer),
+    "/api/v1/all_cards":       collection_reader(Card, card_filters, card_serializer),
+    "/api/v1/card":            record_reader(Card, card_id_validator, card_serializer),
+    "/api/v1/picklist_values": read_picklists,
+}
@@ -1,18 +1,80 @@
 """Defines the card-related endpoints."""
-from logging import getLogger
-from datetime import date, datetime, timezone
+from logging import getLogger, DEBUG
+from datetime import datetime, timezone
 from backend import db
-from models.models import Card
+from helpers.addresses import mailing_address_subquery
+from helpers.helpers import convert_to_date
+from helpers.picklists import picklist_cache, CARD_PICKLIST_FIELDS
+from helpers.filtering import card_filters
+from helpers.conditional import collection_validators, record_validators
+from helpers.pagination import check_cursor, parse_pagination_args, paginate, split_page
+from helpers.serializers import card_serializer, parse_fields_arg
+from helpers.streaming import parse_stream_arg, stream_json_array, stream_csv, stream_query
+from helpers.validation import Field, Validator
+from models.models import Card, Event, Household, Address
 from flask import request, jsonify
-from flask_restful import Resource, reqparse
-from sqlalchemy import select
+from flask_restful import Resource, abort
+from sqlalchemy import select, insert, exists, func, literal
 from sqlalchemy.exc import SQLAlchemyError, InvalidRequestError, NoResultFound
 import json
 
 logger = getLogger()
 
-# Initialize a parser for the request parameters
-parser = reqparse.RequestParser(trim=True)
+# `id` is required for most requests
+card_id_field = Field("id", int, nullable=False, store_missing=False, required=True)
+
+# The remaining card fields
+card_fields = (
+    Field("type", str),
+    Field("event_id", int),
+    Field("gift_id", int),
+    Field("household_id", int),
+    Field("address_id", int),
+    Field("date_sent", convert_to_date),
+    Field("notes", str),
+)
+
+# The arguments accepted by each method.  These are shared by every request & never modified.
+card_id_validator = Validator(card_id_field)
+card_post_validator = Validator(Field("status", str, default="New", required=True, nullable=False), *card_fields)
+card_put_validator = Validator(card_id_field, Field("status", str, required=True, nullable=False), *card_fields)
+
+# Generating a batch of holiday cards only needs the event
+holiday_card_validator = Validator(Field("event_id", int, nullable=False, required=True))
+
+# Card type assigned to cards generated for the holiday card list
+HOLIDAY_CARD_TYPE = "Holiday"
+
+# Exporting the mailing list for an event's cards
+mailing_list_validator = Validator(
+    Field("event_id", int, nullable=False, required=True, location="args"),
+    Field("format", str, default="csv", location="args"),
+)
+MAILING_LIST_FORMATS = ("csv", "labels")
+MAILING_LIST_COLUMNS = ("household_id", "address_to", "formal_name", "line_1", "line_2", "city", "state",
+                        "zip", "country", "full_address")
+
+# Addresses in these countries are printed from their fields; all others use `full_address`
+DOMESTIC_COUNTRIES = frozenset(("", "united states", "united states of america", "usa", "us"))
+
+
+def format_label(row) -> str:
+    """
+    Formats a mailing list row as a label: the addressee, then the address lines.  Rows are in
+    MAILING_LIST_COLUMNS order, followed by the household's nickname.
+    """
+    household_id, address_to, formal_name, line_1, line_2, city, state, zip_code, country, full_address, \
+        nickname = row
+    lines = [address_to or formal_name or nickname]
+
+    if (country or "").strip().lower() not in DOMESTIC_COUNTRIES and full_address:
+        lines.extend(line.strip() for line in full_address.splitlines())
+    else:
+        lines.extend((line_1, line_2, f"{city or ''}, {state or ''} {zip_code or ''}".strip(" ,")))
+        if (country or "").strip().lower() not in DOMESTIC_COUNTRIES:
+            lines.append(country)
+
+    return "\n".join(line for line in lines if line) + "\n\n"
 
 
 class CardCollectionApi(Resource):
@@ -23,16 +85,50 @@ class CardCollectionApi(Resource):
 
     @staticmethod
     def get() -> json:
-        """Return all cards from the database"""
+        """
+        Return cards from the database, sorted by id unless another sort is requested.
+
+        OPTIONAL ARGUMENTS
+            key: after_id, type: int -- only return records that sort after the record with this id
+            key: limit, type: int -- max number of records to return, DEFAULT_PAGE_SIZE (100) by default
+                unless streamed
+            key: stream, type: bool -- stream the records as they're read instead of in one response
+            key: fields, type: str -- comma-separated list of the fields to return
+            key: sort, type: str -- field to sort by; prefix with "-" to sort in descending order
+            key: <field>, <field>__in, <field>__gte, <field>__lte -- filters, see helpers/filtering.py
+        """
         logger.debug("Start of CardCollectionAPI.GET")
         logger.debug(request)
 
-        # Retrieve all cards from the db, sorted by id
+        # Parse the optional pagination, streaming, projection, filter & sort arguments
+        stream = parse_stream_arg()
+        after_id, limit = parse_pagination_args(stream)
+        serializer = parse_fields_arg(card_serializer)
+        filters = card_filters.parse()
+        check_cursor(filters.sort, Card.id, after_id)
+
+        # Retrieve a page of matching cards from the db, in the requested order
         try:
-            # cards = Card.query.order_by(Card.id).all()
-            query = select(Card).order_by(Card.id.asc())
-            cards = db.session.execute(query).scalars().all()
-            logger.info(f"Successfully retrieved data for {cards.__len__()} cards.")
+            # Answer with a 304 when the client's cached copy of this collection is still current
+            validators = collection_validators(Card)
+            if validators.match_request():
+                logger.debug("End of CardCollectionAPI.GET")
+                return validators.not_modified()
+
+            # Large reads can be streamed to the client rather than compiled into a list
+            if stream:
+                query = paginate(serializer.select().where(*filters.conditions), Card.id, after_id, limit,
+                                 look_ahead=False, sort=filters.sort)
+                logger.debug("End of CardCollectionAPI.GET")
+                return stream_json_array(query, serializer.serialize, headers=validators.headers())
+
+            # Select plain column tuples; this read-only path doesn't need ORM instances
+            query = paginate(serializer.select().where(*filters.conditions), Card.id, after_id, limit,
+                             sort=filters.sort)
+            cards = db.session.execute(query).all()
+            cards, headers = split_page(cards, limit)
+            headers.update(validators.headers())
+            logger.info("Successfully retrieved data for %s cards.", cards.__len__())
 
         except SQLAlchemyError as e:
             error_msg = f"SQLAlchemyError retrieving data: {e}"
@@ -48,12 +144,10 @@ class CardCollectionApi(Resource):
 
         # Compile these data into a list
         try:
-            output = []
-            for card in cards:
-                output.append(card.to_dict())
+            output = serializer.serialize_all(cards)
 
             logger.debug("End of CardAPI.GET")
-            return output, 200
+            return output, 200, headers
 
         except BaseException as e:
             error_msg = f"Error compiling data into a list of `dict` to return: {e}"
@@ -71,37 +165,43 @@ class CardApi(Resource):
     @staticmethod
     def get() -> json:
         """Return data for the specified card id"""
-        logger.debug(f"Start of CardAPI.GET")
+        logger.debug("Start of CardAPI.GET")
         logger.debug(request)
 
-        # Define the parameters used by this endpoint
-        parser.add_argument("id", type=int, nullable=False, store_missing=False,
-                            required=True)
-
         # Parse the provided arguments
-        args = parser.parse_args()
-        logger.debug(f"Args parsed successfully: {args.__str__()}")
+        args = card_id_validator.parse()
+        logger.debug("Args parsed successfully: %s", args)
 
         # Validate that a card id was provided
         try:
             card_id = args["id"]
-            logger.debug(f"Card id={card_id} was read successfully")
+            logger.debug("Card id=%s was read successfully", card_id)
         except KeyError as e:
             error_msg = f"Error parsing card id: no value was provided. {e}"
             logger.info(error_msg)
             return jsonify({"error": error_msg}, status=400)
 
+        # Only select the requested fields, if any were specified
+        serializer = parse_fields_arg(card_serializer)
+
         # Retrieve the selected record
         try:
+            # Answer with a 304 when the client's cached copy of this record is still current
+            validators = record_validators(Card, card_id)
+            if validators and validators.match_request():
+                logger.debug("End of CardAPI.GET")
+                return validators.not_modified()
+
             # card = Card.query.get(card_id)
-            query = select(Card).where(Card.id == card_id)
-            card = db.session.execute(query).scalar_one()
+            query = serializer.select().where(Card.id == card_id).execution_options(prepare=True)
+            card = serializer.serialize(db.session.execute(query).one())
 
             if card:
                 # Record successfully returned from the db
-                logger.info(f"Found the requested card: {card.to_dict()}")
+                logger.info("Found the requested card: id=%s", card_id)
+                logger.debug("Card: %s", card)
                 logger.debug("End of CardAPI.GET")
-                return card.to_dict(), 200
+                return card, 200, validators.headers() if validators else {}
             else:
                 # No record with this id exists in the db
                 error_msg = f"No records found for card id={card_id}."
@@ -112,34 +212,32 @@ class CardApi(Resource):
         except (InvalidRequestError, NoResultFound, AttributeError) as e:
             error_msg = f"No records found for card id={card_id}.\n{e}"
             logger.debug(error_msg)
-            logger.debug(f"End of CardAPI.GET")
+            logger.debug("End of CardAPI.GET")
             return jsonify({"error": error_msg}, status=404)
 
     @staticmethod
     def post() -> json:
         """Add a new card record to the database"""
-        logger.debug(f"Start of CardAPI.POST")
+        logger.debug("Start of CardAPI.POST")
         logger.debug(request)
 
-        # Define the parameters used by this endpoint
-        parser.add_argument("type", type=str)
-        parser.add_argument("status", type=str, default="New", required=True, nullable=False)
-        parser.add_argument("event_id", type=int)
-        parser.add_argument("gift_id", type=int)
-        parser.add_argument("household_id", type=int)
-        parser.add_argument("address_id", type=int)
-        parser.add_argument("date_sent", type=date)
-        parser.add_argument("notes", type=str)
-
         # Parse the arguments provided
-        args = parser.parse_args()
-        logger.debug(f"Args parsed successfully: {args.__str__()}")
+        args = card_post_validator.parse()
+        logger.debug("Args parsed successfully: %s", args)
+
+        # Reject picklist values that the front end wouldn't offer
+        error_msg = picklist_cache.validate(args, CARD_PICKLIST_FIELDS)
+        if error_msg:
+            logger.info(error_msg)
+            logger.debug("End of CardAPI.POST")
+            return {"error": error_msg}, 400
 
         # Create a new Card record using the provided data
         try:
-            logger.debug(f"Attempting to create a Card from the args.")
+            logger.debug("Attempting to create a Card from the args.")
             new_card = Card(**args.__str__())
-            logger.info(f"New record successfully created: {new_card.to_dict()}")
+            if logger.isEnabledFor(DEBUG):
+                logger.debug("New record successfully created: %s", new_card.to_dict())
 
         except SQLAlchemyError as e:
             error_msg = f"Unable to create a new Card record.\n{e}."
@@ -171,27 +269,24 @@ class CardApi(Resource):
     @staticmethod
     def put() -> json:
         """Update an existing record by card id"""
-        logger.debug(f"Start of CardAPI.PUT")
+        logger.debug("Start of CardAPI.PUT")
         logger.debug(request)
 
-        # Define the parameters used by this endpoint
-        parser.add_argument("type", type=str)
-        parser.add_argument("status", type=str, required=True, nullable=False)
-        parser.add_argument("event_id", type=int)
-        parser.add_argument("gift_id", type=int)
-        parser.add_argument("household_id", type=int)
-        parser.add_argument("address_id", type=int)
-        parser.add_argument("date_sent", type=date)
-        parser.add_argument("notes", type=str)
-
         # Parse the arguments provided
-        args = parser.parse_args()
-        logger.debug(f"Args parsed successfully: {args.__str__()}")
+        args = card_put_validator.parse()
+        logger.debug("Args parsed successfully: %s", args)
+
+        # Reject picklist values that the front end wouldn't offer
+        error_msg = picklist_cache.validate(args, CARD_PICKLIST_FIELDS)
+        if error_msg:
+            logger.info(error_msg)
+            logger.debug("End of CardAPI.PUT")
+            return {"error": error_msg}, 400
 
         # Validate that a card id was provided
         try:
             card_id = args["id"]
-            logger.debug(f"Card id={card_id} was read successfully")
+            logger.debug("Card id=%s was read successfully", card_id)
 
         except KeyError as e:
             error_msg = f"Error parsing card id: no value was provided. {e}"
@@ -202,7 +297,7 @@ class CardApi(Resource):
         try:
             # Retrieve the specified card record
             # card = Card.query.get(card_id)
-            query = select(Card).where(Card.id == card_id)
+            query = select(Card).where(Card.id == card_id).execution_options(prepare=True)
             card = db.session.execute(query).scalar_one()
 
             # Update this record with the provided data
@@ -215,6 +310,9 @@ class CardApi(Resource):
             card.date_sent = args["date_sent"]
             card.date_sent = args["notes"]
 
+            # Set last_modified to the current timestamp
+            card.last_modified = datetime.now(timezone.utc)
+
             # If the card's status wasn't already "Sent",
             #  and the card's status is being updated to "Sent",
             #  and no value was provided for `date_sent`
@@ -239,36 +337,32 @@ class CardApi(Resource):
     @staticmethod
     def delete() -> json:
         """Delete the specified record by card id"""
-        logger.debug(f"Start of CardAPI.DELETE")
+        logger.debug("Start of CardAPI.DELETE")
         logger.debug(request)
 
-        # Define the parameters used by this endpoint
-        parser.add_argument("id", type=int, nullable=False, store_missing=False,
-                            required=True)
-
         # Parse the provided arguments
-        args = parser.parse_args()
-        logger.debug(f"Args parsed successfully: {args.__str__()}")
+        args = card_id_validator.parse()
+        logger.debug("Args parsed successfully: %s", args)
 
         # Validate that a card id was provided
         try:
             card_id = args["id"]
-            logger.debug(f"Card id={card_id} was read successfully")
+            logger.debug("Card id=%s was read successfully", card_id)
         except KeyError as e:
             error_msg = f"Error parsing card id: no value was provided. {e}"
             logger.info(error_msg)
-            logger.debug(f"End of CardAPI.DELETE")
+            logger.debug("End of CardAPI.DELETE")
             return jsonify({"error": error_msg}, status=400)
 
         try:
             # Retrieve the selected record
             # card_to_delete = Card.query.get(card_id)
-            query = select(Card).where(Card.id == card_id)
+            query = select(Card).where(Card.id == card_id).execution_options(prepare=True)
             card_to_delete = db.session.execute(query).scalar_one()
 
             if card_to_delete:
                 # Record successfully returned from the db
-                logger.debug(f"Card record found.  Attempting to delete it.")
+                logger.debug("Card record found.  Attempting to delete it.")
                 card_to_delete.delete()
 
                 logger.debug("About to commit this delete to the db.")
@@ -288,5 +382,155 @@ class CardApi(Resource):
         except (InvalidRequestError, NoResultFound, AttributeError) as e:
             error_msg = f"No record found for card id={card_id}.\n{e}"
             logger.debug(error_msg)
-            logger.debug(f"End of CardAPI.GET")
+            logger.debug("End of CardAPI.GET")
             return jsonify({"error": error_msg}, status=404)
+
+
+class HolidayCardBatchApi(Resource):
+    """
+    Endpoint:   /api/v1/holiday_cards
+    Methods:    POST
+    """
+
+    @staticmethod
+    def post() -> json:
+        """
+        Create a holiday card for the provided event for every relevant household on the holiday
+        card list, addressed to the household's current mailing address.  Households that already
+        have a card for this event are skipped, so repeating the request is safe.
+
+        REQUIRED ARGUMENTS
+            key: event_id, type: int
+        """
+        logger.debug("Start of HolidayCardBatchApi.POST")
+        logger.debug(request)
+
+        args = holiday_card_validator.parse()
+        event_id = args["event_id"]
+
+        try:
+            # Lock the event row so concurrent batches for the same event can't both insert cards
+            query = select(Event.id).where(Event.id == event_id).with_for_update()
+            if db.session.execute(query).scalar_one_or_none() is None:
+                error_msg = f"No event found with id={event_id}."
+                logger.info(error_msg)
+                logger.debug("End of HolidayCardBatchApi.POST")
+                return {"error": error_msg}, 404
+
+            eligible = (
+                select(Household.id.label("household_id"), mailing_address_subquery(Household.id).label("address_id"))
+                .where(Household.should_receive_holiday_card, Household.is_relevant)
+                .cte("eligible")
+            )
+
+            # Skip households that already have a card for this event
+            now = datetime.now(timezone.utc)
+            new_cards = (
+                select(literal(HOLIDAY_CARD_TYPE), literal(event_id), eligible.c.household_id,
+                       eligible.c.address_id, literal(now), literal(now))
+                .where(~exists().where(Card.event_id == event_id,
+                                       Card.household_id == eligible.c.household_id))
+            )
+
+            inserted = (
+                insert(Card)
+                .from_select(["type", "event_id", "household_id", "address_id", "created_date",
+                              "last_modified"], new_cards)
+                .returning(Card.address_id)
+                .cte("inserted")
+            )
+
+            # Insert the cards & tally the results in a single round trip
+            query = select(
+                select(func.count()).select_from(eligible).scalar_subquery(),
+                select(func.count()).select_from(inserted).scalar_subquery(),
+                select(func.count()).select_from(inserted)
+                .where(inserted.c.address_id.is_(None)).scalar_subquery(),
+            )
+            eligible_count, created_count, missing_address_count = db.session.execute(query).one()
+
+            logger.debug("Attempting to commit the new cards")
+            db.session.commit()
+            logger.info("Created %s holiday cards for event_id=%s", created_count, event_id)
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            error_msg = f"Unable to create holiday cards for event id={event_id}.\n{e}"
+            logger.info(error_msg)
+            logger.debug("End of HolidayCardBatchApi.POST")
+            return {"error": error_msg}, 500
+
+        logger.debug("End of HolidayCardBatchApi.POST")
+        return {
+            "event_id":            event_id,
+            "eligible_households": eligible_count,
+            "cards_created":       created_count,
+            "already_had_a_card":  eligible_count - created_count,
+            "missing_address":     missing_address_count,
+        }, 201 if created_count else 200
+
+
+class MailingListApi(Resource):
+    """
+    Endpoint:   /api/v1/mailing_list
+    Methods:    GET
+    """
+
+    @staticmethod
+    def get() -> json:
+        """
+        Export the mailing list for an event: every household with a card for this event, with its
+        current mailing address, sorted by country, state & zip.  Households without a current
+        mailing address are left out.  The list is streamed as it's read from the db, so its size
+        doesn't affect the memory used.
+
+        REQUIRED ARGUMENTS
+            key: event_id, type: int
+
+        OPTIONAL ARGUMENTS
+            key: format, type: str -- "csv" (default), or "labels" for plain text with one label per
+                household, separated by blank lines.  Non-US labels use the address's full_address.
+        """
+        logger.debug("Start of MailingListApi.GET")
+        logger.debug(request)
+
+        args = mailing_list_validator.parse()
+        event_id, export_format = args["event_id"], args["format"].lower()
+        if export_format not in MAILING_LIST_FORMATS:
+            abort(400, message={"format": f"Unsupported format: '{export_format}'.  "
+                                          f"Valid options: {', '.join(MAILING_LIST_FORMATS)}"})
+
+        try:
+            query = select(Event.id).where(Event.id == event_id).execution_options(prepare=True)
+            if db.session.execute(query).scalar_one_or_none() is None:
+                error_msg = f"No event found with id={event_id}."
+                logger.info(error_msg)
+                logger.debug("End of MailingListApi.GET")
+                return {"error": error_msg}, 404
+
+            # One row per household with a card for this event, at its current mailing address
+            query = (
+                select(Household.id, Household.address_to, Household.formal_name, Address.line_1,
+                       Address.line_2, Address.city, Address.state, Address.zip, Address.country,
+                       Address.full_address, Household.nickname)
+                .join(Address, Address.id == mailing_address_subquery(Household.id))
+                .where(exists().where(Card.event_id == event_id, Card.household_id == Household.id))
+                .order_by(Address.country, Address.state, Address.zip, Household.id)
+            )
+
+            headers = {"Content-Disposition": f"attachment; filename=mailing_list_event_{event_id}."
+                                              f"{'csv' if export_format == 'csv' else 'txt'}"}
+            logger.debug("End of MailingListApi.GET")
+
+            if export_format == "csv":
+                # The nickname is only used to label households without an address_to or formal_name
+                return stream_csv(query, MAILING_LIST_COLUMNS, lambda row: row[:-1], headers=headers)
+
+            return stream_query(query, lambda rows, rows_written: "".join(format_label(row) for row in rows),
+                                mimetype="text/plain", headers=headers)
+
+        except SQLAlchemyError as e:
+            error_msg = f"Unable to export the mailing list for event id={event_id}.\n{e}"
+            logger.info(error_msg)
+            logger.debug("End of MailingListApi.GET")
+            return {"error": error_msg}, 500
@@ -1,18 +1,40 @@
 """Defines the event-related endpoints."""
-from logging import getLogger
-from datetime import date
+from logging import getLogger, DEBUG
+from datetime import datetime, timezone
 from backend import db
+from helpers.helpers import convert_to_bool, convert_to_date
+from helpers.filtering import event_filters
+from helpers.conditional import collection_validators, record_validators
+from helpers.includes import event_includes, included_validators, load_included
+from helpers.pagination import check_cursor, parse_pagination_args, paginate, split_page
+from helpers.serializers import event_serializer, parse_fields_arg
+from helpers.streaming import parse_stream_arg, stream_json_array
+from helpers.validation import Field, Validator
 from models.models import Event
 from flask import request, jsonify
-from flask_restful import Resource, reqparse
+from flask_restful import Resource, abort
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError, InvalidRequestError, NoResultFound
 import json
 
 logger = getLogger()
 
-# Initialize a parser for the request parameters
-parser = reqparse.RequestParser(trim=True)
+# `id` is required for most requests
+event_id_field = Field("id", int, nullable=False, store_missing=False, required=True)
+
+# The remaining event fields
+event_fields = (
+    Field("name", str),
+    Field("date", convert_to_date),
+    Field("year", int),
+    Field("is_archived", convert_to_bool, default=False),
+    Field("notes", str),
+)
+
+# The arguments accepted by each method.  These are shared by every request & never modified.
+event_id_validator = Validator(event_id_field)
+event_post_validator = Validator(*event_fields)
+event_put_validator = Validator(event_id_field, *event_fields)
 
 
 class EventCollectionApi(Resource):
@@ -23,16 +45,55 @@ class EventCollectionApi(Resource):
 
     @staticmethod
     def get() -> json:
-        """Return all events from the database"""
+        """
+        Return events from the database, sorted by id unless another sort is requested.
+
+        OPTIONAL ARGUMENTS
+            key: after_id, type: int -- only return records that sort after the record with this id
+            key: limit, type: int -- max number of records to return, DEFAULT_PAGE_SIZE (100) by default
+                unless streamed
+            key: stream, type: bool -- stream the records as they're read instead of in one response
+            key: fields, type: str -- comma-separated list of the fields to return
+            key: sort, type: str -- field to sort by; prefix with "-" to sort in descending order
+            key: include, type: str -- comma-separated list of related records to embed in each
+                event: gifts, cards.  Can't be combined with stream.
+            key: <field>, <field>__in, <field>__gte, <field>__lte -- filters, see helpers/filtering.py
+        """
         logger.debug("Start of EventCollectionAPI.GET")
         logger.debug(request)
 
-        # Retrieve all events from the db, sorted by id
+        # Parse the optional pagination, streaming, projection, include, filter & sort arguments
+        stream = parse_stream_arg()
+        after_id, limit = parse_pagination_args(stream)
+        serializer = parse_fields_arg(event_serializer)
+        relations = event_includes.parse()
+        if stream and relations:
+            abort(400, message={"include": "Related records can't be included in a streamed response."})
+        filters = event_filters.parse()
+        check_cursor(filters.sort, Event.id, after_id)
+
+        # Retrieve a page of matching events from the db, in the requested order
         try:
-            # events = Event.query.order_by(Event.id).all()
-            query = select(Event).order_by(Event.id.asc())
-            events = db.session.execute(query).scalars().all()
-            logger.info(f"Successfully retrieved data for {events.__len__()} events.")
+            # Answer with a 304 when the client's cached copy of this collection is still current
+            validators = included_validators(collection_validators(Event), relations)
+            if validators.match_request():
+                logger.debug("End of EventCollectionAPI.GET")
+                return validators.not_modified()
+
+            # Large reads can be streamed to the client rather than compiled into a list
+            if stream:
+                query = paginate(serializer.select().where(*filters.conditions), Event.id, after_id, limit,
+                                 look_ahead=False, sort=filters.sort)
+                logger.debug("End of EventCollectionAPI.GET")
+                return stream_json_array(query, serializer.serialize, headers=validators.headers())
+
+            # Select plain column tuples; this read-only path doesn't need ORM instances
+            query = paginate(serializer.select().where(*filters.conditions), Event.id, after_id, limit,
+                             sort=filters.sort)
+            events = db.session.execute(query).all()
+            events, headers = split_page(events, limit)
+            headers.update(validators.headers())
+            logger.info("Successfully retrieved data for %s events.", events.__len__())
 
         except SQLAlchemyError as e:
             error_msg = f"SQLAlchemyError retrieving data: {e}"
@@ -48,12 +109,11 @@ class EventCollectionApi(Resource):
 
         # Compile these data into a list
         try:
-            output = []
-            for event in events:
-                output.append(event.to_dict())
+            output = serializer.serialize_all(events)
+            load_included(relations, output)
 
             logger.debug("End of EventAPI.GET")
-            return output, 200
+            return output, 200, headers
 
         except BaseException as e:
             error_msg = f"Error compiling data into a list of `dict` to return: {e}"
@@ -70,38 +130,54 @@ class EventApi(Resource):
 
     @staticmethod
     def get() -> json:
-        """Return data for the specified event id"""
-        logger.debug(f"Start of EventAPI.GET")
+        """
+        Return data for the specified event id
+
+        OPTIONAL ARGUMENTS
+            key: fields, type: str -- comma-separated list of the fields to return
+            key: include, type: str -- comma-separated list of related records to embed: gifts, cards
+        """
+        logger.debug("Start of EventAPI.GET")
         logger.debug(request)
 
-        # Define the parameters used by this endpoint
-        parser.add_argument("id", type=int, nullable=False, store_missing=False,
-                            required=True)
-
         # Parse the provided arguments
-        args = parser.parse_args()
-        logger.debug(f"Args parsed successfully: {args.__str__()}")
+        args = event_id_validator.parse()
+        logger.debug("Args parsed successfully: %s", args)
 
         # Validate that an event id was provided
         try:
             event_id = args["id"]
-            logger.debug(f"Event id={event_id} was read successfully")
+            logger.debug("Event id=%s was read successfully", event_id)
         except KeyError as e:
             error_msg = f"Error parsing event id: no value was provided. {e}"
             logger.info(error_msg)
             return jsonify({"error": error_msg}, status=400)
 
+        # Only select the requested fields & related records, if any were specified
+        serializer = parse_fields_arg(event_serializer)
+        relations = event_includes.parse()
+
         # Retrieve the selected record
         try:
+            # Answer with a 304 when the client's cached copy of this record is still current
+            validators = record_validators(Event, event_id)
+            if validators and relations:
+                validators = included_validators(validators, relations, event_id)
+            if validators and validators.match_request():
+                logger.debug("End of EventAPI.GET")
+                return validators.not_modified()
+
             # event = Event.query.get(event_id)
-            query = select(Event).where(Event.id == event_id)
-            event = db.session.execute(query).scalar_one()
+            query = serializer.select().where(Event.id == event_id).execution_options(prepare=True)
+            event = serializer.serialize(db.session.execute(query).one())
+            load_included(relations, [event])
 
             if event:
                 # Record successfully returned from the db
-                logger.info(f"Found the requested event: {event.to_dict()}")
+                logger.info("Found the requested event: id=%s", event_id)
+                logger.debug("Event: %s", event)
                 logger.debug("End of EventAPI.GET")
-                return event.to_dict(), 200
+                return event, 200, validators.headers() if validators else {}
             else:
                 # No record with this id exists in the db
                 error_msg = f"No records found for event id={event_id}."
@@ -112,31 +188,25 @@ class EventApi(Resource):
         except (InvalidRequestError, NoResultFound, AttributeError) as e:
             error_msg = f"No records found for event id={event_id}.\n{e}"
             logger.debug(error_msg)
-            logger.debug(f"End of EventAPI.GET")
+            logger.debug("End of EventAPI.GET")
             return jsonify({"error": error_msg}, status=404)
 
     @staticmethod
     def post() -> json:
         """Add a new event record to the database"""
-        logger.debug(f"Start of EventAPI.POST")
+        logger.debug("Start of EventAPI.POST")
         logger.debug(request)
 
-        # Define the parameters used by this endpoint
-        parser.add_argument("name", type=str)
-        parser.add_argument("date", type=str)
-        parser.add_argument("year", type=int)
-        parser.add_argument("is_archived", type=str)
-        parser.add_argument("notes", type=str)
-
         # Parse the arguments provided
-        args = parser.parse_args()
-        logger.debug(f"Args parsed successfully: {args.__str__()}")
+        args = event_post_validator.parse()
+        logger.debug("Args parsed successfully: %s", args)
 
         # Create a new Event record using the provided data
         try:
-            logger.debug(f"Attempting to create a Event from the args.")
+            logger.debug("Attempting to create a Event from the args.")
             new_event = Event(**args.__str__())
-            logger.info(f"New record successfully created: {new_event.to_dict()}")
+            if logger.isEnabledFor(DEBUG):
+                logger.debug("New record successfully created: %s", new_event.to_dict())
 
             # Commit this new record so the db generates an id
             logger.debug("Attempting to commit data")
@@ -156,34 +226,27 @@ class EventApi(Resource):
     @staticmethod
     def put() -> json:
         """Update an existing record by event id"""
-        logger.debug(f"Start of EventAPI.PUT")
+        logger.debug("Start of EventAPI.PUT")
         logger.debug(request)
 
-        # Define the parameters used by this endpoint
-        parser.add_argument("name", type=str)
-        parser.add_argument("date", type=date)
-        parser.add_argument("year", type=int)
-        parser.add_argument("is_archived", type=str)
-        parser.add_argument("notes", type=str)
-
         # Parse the arguments provided
-        args = parser.parse_args()
-        logger.debug(f"Args parsed successfully: {args.__str__()}")
+        args = event_put_validator.parse()
+        logger.debug("Args parsed successfully: %s", args)
 
         # Validate that an event_id was provided
         try:
             event_id = args["id"]
-            logger.debug(f"Event id={event_id} was read successfully")
+            logger.debug("Event id=%s was read successfully", event_id)
         except KeyError as e:
             error_msg = f"Must provide a value for event id."
             logger.debug(error_msg)
-            logger.info(f"Error parsing event id: no value was provided. {e}")
+            logger.info("Error parsing event id: no value was provided. %s", e)
             return jsonify({"error": error_msg}, status=400)
 
         try:
             # Retrieve the specified event record
             # event = Event.query.get(event_id)
-            query = select(Event).where(Event.id == event_id)
+            query = select(Event).where(Event.id == event_id).execution_options(prepare=True)
             event = db.session.execute(query).scalar_one()
 
             # Update this record with the provided data
@@ -193,6 +256,9 @@ class EventApi(Resource):
             event.is_archived = args["is_archived"]
             event.notes = args["notes"]
 
+            # Set last_modified to the current timestamp
+            event.last_modified = datetime.now(timezone.utc)
+
             # Commit these changes to the db
             logger.debug("Attempting to commit db changes")
             db.session.commit()
@@ -210,36 +276,32 @@ class EventApi(Resource):
     @staticmethod
     def delete() -> json:
         """Delete the specified record by event id"""
-        logger.debug(f"Start of EventAPI.DELETE")
+        logger.debug("Start of EventAPI.DELETE")
         logger.debug(request)
 
-        # Define the parameters used by this endpoint
-        parser.add_argument("id", type=int, nullable=False, store_missing=False,
-                            required=True)
-
         # Parse the provided arguments
-        args = parser.parse_args()
-        logger.debug(f"Args parsed successfully: {args.__str__()}")
+        args = event_id_validator.parse()
+        logger.debug("Args parsed successfully: %s", args)
 
         # Validate that an event id was provided
         try:
             event_id = args["id"]
-            logger.debug(f"Event id={event_id} was read successfully")
+            logger.debug("Event id=%s was read successfully", event_id)
         except KeyError as e:
             error_msg = f"Error parsing event id: no value was provided. {e}"
             logger.info(error_msg)
-            logger.debug(f"End of EventAPI.DELETE")
+            logger.debug("End of EventAPI.DELETE")
             return jsonify({"error": error_msg}, status=400)
 
         try:
             # Retrieve the selected record
             # event_to_delete = Event.query.get(event_id)
-            query = select(Event).where(Event.id == event_id)
+            query = select(Event).where(Event.id == event_id).execution_options(prepare=True)
             event_to_delete = db.session.execute(query).scalar_one()
 
             if event_to_delete:
                 # Record successfully returned from the db
-                logger.debug(f"Event record found.  Attempting to delete it.")
+                logger.debug("Event record found.  Attempting to delete it.")
                 event_to_delete.delete()
 
                 logger.debug("About to commit this delete to the db.")
@@ -259,5 +321,5 @@ class EventApi(Resource):
         except (InvalidRequestError, NoResultFound, AttributeError) as e:
             error_msg = f"No record found for event id={event_id}.\n{e}"
             logger.debug(error_msg)
-            logger.debug(f"End of EventAPI.GET")
+            logger.debug("End of EventAPI.GET")
             return jsonify({"error": error_msg}, status=400)
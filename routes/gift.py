@@ -1,18 +1,48 @@
 """Defines the gift-related endpoints."""
-from logging import getLogger
-from datetime import date
+from logging import getLogger, DEBUG
+from datetime import datetime, timezone
 from backend import db
-from models.models import Gift
+from backend.metrics import count_serialized_rows
+from helpers.addresses import mailing_address_subquery
+from helpers.filtering import gift_filters
+from helpers.conditional import collection_validators, record_validators
+from helpers.pagination import check_cursor, parse_pagination_args, paginate, split_page
+from helpers.serializers import gift_serializer, parse_fields_arg
+from helpers.streaming import parse_stream_arg, stream_json_array
+from helpers.validation import Field, Validator
+from helpers.helpers import convert_to_bool, convert_to_date
+from models.models import Gift, Household, Address, Card
 from flask import request, jsonify
-from flask_restful import Resource, reqparse
-from sqlalchemy import select
+from flask_restful import Resource, inputs
+from sqlalchemy import select, exists, case
 from sqlalchemy.exc import SQLAlchemyError, InvalidRequestError, NoResultFound
 import json
 
 logger = getLogger()
 
-# Initialize a parser for the request parameters
-parser = reqparse.RequestParser(trim=True)
+# `id` is required for most requests
+gift_id_field = Field("id", int, nullable=False, store_missing=False, required=True)
+
+# The remaining gift fields.  The checkbox default matches the model's column default.
+gift_fields = (
+    Field("event_id", int),
+    Field("household_id", int),
+    Field("description", str),
+    Field("type", str),
+    Field("origin", str),
+    Field("date", convert_to_date),
+    Field("should_a_card_be_sent", convert_to_bool, default=True),
+    Field("notes", str),
+)
+
+# The arguments accepted by each method.  These are shared by every request & never modified.
+gift_id_validator = Validator(gift_id_field)
+gift_post_validator = Validator(*gift_fields)
+gift_put_validator = Validator(gift_id_field, *gift_fields)
+
+# The thank-you worksheet's arguments are only read from the query string
+worksheet_validator = Validator(Field("event_id", int, location="args", required=True),
+                                Field("pending_only", inputs.boolean, location="args", default=False))
 
 
 class GiftCollectionApi(Resource):
@@ -23,16 +53,50 @@ class GiftCollectionApi(Resource):
 
     @staticmethod
     def get() -> json:
-        """Return all gifts from the database"""
+        """
+        Return gifts from the database, sorted by id unless another sort is requested.
+
+        OPTIONAL ARGUMENTS
+            key: after_id, type: int -- only return records that sort after the record with this id
+            key: limit, type: int -- max number of records to return, DEFAULT_PAGE_SIZE (100) by default
+                unless streamed
+            key: stream, type: bool -- stream the records as they're read instead of in one response
+            key: fields, type: str -- comma-separated list of the fields to return
+            key: sort, type: str -- field to sort by; prefix with "-" to sort in descending order
+            key: <field>, <field>__in, <field>__gte, <field>__lte -- filters, see helpers/filtering.py
+        """
         logger.debug("Start of GiftCollectionAPI.GET")
         logger.debug(request)
 
-        # Retrieve all gifts from the db, sorted by id
+        # Parse the optional pagination, streaming, projection, filter & sort arguments
+        stream = parse_stream_arg()
+        after_id, limit = parse_pagination_args(stream)
+        serializer = parse_fields_arg(gift_serializer)
+        filters = gift_filters.parse()
+        check_cursor(filters.sort, Gift.id, after_id)
+
+        # Retrieve a page of matching gifts from the db, in the requested order
         try:
-            # gifts = Gift.query.order_by(Gift.id).all()
-            query = select(Gift).order_by(Gift.id.asc())
-            gifts = db.session.execute(query).scalars().all()
-            logger.info(f"Successfully retrieved data for {gifts.__len__()} gifts.")
+            # Answer with a 304 when the client's cached copy of this collection is still current
+            validators = collection_validators(Gift)
+            if validators.match_request():
+                logger.debug("End of GiftCollectionAPI.GET")
+                return validators.not_modified()
+
+            # Large reads can be streamed to the client rather than compiled into a list
+            if stream:
+                query = paginate(serializer.select().where(*filters.conditions), Gift.id, after_id, limit,
+                                 look_ahead=False, sort=filters.sort)
+                logger.debug("End of GiftCollectionAPI.GET")
+                return stream_json_array(query, serializer.serialize, headers=validators.headers())
+
+            # Select plain column tuples; this read-only path doesn't need ORM instances
+            query = paginate(serializer.select().where(*filters.conditions), Gift.id, after_id, limit,
+                             sort=filters.sort)
+            gifts = db.session.execute(query).all()
+            gifts, headers = split_page(gifts, limit)
+            headers.update(validators.headers())
+            logger.info("Successfully retrieved data for %s gifts.", gifts.__len__())
 
         except SQLAlchemyError as e:
             error_msg = f"SQLAlchemyError retrieving data: {e}"
@@ -48,12 +112,10 @@ class GiftCollectionApi(Resource):
 
         # Compile these data into a list
         try:
-            output = []
-            for gift in gifts:
-                output.append(gift.to_dict())
+            output = serializer.serialize_all(gifts)
 
             logger.debug("End of GiftAPI.GET")
-            return output, 200
+            return output, 200, headers
 
         except BaseException as e:
             error_msg = f"Error compiling data into a list of `dict` to return: {e}"
@@ -71,37 +133,43 @@ class GiftApi(Resource):
     @staticmethod
     def get() -> json:
         """Return data for the specified gift id"""
-        logger.debug(f"Start of GiftAPI.GET")
+        logger.debug("Start of GiftAPI.GET")
         logger.debug(request)
 
-        # Define the parameters used by this endpoint
-        parser.add_argument("id", type=int, nullable=False, store_missing=False,
-                            required=True)
-
         # Parse the provided arguments
-        args = parser.parse_args()
-        logger.debug(f"Args parsed successfully: {args.__str__()}")
+        args = gift_id_validator.parse()
+        logger.debug("Args parsed successfully: %s", args)
 
         # Validate that a gift_id was provided
         try:
             gift_id = args["id"]
-            logger.debug(f"Gift id={gift_id} was read successfully")
+            logger.debug("Gift id=%s was read successfully", gift_id)
         except KeyError as e:
             error_msg = f"Error parsing gift id: no value was provided. {e}"
             logger.info(error_msg)
             return jsonify({"error": error_msg}, status=400)
 
+        # Only select the requested fields, if any were specified
+        serializer = parse_fields_arg(gift_serializer)
+
         # Retrieve the selected record
         try:
+            # Answer with a 304 when the client's cached copy of this record is still current
+            validators = record_validators(Gift, gift_id)
+            if validators and validators.match_request():
+                logger.debug("End of GiftAPI.GET")
+                return validators.not_modified()
+
             # gift = Gift.query.get(gift_id)
-            query = select(Gift).where(Gift.id == gift_id)
-            gift = db.session.execute(query).scalar_one()
+            query = serializer.select().where(Gift.id == gift_id).execution_options(prepare=True)
+            gift = serializer.serialize(db.session.execute(query).one())
 
             if gift:
                 # Record successfully returned from the db
-                logger.info(f"Found the requested gift: {gift.to_dict()}")
+                logger.info("Found the requested gift: id=%s", gift_id)
+                logger.debug("Gift: %s", gift)
                 logger.debug("End of GiftAPI.GET")
-                return gift.to_dict(), 200
+                return gift, 200, validators.headers() if validators else {}
             else:
                 # No record with this id exists in the db
                 error_msg = f"No records found for gift id={gift_id}."
@@ -112,34 +180,25 @@ class GiftApi(Resource):
         except (InvalidRequestError, NoResultFound, AttributeError) as e:
             error_msg = f"No records found for gift id={gift_id}.\n{e}"
             logger.debug(error_msg)
-            logger.debug(f"End of GiftAPI.GET")
+            logger.debug("End of GiftAPI.GET")
             return jsonify({"error": error_msg}, status=404)
 
     @staticmethod
     def post() -> json:
         """Add a new gift record to the database"""
-        logger.debug(f"Start of GiftAPI.POST")
+        logger.debug("Start of GiftAPI.POST")
         logger.debug(request)
 
-        # Define the parameters used by this endpoint
-        parser.add_argument("event_id", type=int)
-        parser.add_argument("household_id", type=int)
-        parser.add_argument("description", type=str)
-        parser.add_argument("type", type=str)
-        parser.add_argument("origin", type=str)
-        parser.add_argument("date", type=date)
-        parser.add_argument("should_a_card_be_sent", type=str)
-        parser.add_argument("notes", type=str)
-
         # Parse the arguments provided
-        args = parser.parse_args()
-        logger.debug(f"Args parsed successfully: {args.__str__()}")
+        args = gift_post_validator.parse()
+        logger.debug("Args parsed successfully: %s", args)
 
         # Create a new Gift record using the provided data
         try:
-            logger.debug(f"Attempting to create a Gift from the args.")
+            logger.debug("Attempting to create a Gift from the args.")
             new_gift = Gift(**args.__str__())
-            logger.info(f"New record successfully created: {new_gift.to_dict()}")
+            if logger.isEnabledFor(DEBUG):
+                logger.debug("New record successfully created: %s", new_gift.to_dict())
 
             # Commit this new record so the db generates an id
             logger.debug("Attempting to commit data")
@@ -159,27 +218,17 @@ class GiftApi(Resource):
     @staticmethod
     def put() -> json:
         """Update an existing record by gift id"""
-        logger.debug(f"Start of GiftAPI.PUT")
+        logger.debug("Start of GiftAPI.PUT")
         logger.debug(request)
 
-        # Define the parameters used by this endpoint
-        parser.add_argument("event_id", type=int)
-        parser.add_argument("household_id", type=int)
-        parser.add_argument("description", type=str)
-        parser.add_argument("type", type=str)
-        parser.add_argument("origin", type=str)
-        parser.add_argument("date", type=date)
-        parser.add_argument("should_a_card_be_sent", type=str)
-        parser.add_argument("notes", type=str)
-
         # Parse the arguments provided
-        args = parser.parse_args()
-        logger.debug(f"Args parsed successfully: {args.__str__()}")
+        args = gift_put_validator.parse()
+        logger.debug("Args parsed successfully: %s", args)
 
         # Validate that a gift id was provided
         try:
             gift_id = args["id"]
-            logger.debug(f"Gift id={gift_id} was read successfully")
+            logger.debug("Gift id=%s was read successfully", gift_id)
         except KeyError as e:
             error_msg = f"Error parsing gift id: no value was provided. {e}"
             logger.info(error_msg)
@@ -188,7 +237,7 @@ class GiftApi(Resource):
         try:
             # Retrieve the specified gift record
             # gift = Gift.query.get(gift_id)
-            query = select(Gift).where(Gift.id == gift_id)
+            query = select(Gift).where(Gift.id == gift_id).execution_options(prepare=True)
             gift = db.session.execute(query).scalar_one()
 
             # Update this record with the provided data
@@ -201,6 +250,9 @@ class GiftApi(Resource):
             gift.date = args["should_a_card_be_sent"]
             gift.notes = args["notes"]
 
+            # Set last_modified to the current timestamp
+            gift.last_modified = datetime.now(timezone.utc)
+
             # Commit these changes to the db
             logger.debug("Attempting to commit db changes")
             db.session.commit()
@@ -218,36 +270,32 @@ class GiftApi(Resource):
     @staticmethod
     def delete() -> json:
         """Delete the specified record by gift id"""
-        logger.debug(f"Start of GiftAPI.DELETE")
+        logger.debug("Start of GiftAPI.DELETE")
         logger.debug(request)
 
-        # Define the parameters used by this endpoint
-        parser.add_argument("id", type=int, nullable=False, store_missing=False,
-                            required=True)
-
         # Parse the provided arguments
-        args = parser.parse_args()
-        logger.debug(f"Args parsed successfully: {args.__str__()}")
+        args = gift_id_validator.parse()
+        logger.debug("Args parsed successfully: %s", args)
 
         # Validate that a gift id was provided
         try:
             gift_id = args["id"]
-            logger.debug(f"Gift id={gift_id} was read successfully")
+            logger.debug("Gift id=%s was read successfully", gift_id)
         except KeyError as e:
             error_msg = f"Error parsing gift id: no value was provided. {e}"
             logger.info(error_msg)
-            logger.debug(f"End of GiftAPI.DELETE")
+            logger.debug("End of GiftAPI.DELETE")
             return jsonify({"error": error_msg}, status=400)
 
         try:
             # Retrieve the selected record
             # gift_to_delete = Gift.query.get(gift_id)
-            query = select(Gift).where(Gift.id == gift_id)
+            query = select(Gift).where(Gift.id == gift_id).execution_options(prepare=True)
             gift_to_delete = db.session.execute(query).scalar_one()
 
             if gift_to_delete:
                 # Record successfully returned from the db
-                logger.debug(f"Gift record found.  Attempting to delete it.")
+                logger.debug("Gift record found.  Attempting to delete it.")
                 gift_to_delete.delete()
 
                 logger.debug("About to commit this delete to the db.")
@@ -267,5 +315,71 @@ class GiftApi(Resource):
         except (InvalidRequestError, NoResultFound, AttributeError) as e:
             error_msg = f"No record found for gift id={gift_id}.\n{e}"
             logger.debug(error_msg)
-            logger.debug(f"End of GiftAPI.GET")
+            logger.debug("End of GiftAPI.GET")
             return jsonify({"error": error_msg}, status=404)
+
+
+class ThankYouWorksheetApi(Resource):
+    """
+    Endpoint:   /api/v1/thank_you_worksheet
+    Methods:    GET
+    """
+
+    @staticmethod
+    def get() -> json:
+        """
+        Return each gift from the provided event with the giving household, its mailing address,
+        and the status of its thank-you card: sent, pending, or not needed.
+
+        REQUIRED ARGUMENTS
+            key: event_id, type: int
+
+        OPTIONAL ARGUMENTS
+            key: pending_only, type: bool -- only return gifts that still need a thank-you card
+        """
+        logger.debug("Start of ThankYouWorksheetApi.GET")
+        logger.debug(request)
+
+        args = worksheet_validator.parse()
+        event_id = args["event_id"]
+
+        # A card counts as sent once it has a date_sent
+        card_was_sent = exists().where(Card.gift_id == Gift.id, Card.date_sent.is_not(None))
+        card_status = case((card_was_sent, "sent"),
+                           (Gift.should_a_card_be_sent, "pending"),
+                           else_="not needed")
+
+        query = (
+            select(Gift.id, Gift.description, Gift.type, Gift.date, Gift.household_id,
+                   Household.nickname, Household.surname, Household.address_to, Household.formal_name,
+                   Address.id.label("address_id"), Address.line_1, Address.line_2, Address.city,
+                   Address.state, Address.zip, Address.country, Address.full_address,
+                   card_status.label("card_status"))
+            .outerjoin(Household, Household.id == Gift.household_id)
+            .outerjoin(Address, Address.id == mailing_address_subquery(Gift.household_id))
+            .where(Gift.event_id == event_id)
+            .order_by(Gift.id.asc())
+        )
+
+        if args["pending_only"]:
+            query = query.where(Gift.should_a_card_be_sent, ~card_was_sent)
+
+        try:
+            rows = db.session.execute(query).mappings().all()
+            logger.info("Retrieved %s gifts for the thank-you worksheet of event_id=%s", len(rows), event_id)
+
+        except SQLAlchemyError as e:
+            error_msg = f"SQLAlchemyError retrieving the thank-you worksheet: {e}"
+            logger.info(error_msg)
+            logger.debug("End of ThankYouWorksheetApi.GET")
+            return {"error": error_msg}, 500
+
+        output = []
+        for row in rows:
+            record = dict(row)
+            record["date"] = row["date"].strftime("%Y-%m-%d") if row["date"] else None
+            output.append(record)
+        count_serialized_rows(len(output))
+
+        logger.debug("End of ThankYouWorksheetApi.GET")
+        return output, 200
@@ -2,11 +2,20 @@
 Creates the household-related endpoints.
 """
 
-from logging import getLogger
+from logging import getLogger, DEBUG
 from backend import db
+from helpers.helpers import convert_to_bool
+from helpers.picklists import picklist_cache, HOUSEHOLD_PICKLIST_FIELDS
+from helpers.filtering import household_filters
+from helpers.conditional import collection_validators, record_validators
+from helpers.includes import household_includes, included_validators, load_included
+from helpers.pagination import check_cursor, parse_pagination_args, paginate, split_page
+from helpers.serializers import household_serializer, parse_fields_arg
+from helpers.streaming import parse_stream_arg, stream_json_array
+from helpers.validation import Field, Validator
 from models.models import Household, Address
 from flask import request, jsonify
-from flask_restful import Resource, reqparse
+from flask_restful import Resource, abort
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError, InvalidRequestError, NoResultFound
 from datetime import datetime, timezone
@@ -14,34 +23,41 @@ import json
 
 logger = getLogger()
 
-# Initialize a parser for the request parameters
-base_parser = reqparse.RequestParser(trim=True)
-
 # `id` is required for most requests
-base_parser.add_argument("id", type=int, nullable=False, store_missing=False,
-                         required=True)
-
-
-def add_household_fields_to_parser(provided_parser) -> reqparse:
-    """Adds the remaining household fields to a given parser."""
-    logger.debug("Adding household fields to the parser")
-    provided_parser.add_argument("nickname", type=str)
-    provided_parser.add_argument("first_names", type=str)
-    provided_parser.add_argument("surname", type=str)
-    provided_parser.add_argument("address_to", type=str)
-    provided_parser.add_argument("formal_name", type=str)
-    provided_parser.add_argument("relationship", type=str)
-    provided_parser.add_argument("relationship_type", type=str)
-    provided_parser.add_argument("known_from", type=str)
-    provided_parser.add_argument("family_side", type=str)
-    provided_parser.add_argument("kids", type=str)
-    provided_parser.add_argument("pets", type=str)
-    provided_parser.add_argument("should_receive_holiday_card", type=str)
-    provided_parser.add_argument("is_relevant", type=str)
-    provided_parser.add_argument("notes", type=str)
-
-    logger.debug("Done adding household fields to the parser")
-    return provided_parser
+household_id_field = Field("id", int, nullable=False, store_missing=False, required=True)
+
+# The remaining household fields.  The checkbox defaults match the model's column defaults.
+household_fields = (
+    Field("nickname", str),
+    Field("first_names", str),
+    Field("surname", str),
+    Field("address_to", str),
+    Field("formal_name", str),
+    Field("relationship", str),
+    Field("relationship_type", str),
+    Field("known_from", str),
+    Field("family_side", str),
+    Field("kids", str),
+    Field("pets", str),
+    Field("notes", str),
+)
+
+# The checkbox fields, which decide whether the household gets a holiday card
+household_flag_fields = (
+    Field("should_receive_holiday_card", convert_to_bool, default=False),
+    Field("is_relevant", convert_to_bool, default=True),
+)
+
+# The arguments accepted by each method.  These are shared by every request & never modified.
+household_id_validator = Validator(household_id_field)
+
+# A new, blank address record is created with each new household, using the provided address_id
+household_post_validator = Validator(household_id_field, *household_fields, *household_flag_fields,
+                                     Field("address_id", int))
+
+# Updates leave out the checkboxes that weren't sent, so they keep their current values
+household_put_validator = Validator(household_id_field, *household_fields,
+                                    *(field._replace(store_missing=False) for field in household_flag_fields))
 
 
 class HouseholdCollectionApi(Resource):
@@ -52,15 +68,54 @@ class HouseholdCollectionApi(Resource):
 
     @staticmethod
     def get() -> json:
-        """Return all households from the database. No arguments should be provided."""
+        """
+        Return households from the database, sorted by id unless another sort is requested.
+
+        OPTIONAL ARGUMENTS
+            key: after_id, type: int -- only return records that sort after the record with this id
+            key: limit, type: int -- max number of records to return, DEFAULT_PAGE_SIZE (100) by default
+                unless streamed
+            key: stream, type: bool -- stream the records as they're read instead of in one response
+            key: fields, type: str -- comma-separated list of the fields to return
+            key: sort, type: str -- field to sort by; prefix with "-" to sort in descending order
+            key: include, type: str -- comma-separated list of related records to embed in each
+                household: addresses, cards, gifts.  Can't be combined with stream.
+            key: <field>, <field>__in, <field>__gte, <field>__lte -- filters, see helpers/filtering.py
+        """
         logger.debug("Start of HouseholdCollectionAPI.GET")
 
-        # Retrieve all households from the db, sorted by id
+        # Parse the optional pagination, streaming, projection, include, filter & sort arguments
+        stream = parse_stream_arg()
+        after_id, limit = parse_pagination_args(stream)
+        serializer = parse_fields_arg(household_serializer)
+        relations = household_includes.parse()
+        if stream and relations:
+            abort(400, message={"include": "Related records can't be included in a streamed response."})
+        filters = household_filters.parse()
+        check_cursor(filters.sort, Household.id, after_id)
+
+        # Retrieve a page of matching households from the db, in the requested order
         try:
-            # households = Household.query.order_by(Household.id).all()
-            query = select(Household).order_by(Household.id.asc())
-            households = db.session.execute(query).scalars().all()
-            logger.info(f"Successfully retrieved data for {households.__len__()} households.")
+            # Answer with a 304 when the client's cached copy of this collection is still current
+            validators = included_validators(collection_validators(Household), relations)
+            if validators.match_request():
+                logger.debug("End of HouseholdCollectionAPI.GET")
+                return validators.not_modified()
+
+            # Large reads can be streamed to the client rather than compiled into a list
+            if stream:
+                query = paginate(serializer.select().where(*filters.conditions), Household.id, after_id, limit,
+                                 look_ahead=False, sort=filters.sort)
+                logger.debug("End of HouseholdCollectionAPI.GET")
+                return stream_json_array(query, serializer.serialize, headers=validators.headers())
+
+            # Select plain column tuples; this read-only path doesn't need ORM instances
+            query = paginate(serializer.select().where(*filters.conditions), Household.id, after_id, limit,
+                             sort=filters.sort)
+            households = db.session.execute(query).all()
+            households, headers = split_page(households, limit)
+            headers.update(validators.headers())
+            logger.info("Successfully retrieved data for %s households.", households.__len__())
 
         except SQLAlchemyError as e:
             error_msg = f"SQLAlchemyError retrieving data: {e}"
@@ -76,12 +131,11 @@ class HouseholdCollectionApi(Resource):
 
         # Compile these data into a list
         try:
-            output = []
-            for hh in households:
-                output.append(hh.to_dict())
+            output = serializer.serialize_all(households)
+            load_included(relations, output)
 
             logger.debug("End of HouseholdAPI.GET")
-            return output, 200
+            return output, 200, headers
 
         except BaseException as e:
             error_msg = f"Error compiling data into a list of `dict` to return: {e}"
@@ -103,35 +157,52 @@ class HouseholdApi(Resource):
 
         REQUIRED ARGUMENTS
             key: id, type: int
+
+        OPTIONAL ARGUMENTS
+            key: fields, type: str -- comma-separated list of the fields to return
+            key: include, type: str -- comma-separated list of related records to embed:
+                addresses, cards, gifts
         """
         logger.debug("Start of HouseholdAPI.GET")
         logger.debug(request)
 
-        # No need for additional parser args since the only required arg is `id`
         # Parse the arguments provided
-        args = base_parser.parse_args()
+        args = household_id_validator.parse()
 
         # Validate that a household id was provided
         try:
             household_id = args["id"]
-            logger.debug(f"Household with id={household_id} was read successfully")
+            logger.debug("Household with id=%s was read successfully", household_id)
         except KeyError as e:
-            logger.info(f"Error parsing household id: no value was provided. {e}")
+            logger.info("Error parsing household id: no value was provided. %s", e)
             error_msg = "Must provide a household id."
             return jsonify({"error": error_msg}, status=400)
 
+        # Only select the requested fields & related records, if any were specified
+        serializer = parse_fields_arg(household_serializer)
+        relations = household_includes.parse()
+
         # Retrieve the selected record
         try:
+            # Answer with a 304 when the client's cached copy of this record is still current
+            validators = record_validators(Household, household_id)
+            if validators and relations:
+                validators = included_validators(validators, relations, household_id)
+            if validators and validators.match_request():
+                logger.debug("End of HouseholdAPI.GET")
+                return validators.not_modified()
+
             # household = Household.query.get(household_id)
-            query = select(Household).where(Household.id == household_id)
-            household = db.session.execute(query).scalar_one()
+            query = serializer.select().where(Household.id == household_id).execution_options(prepare=True)
+            household = serializer.serialize(db.session.execute(query).one())
+            load_included(relations, [household])
 
             if household:
                 # Record successfully returned from the db
-                logger.info(f"Found the requested household!")
-                logger.debug(f"Household: {household.to_dict()}")
+                logger.info("Found the requested household!")
+                logger.debug("Household: %s", household)
                 logger.debug("End of HouseholdAPI.GET")
-                return household.to_dict(), 200
+                return household, 200, validators.headers() if validators else {}
             else:
                 # No record with this id exists in the db
                 error_msg = f"No household found with id={household_id}."
@@ -142,7 +213,7 @@ class HouseholdApi(Resource):
         except (InvalidRequestError, NoResultFound, AttributeError) as e:
             error_msg = f"No household found with id={household_id}.\n{e}"
             logger.info(error_msg)
-            logger.debug(f"End of HouseholdAPI.GET")
+            logger.debug("End of HouseholdAPI.GET")
             return jsonify({"error": error_msg}, status=404)
 
     @staticmethod
@@ -173,32 +244,28 @@ class HouseholdApi(Resource):
         logger.debug("Start of HouseholdAPI.POST")
         logger.debug(request)
 
-        # Add the other household args to our parser
-        parser = add_household_fields_to_parser(base_parser)
-
-        # Automatically create a new, blank address record when a new hh is created, using the provided address_id
-        parser.add_argument("address_id", type=int)
-
-        # Remove the `id` arg from our parser; the database will generate this
-        # parser.remove_argument("id")
-        # logger.debug(f"parser keys: {parser.args.__str__()}")
-
         try:
             # Parse the arguments provided
             logger.debug("Attempting to parse args...")
-            args = parser.parse_args()
-            logger.debug(f"Parsed args successfully, new records will be hh_id={args.id}, address_id={args.address_id}")
+            args = household_post_validator.parse()
+            logger.debug("Parsed args successfully, new records will be hh_id=%s, address_id=%s", args.id, args.address_id)
+
+            # Reject picklist values that the front end wouldn't offer
+            error_msg = picklist_cache.validate(args, HOUSEHOLD_PICKLIST_FIELDS)
+            if error_msg:
+                logger.info(error_msg)
+                logger.debug("End of HouseholdAPI.POST")
+                return {"error": error_msg}, 400
 
             # Create a new Household record using the provided data
-            logger.debug(f"Attempting to create a Household from the provided data.")
+            logger.debug("Attempting to create a Household from the provided data.")
 
             # Prep the new (blank) Address record
             blank_address = Address(id=args.address_id, household_id=args.id, country="United States",
                                     is_current=True, is_likely_to_change=False, mail_the_card_to_this_address=True)
 
             # Remove `address_id` from the args, since it doesn't exist in the Household data model
-            parser.remove_argument("address_id")
-            args = parser.parse_args()
+            del args["address_id"]
 
             # Prep the new Household record
             new_household = Household(**args)
@@ -209,15 +276,18 @@ class HouseholdApi(Resource):
 
             # Flush the db
             db.session.flush()
-            logger.info(f"New household record flushed has id={new_household.id}")
-            logger.debug(f"Added new household & blank address records to the db session")
+            logger.info("New household record flushed has id=%s", new_household.id)
+            logger.debug("Added new household & blank address records to the db session")
 
             # Commit this new record so the db generates an id
             logger.debug("Attempting to commit data")
             db.session.commit()
             logger.debug("Commit completed")
-            logger.info(f"New record successfully created: {new_household.to_dict()}")
-            logger.info(f"New record successfully created: {blank_address.to_dict()}")
+            logger.info("New records successfully created: household_id=%s, address_id=%s",
+                        new_household.id, blank_address.id)
+            if logger.isEnabledFor(DEBUG):
+                logger.debug("New household: %s", new_household.to_dict())
+                logger.debug("New address: %s", blank_address.to_dict())
 
             # Return the household_id to the requester
             logger.debug("End of HouseholdAPI.POST")
@@ -251,33 +321,40 @@ class HouseholdApi(Resource):
             key: family_side, type: str
             key: kids, type: str
             key: pets, type: str
-            key: should_receive_holiday_card, type: int
             key: notes, type: str
+
+        OPTIONAL ARGUMENTS
+            key: should_receive_holiday_card, type: bool -- unchanged if not provided
+            key: is_relevant, type: bool -- unchanged if not provided
         """
         logger.debug("Start of HouseholdAPI.PUT")
         logger.debug(request)
 
-        # Add the other household fields to the expected arguments
-        parser = add_household_fields_to_parser(base_parser)
-
         # Parse the arguments provided
         logger.debug("Attempting to parse the arguments")
-        args = parser.parse_args()
+        args = household_put_validator.parse()
         logger.debug("Arguments parsed successfully")
 
+        # Reject picklist values that the front end wouldn't offer
+        error_msg = picklist_cache.validate(args, HOUSEHOLD_PICKLIST_FIELDS)
+        if error_msg:
+            logger.info(error_msg)
+            logger.debug("End of HouseholdAPI.PUT")
+            return {"error": error_msg}, 400
+
         # Validate that a household_id was provided
         try:
             household_id = args["id"]
-            logger.debug(f"Household_id={household_id} was read successfully")
+            logger.debug("Household_id=%s was read successfully", household_id)
         except KeyError as e:
-            logger.info(f"Error parsing household_id: no value was provided. {e}")
+            logger.info("Error parsing household_id: no value was provided. %s", e)
             error_msg = "Must provide a value for household_id."
             return jsonify({"error": error_msg}, status=400)
 
         try:
             # Retrieve the specified household record
             # household = Household.query.get(household_id)
-            query = select(Household).where(Household.id == household_id)
+            query = select(Household).where(Household.id == household_id).execution_options(prepare=True)
             household = db.session.execute(query).scalar_one()
 
             # Update this record with the provided data
@@ -292,9 +369,11 @@ class HouseholdApi(Resource):
             household.family_side = args["family_side"]
             household.kids = args["kids"]
             household.pets = args["pets"]
-            household.should_receive_holiday_card = args["should_receive_holiday_card"]
-            household.is_relevant = args["is_relevant"]
             household.notes = args["notes"]
+            if "should_receive_holiday_card" in args:
+                household.should_receive_holiday_card = args["should_receive_holiday_card"]
+            if "is_relevant" in args:
+                household.is_relevant = args["is_relevant"]
             household.last_modified = datetime.now(timezone.utc)
 
         except SQLAlchemyError as e:
@@ -329,29 +408,28 @@ class HouseholdApi(Resource):
         logger.debug("Start of HouseholdAPI.DELETE")
         logger.debug(request)
 
-        # No need for additional parser args since the only required arg is `id`
         # Parse the arguments provided
-        args = base_parser.parse_args()
+        args = household_id_validator.parse()
 
         # Validate that a household id was provided
         try:
             household_id = args["id"]
-            logger.debug(f"Household id={household_id} was provided.")
+            logger.debug("Household id=%s was provided.", household_id)
         except KeyError as e:
             error_msg = f"Missing household id.\n{e}"
             logger.info(error_msg)
-            logger.debug(f"End of HouseholdAPI.DELETE")
+            logger.debug("End of HouseholdAPI.DELETE")
             return jsonify({"error": error_msg}, status=400)
 
         try:
             # Retrieve the selected record
             # household_to_delete = Household.query.get(household_id)
-            query = select(Household).where(Household.id == household_id)
+            query = select(Household).where(Household.id == household_id).execution_options(prepare=True)
             household_to_delete = db.session.execute(query).scalar_one()
 
             if household_to_delete:
                 # Record successfully returned from the db
-                logger.debug(f"Household record found.  Attempting to delete it.")
+                logger.debug("Household record found.  Attempting to delete it.")
                 db.session.delete(household_to_delete)
 
                 logger.debug("About to commit this delete to the db.")
@@ -371,5 +449,5 @@ class HouseholdApi(Resource):
         except (InvalidRequestError, NoResultFound, AttributeError) as e:
             error_msg = f"No household found with id={household_id}.\n{e}"
             logger.debug(error_msg)
-            logger.debug(f"End of HouseholdAPI.GET")
+            logger.debug("End of HouseholdAPI.GET")
             return jsonify({"error": error_msg}, status=404)
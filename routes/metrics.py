@@ -0,0 +1,20 @@
+"""Serves the app's request & db pool metrics in the Prometheus text format."""
+
+from logging import getLogger
+from backend.metrics import registry
+from flask import Response
+from flask_restful import Resource
+
+logger = getLogger()
+
+
+class MetricsApi(Resource):
+    """
+    Endpoint:   /metrics
+    Methods:    GET
+    """
+
+    @staticmethod
+    def get() -> Response:
+        """Return the current value of every metric, for Prometheus to scrape."""
+        return Response(registry.render(), status=200, mimetype="text/plain; version=0.0.4")
@@ -1,16 +1,17 @@
 """Provides the default picklist values for the front end to use in forms."""
 
 from logging import getLogger
-from flask import jsonify
-from backend import db
-from models.models import Picklists
+from helpers.picklists import picklist_cache, DEFAULT_PICKLIST_VERSION
+from helpers.validation import Field, Validator
 from flask_restful import Resource
-from sqlalchemy import select
-from sqlalchemy.exc import SQLAlchemyError, InvalidRequestError, NoResultFound
+from sqlalchemy.exc import SQLAlchemyError
 import json
 
 logger = getLogger()
 
+# The picklist version is read from the query string
+picklist_validator = Validator(Field("version", int, location="args", default=DEFAULT_PICKLIST_VERSION))
+
 
 class PicklistValuesApi(Resource):
     """
@@ -20,20 +21,31 @@ class PicklistValuesApi(Resource):
 
     @staticmethod
     def get() -> json:
-        """Return the default picklist values, unless a specific version is specified"""
+        """
+        Return the default picklist values, unless a specific version is specified.
+
+        OPTIONAL ARGUMENTS
+            key: version, type: int
+        """
         logger.debug("Start of PicklistValuesApi.GET")
 
-        # Retrieve the default picklist values from the db
-        version_id = 1
+        version_id = picklist_validator.parse().version
+
+        # Picklist values are served from the in-process cache, which only hits the db on a miss
         try:
-            # values = Picklists.query.get(version_id)
-            query = select(Picklists).where(Picklists.version == version_id)
-            values = db.session.execute(query).scalar_one()
-            logger.debug(f"Successfully read default picklist values for version: {version_id}")
-            return values.to_dict(), 200
-
-        except (SQLAlchemyError, InvalidRequestError, NoResultFound, AttributeError) as e:
-            error_msg = f"No picklist values found for version={version_id}. {e}"
+            snapshot = picklist_cache.get(version_id)
+
+        except SQLAlchemyError as e:
+            error_msg = f"Error retrieving picklist values for version={version_id}. {e}"
             logger.info(error_msg)
-            logger.debug(f"End of PicklistValuesApi.GET")
-            return jsonify({"error": error_msg}, status=404)
+            logger.debug("End of PicklistValuesApi.GET")
+            return {"error": error_msg}, 500
+
+        if snapshot is None:
+            error_msg = f"No picklist values found for version={version_id}."
+            logger.info(error_msg)
+            logger.debug("End of PicklistValuesApi.GET")
+            return {"error": error_msg}, 404
+
+        logger.debug("Successfully read picklist values for version: %s", version_id)
+        return snapshot.values, 200
@@ -0,0 +1,160 @@
+"""
+Creates the household search endpoint.
+
+On Postgres, matching uses pg_trgm's word similarity against all the searchable fields at once (see
+household_search_text() in models/models.py), so "jonson" finds the Johnsons.  A household matches
+when the similarity reaches SEARCH_SIMILARITY_THRESHOLD, which is applied to the search's own
+transaction only.  The ix_household_search_trgm GiST index both finds the matches and returns them
+nearest first, so a common name costs no more than a rare one: Postgres stops reading the index
+after `limit` rows instead of scoring & sorting every household that matches.
+
+Other databases, i.e.: SQLite for local development, fall back to case-insensitive substring
+matching of each search term, without typo tolerance or scores.
+
+The typeahead suggestions for the nickname picker are served from the in-process prefix index in
+helpers/typeahead.py instead, so that they don't query the db on every keystroke.
+"""
+from logging import getLogger
+from backend import db
+from backend.config import Config
+from helpers.serializers import household_serializer, parse_fields_arg
+from helpers.typeahead import typeahead_cache
+from helpers.validation import Field, Validator
+from models.models import Household, household_search_text
+from flask import request
+from flask_restful import Resource, abort, inputs
+from sqlalchemy import func, literal, text
+from sqlalchemy.exc import SQLAlchemyError
+import json
+
+logger = getLogger()
+
+search_validator = Validator(Field("q", str, nullable=False, required=True, location="args"),
+                             Field("limit", inputs.positive, location="args"))
+
+
+def similar_households_query(serializer, terms: str, limit: int):
+    """Households whose searchable fields contain a word similar to the terms, most similar first."""
+    search_text = household_search_text()
+    # 1 - word_similarity(terms, search_text).  `%>` & `<->>` rather than `<%` & `<<->` so the indexed
+    # expression is on the operators' left, and no tie-breaker, which would make Postgres sort every match
+    distance = search_text.op("<->>", return_type=db.Float)(literal(terms))
+
+    return serializer.select().add_columns(1 - distance) \
+        .where(search_text.op("%>")(literal(terms))) \
+        .order_by(distance) \
+        .limit(limit)
+
+
+def set_similarity_threshold(threshold: float) -> None:
+    """Sets the similarity `%>` requires, until the end of the current transaction."""
+    db.session.execute(text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+                       {"threshold": str(threshold)})
+
+
+def matching_households_query(serializer, terms: str, limit: int):
+    """Households whose searchable fields contain every one of the terms.  Scores are null."""
+    search_text = func.lower(household_search_text())
+    conditions = (search_text.contains(term, autoescape=True) for term in terms.lower().split())
+
+    return serializer.select().add_columns(literal(None)) \
+        .where(*conditions) \
+        .order_by(Household.nickname, Household.id) \
+        .limit(limit)
+
+
+class SearchApi(Resource):
+    """
+    Endpoint:   /api/v1/search
+    Methods:    GET
+    """
+
+    @staticmethod
+    def get() -> json:
+        """
+        Returns the households that best match the search terms, most similar first.  Nickname, first
+        names, surname, formal name, kids & pets are searched, and each result includes its `score`
+        from 0 to 1.
+
+        REQUIRED ARGUMENTS
+            key: q, type: str -- the search terms; typos are tolerated
+
+        OPTIONAL ARGUMENTS
+            key: limit, type: int -- max number of results, 20 by default
+            key: fields, type: str -- comma-separated list of the fields to return
+        """
+        logger.debug("Start of SearchApi.GET")
+        logger.debug(request)
+
+        args = search_validator.parse()
+        terms = " ".join(args.q.split())
+        if len(terms) < Config.SEARCH_MIN_LENGTH:
+            abort(400, message={"q": f"Must be at least {Config.SEARCH_MIN_LENGTH} characters long."})
+        limit = min(args.limit or Config.SEARCH_DEFAULT_LIMIT, Config.MAX_PAGE_SIZE)
+        serializer = parse_fields_arg(household_serializer)
+
+        try:
+            if db.engine.dialect.name == "postgresql":
+                set_similarity_threshold(Config.SEARCH_SIMILARITY_THRESHOLD)
+                query = similar_households_query(serializer, terms, limit)
+            else:
+                query = matching_households_query(serializer, terms, limit)
+            rows = db.session.execute(query).all()
+
+        except SQLAlchemyError as e:
+            error_msg = f"SQLAlchemyError searching households: {e}"
+            logger.info(error_msg)
+            logger.debug("End of SearchApi.GET")
+            return {"error": error_msg}, 500
+
+        output = serializer.serialize_all([row[:-1] for row in rows])
+        for household, row in zip(output, rows):
+            household["score"] = round(row[-1], 3) if row[-1] is not None else None
+
+        logger.info("Found %s households matching '%s'", len(output), terms)
+        logger.debug("End of SearchApi.GET")
+        return output, 200
+
+
+class SuggestApi(Resource):
+    """
+    Endpoint:   /api/v1/suggest
+    Methods:    GET
+    """
+
+    @staticmethod
+    def get() -> json:
+        """
+        Returns the households whose nickname or surname has a word starting with the provided prefix,
+        for the typeahead of the nickname picker.  Served from memory, without querying the db except
+        when the index needs to be (re)loaded.
+
+        REQUIRED ARGUMENTS
+            key: q, type: str -- what's been typed so far; case-insensitive
+
+        OPTIONAL ARGUMENTS
+            key: limit, type: int -- max number of suggestions, 10 by default
+        """
+        logger.debug("Start of SuggestApi.GET")
+
+        # Same arguments as the search, but a single character is enough to suggest households
+        args = search_validator.parse()
+        if not args.q.strip():
+            abort(400, message={"q": "Must not be blank."})
+        limit = min(args.limit or Config.SUGGEST_DEFAULT_LIMIT, Config.MAX_PAGE_SIZE)
+
+        try:
+            index = typeahead_cache.get()
+
+        except SQLAlchemyError as e:
+            error_msg = f"SQLAlchemyError loading the typeahead index: {e}"
+            logger.info(error_msg)
+            logger.debug("End of SuggestApi.GET")
+            return {"error": error_msg}, 500
+
+        suggestions = [{"id": household_id, "nickname": nickname, "surname": surname}
+                       for household_id, nickname, surname in index.suggest(args.q, limit)]
+
+        logger.debug("Suggested %s households for '%s'", len(suggestions), args.q)
+        logger.debug("End of SuggestApi.GET")
+        return suggestions, 200
@@ -0,0 +1,29 @@
+"""
+Runs the app against a throwaway sqlite db.  The config is read when the app is imported, so the
+environment is set up first.
+"""
+from os import environ, path
+from tempfile import mkdtemp
+import pytest
+
+_directory = mkdtemp(prefix="gift_card_tests_")
+environ["POSTGRES_DB_CONNECTION_DEV"] = f"sqlite:///{path.join(_directory, 'test.db')}"
+environ.setdefault("LOG_DIRECTORY", path.join(_directory, "logs"))
+environ.setdefault("LOG_QUEUE_ENABLED", "False")
+
+from main import app as flask_app  # noqa: E402
+from backend import db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
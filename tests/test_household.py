@@ -0,0 +1,50 @@
+from backend import db
+from models.models import Household, Address
+
+
+def test_post_without_flags_stores_the_model_defaults(client):
+    response = client.post("/api/v1/household", json={"id": 1, "nickname": "The Johnsons", "address_id": 1})
+    assert response.status_code == 201
+
+    household = db.session.get(Household, 1)
+    assert household.is_relevant is True
+    assert household.should_receive_holiday_card is False
+
+    address = db.session.get(Address, 1)
+    assert address.is_current is True
+    assert address.mail_the_card_to_this_address is True
+
+
+def test_post_with_flags_stores_them(client):
+    response = client.post("/api/v1/household", json={"id": 1, "nickname": "The Johnsons", "address_id": 1,
+                                                      "is_relevant": "False", "should_receive_holiday_card": "yes"})
+    assert response.status_code == 201
+
+    household = db.session.get(Household, 1)
+    assert household.is_relevant is False
+    assert household.should_receive_holiday_card is True
+
+
+def test_put_without_flags_keeps_them(client):
+    db.session.add(Household(id=1, nickname="The Johnsons", should_receive_holiday_card=True, is_relevant=True))
+    db.session.commit()
+
+    response = client.put("/api/v1/household", json={"id": 1, "nickname": "The Johnsons #1"})
+    assert response.status_code == 200
+
+    household = db.session.get(Household, 1)
+    assert household.nickname == "The Johnsons #1"
+    assert household.should_receive_holiday_card is True
+    assert household.is_relevant is True
+
+
+def test_put_with_flags_changes_them(client):
+    db.session.add(Household(id=1, nickname="The Johnsons", should_receive_holiday_card=True, is_relevant=True))
+    db.session.commit()
+
+    response = client.put("/api/v1/household", json={"id": 1, "nickname": "The Johnsons", "is_relevant": False})
+    assert response.status_code == 200
+
+    household = db.session.get(Household, 1)
+    assert household.should_receive_holiday_card is True
+    assert household.is_relevant is False
@@ -0,0 +1,37 @@
+import pytest
+from models.models import Household, Address, Gift, Event
+from routes.household import household_post_validator, household_put_validator
+from routes.address import address_validator
+from routes.gift import gift_post_validator
+from routes.event import event_post_validator
+
+CHECKBOX_FIELDS = [
+    (household_post_validator, Household, "should_receive_holiday_card"),
+    (household_post_validator, Household, "is_relevant"),
+    (address_validator, Address, "is_current"),
+    (address_validator, Address, "is_likely_to_change"),
+    (address_validator, Address, "mail_the_card_to_this_address"),
+    (gift_post_validator, Gift, "should_a_card_be_sent"),
+    (event_post_validator, Event, "is_archived"),
+]
+
+
+@pytest.mark.parametrize("validator, model, name", CHECKBOX_FIELDS)
+def test_checkbox_defaults_match_the_model(validator, model, name):
+    field = next(field for field in validator.fields if field.name == name)
+    assert field.default == model.__table__.c[name].default.arg
+
+
+def test_new_household_gets_the_checkbox_defaults():
+    args = household_post_validator.parse({"id": 1, "nickname": "The Johnsons"})
+    assert args.should_receive_holiday_card is False
+    assert args.is_relevant is True
+
+
+def test_household_update_leaves_out_missing_checkboxes():
+    args = household_put_validator.parse({"id": 1, "nickname": "The Johnsons"})
+    assert "should_receive_holiday_card" not in args
+    assert "is_relevant" not in args
+
+    args = household_put_validator.parse({"id": 1, "is_relevant": "no"})
+    assert args.is_relevant is False